@@ -0,0 +1,80 @@
+"""Deterministic chat model that answers structured-output calls without a network."""
+
+import asyncio
+import hashlib
+import re
+import time
+import typing
+from typing import Any, Literal, Type
+
+from pydantic import BaseModel
+
+from src.llm.cache import canonicalize_prompt
+
+_WORD = re.compile(r"\b[A-Z][A-Z0-9]{1,9}\b")
+
+
+class FakeChatModel:
+    """
+    Stands in for a chat client bound to a response schema.
+
+    Each answer is derived from a hash of the prompt, so the same prompt always gets the same
+    valid instance of the schema. Mappings keyed by ticker (portfolio decisions, batched signals)
+    get an entry for every ticker of the universe that the prompt mentions. `latency` seconds are
+    slept per call to model a real provider.
+    """
+
+    def __init__(self, pydantic_model: Type[BaseModel] | None, tickers: list[str], latency: float = 0.0):
+        self.pydantic_model = pydantic_model
+        self.tickers = set(tickers)
+        self.latency = latency
+        self.calls = 0
+
+    def invoke(self, prompt: Any) -> BaseModel:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._answer(prompt)
+
+    async def ainvoke(self, prompt: Any) -> BaseModel:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._answer(prompt)
+
+    def _answer(self, prompt: Any) -> BaseModel:
+        self.calls += 1
+        text = "\n".join(content for _, content in canonicalize_prompt(prompt))
+        tickers = sorted(self.tickers.intersection(_WORD.findall(text)))
+        return self._build(self.pydantic_model, hashlib.sha256(text.encode()).digest(), tickers)
+
+    def _build(self, model: Type[BaseModel], digest: bytes, tickers: list[str]) -> BaseModel:
+        values = {}
+        for index, (name, field) in enumerate(model.model_fields.items()):
+            values[name] = self._value(field.annotation, digest[index % len(digest)], digest, tickers)
+        return model(**values)
+
+    def _value(self, annotation: Any, byte: int, digest: bytes, tickers: list[str]) -> Any:
+        origin = typing.get_origin(annotation)
+        if origin is Literal:
+            options = typing.get_args(annotation)
+            return options[byte % len(options)]
+        if origin is dict:
+            _, value_type = typing.get_args(annotation)
+            return {ticker: self._value(value_type, byte, hashlib.sha256(digest + ticker.encode()).digest(), tickers) for ticker in tickers}
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            return self._build(annotation, digest, tickers)
+        if annotation is float:
+            return float(byte % 101)
+        if annotation is int:
+            return byte % 10
+        if annotation is str:
+            return "Synthetic benchmark response"
+        return None
+
+
+def fake_structured_model(tickers: list[str], latency: float = 0.0):
+    """Replacement for src.llm.models.get_structured_model that returns FakeChatModels."""
+
+    def get_structured_model(model_name: str, model_provider: str, pydantic_model: Type[BaseModel] | None = None) -> FakeChatModel:
+        return FakeChatModel(pydantic_model, tickers, latency)
+
+    return get_structured_model
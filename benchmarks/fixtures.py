@@ -0,0 +1,178 @@
+"""Deterministic offline stand-in for the Financial Datasets API."""
+
+import json
+import zlib
+from collections import Counter
+from datetime import datetime
+
+import httpx
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+# Every synthetic series starts here, so the same (ticker, date) always has the same price
+HISTORY_START = "2010-01-01"
+
+ENDPOINTS = {
+    "/prices/": "prices",
+    "/financial-metrics/": "financial_metrics",
+    "/financials/search/line-items": "line_items",
+    "/insider-trades/": "insider_trades",
+    "/news/": "news",
+}
+
+SENTIMENTS = ("positive", "negative", "neutral")
+
+
+def synthetic_tickers(count: int) -> list[str]:
+    """Ticker symbols that cannot be mistaken for words in a prompt."""
+    return [f"SYN{i:03d}" for i in range(count)]
+
+
+def _seed(*parts) -> int:
+    return zlib.crc32(":".join(map(str, parts)).encode())
+
+
+class SyntheticMarket:
+    """
+    Serves every endpoint the data API client calls, from seeded random walks and fundamentals.
+
+    Responses depend only on the request, never on call order, so cached and uncached runs, gap
+    fills and repeated runs all see the same data. `calls` counts the requests per endpoint.
+    """
+
+    def __init__(self, end_date: str, seed: int = 0):
+        self.end_date = end_date
+        self.seed = seed
+        self.calls: Counter = Counter()
+        self._dates = pd.bdate_range(HISTORY_START, end_date).strftime("%Y-%m-%d").to_numpy()
+        self._prices: dict[str, dict[str, np.ndarray]] = {}
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        endpoint = ENDPOINTS.get(request.url.path)
+        if endpoint is None:
+            return httpx.Response(404, json={"error": f"unknown endpoint {request.url.path}"})
+        self.calls[endpoint] += 1
+
+        params = request.url.params
+        if endpoint == "line_items":
+            body = json.loads(request.content)
+            return httpx.Response(200, json={"search_results": self.line_items(body["tickers"][0], body["line_items"], body["end_date"], body["period"], body["limit"])})
+        if endpoint == "prices":
+            return httpx.Response(200, json={"ticker": params["ticker"], "prices": self.prices(params["ticker"], params["start_date"], params["end_date"])})
+        if endpoint == "financial_metrics":
+            return httpx.Response(200, json={"financial_metrics": self.financial_metrics(params["ticker"], params["report_period_lte"], params["period"], int(params["limit"]))})
+        if endpoint == "insider_trades":
+            return httpx.Response(200, json={"insider_trades": self.insider_trades(params["ticker"], params.get("filing_date_gte"), params["filing_date_lte"], int(params["limit"]))})
+        return httpx.Response(200, json={"news": self.news(params["ticker"], params.get("start_date"), params["end_date"], int(params["limit"]))})
+
+    def _price_series(self, ticker: str) -> dict[str, np.ndarray]:
+        if ticker not in self._prices:
+            rng = np.random.default_rng(_seed(self.seed, ticker))
+            returns = rng.normal(0.0003, 0.015, len(self._dates))
+            close = rng.uniform(20, 400) * np.exp(np.cumsum(returns))
+            spread = np.abs(rng.normal(0, 0.01, len(self._dates)))
+            self._prices[ticker] = {
+                "open": close * (1 + rng.normal(0, 0.005, len(self._dates))),
+                "close": close,
+                "high": close * (1 + spread),
+                "low": close * (1 - spread),
+                "volume": rng.integers(100_000, 10_000_000, len(self._dates)),
+            }
+        return self._prices[ticker]
+
+    def prices(self, ticker: str, start_date: str, end_date: str) -> list[dict]:
+        series = self._price_series(ticker)
+        lo, hi = np.searchsorted(self._dates, start_date), np.searchsorted(self._dates, end_date, side="right")
+        return [
+            {
+                "time": self._dates[i],
+                "open": round(float(series["open"][i]), 4),
+                "close": round(float(series["close"][i]), 4),
+                "high": round(float(series["high"][i]), 4),
+                "low": round(float(series["low"][i]), 4),
+                "volume": int(series["volume"][i]),
+            }
+            for i in range(lo, hi)
+        ]
+
+    @staticmethod
+    def _report_periods(end_date: str, period: str, limit: int) -> list[str]:
+        """Quarter ends (year ends for annual data) on or before end_date, newest first."""
+        latest = pd.offsets.QuarterEnd().rollback(pd.Timestamp(end_date))
+        step = 12 if period == "annual" else 3
+        return [((latest - pd.DateOffset(months=step * i)) + pd.offsets.MonthEnd(0)).strftime("%Y-%m-%d") for i in range(limit)]
+
+    def _fundamental(self, ticker: str, name: str, index: int) -> float:
+        """A positive value that grows a few percent per period, so growth rates and ratios are well defined."""
+        rng = np.random.default_rng(_seed(self.seed, ticker, name))
+        scale, growth = rng.uniform(1e8, 1e10), rng.uniform(-0.02, 0.08)
+        return round(float(scale * (1 + growth) ** -index), 2)
+
+    def financial_metrics(self, ticker: str, end_date: str, period: str, limit: int) -> list[dict]:
+        from src.data.models import FinancialMetrics
+
+        ratio_fields = [name for name in FinancialMetrics.model_fields if name not in ("ticker", "report_period", "period", "currency")]
+        metrics = []
+        for index, report_period in enumerate(self._report_periods(end_date, period, limit)):
+            rng = np.random.default_rng(_seed(self.seed, ticker, "metrics", report_period))
+            row = {"ticker": ticker, "report_period": report_period, "period": period, "currency": "USD"}
+            row.update({name: round(float(rng.uniform(0.01, 0.5)), 4) for name in ratio_fields})
+            row["market_cap"] = self._fundamental(ticker, "market_cap", index) * 10
+            row["enterprise_value"] = row["market_cap"] * 1.1
+            row["price_to_earnings_ratio"] = round(float(rng.uniform(8, 40)), 2)
+            row["price_to_book_ratio"] = round(float(rng.uniform(0.8, 8)), 2)
+            row["earnings_per_share"] = round(float(rng.uniform(0.5, 12)), 2)
+            row["book_value_per_share"] = round(float(rng.uniform(5, 80)), 2)
+            metrics.append(row)
+        return metrics
+
+    def line_items(self, ticker: str, line_items: list[str], end_date: str, period: str, limit: int) -> list[dict]:
+        return [
+            {"ticker": ticker, "report_period": report_period, "period": period, "currency": "USD", **{name: self._fundamental(ticker, name, index) for name in line_items}}
+            for index, report_period in enumerate(self._report_periods(end_date, period, limit))
+        ]
+
+    def insider_trades(self, ticker: str, start_date: str | None, end_date: str, limit: int) -> list[dict]:
+        start_date = start_date or (datetime.strptime(end_date, "%Y-%m-%d") - relativedelta(years=1)).strftime("%Y-%m-%d")
+        trades = []
+        for day in pd.date_range(start_date, end_date, freq="15D").strftime("%Y-%m-%d")[::-1][:limit]:
+            rng = np.random.default_rng(_seed(self.seed, ticker, "insider", day))
+            shares = float(rng.integers(-20_000, 20_000))
+            price = round(float(rng.uniform(20, 400)), 2)
+            trades.append(
+                {
+                    "ticker": ticker,
+                    "issuer": f"{ticker} Inc",
+                    "name": "Synthetic Insider",
+                    "title": "Director",
+                    "is_board_director": True,
+                    "transaction_date": day,
+                    "transaction_shares": shares,
+                    "transaction_price_per_share": price,
+                    "transaction_value": round(shares * price, 2),
+                    "shares_owned_before_transaction": 100_000.0,
+                    "shares_owned_after_transaction": 100_000.0 + shares,
+                    "security_title": "Common Stock",
+                    "filing_date": day,
+                }
+            )
+        return trades
+
+    def news(self, ticker: str, start_date: str | None, end_date: str, limit: int) -> list[dict]:
+        start_date = start_date or (datetime.strptime(end_date, "%Y-%m-%d") - relativedelta(months=3)).strftime("%Y-%m-%d")
+        return [
+            {
+                "ticker": ticker,
+                "title": f"{ticker} update {day}",
+                "author": "Synthetic Wire",
+                "source": "synthetic",
+                "date": day,
+                "url": f"https://example.com/{ticker}/{day}",
+                "sentiment": SENTIMENTS[_seed(self.seed, ticker, day) % len(SENTIMENTS)],
+            }
+            for day in pd.date_range(start_date, end_date, freq="3D").strftime("%Y-%m-%d")[::-1][:limit]
+        ]
@@ -0,0 +1,299 @@
+"""
+Offline benchmarks of run_hedge_fund and Backtester.run_backtest.
+
+Each scenario runs in its own process against the synthetic Financial Datasets API in
+benchmarks/fixtures.py and the deterministic model in benchmarks/fake_llm.py, so nothing touches the
+network, the on-disk caches or an LLM provider. Reports wall time, peak RSS, API calls per endpoint
+and per-agent time, and exits with status 1 when a scenario regressed against the saved baseline.
+
+    python -m benchmarks.run                       # default suite, compared with benchmarks/baseline.json
+    python -m benchmarks.run --suite full          # every universe size and horizon
+    python -m benchmarks.run --save-baseline       # record the current numbers as the baseline
+    python -m benchmarks.run --require-baseline    # as in CI: a scenario without a baseline fails the run
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import datetime
+from typing import NamedTuple
+from unittest import mock
+
+import httpx
+from dateutil.relativedelta import relativedelta
+from tabulate import tabulate
+
+from benchmarks.fixtures import SyntheticMarket, synthetic_tickers
+
+# Trading date every scenario ends on; the synthetic market has data up to it
+END_DATE = "2024-12-31"
+MODEL_NAME = "gpt-4o"
+MODEL_PROVIDER = "OpenAI"
+
+UNIVERSE_SIZES = (5, 50, 500)
+HORIZONS = {"1m": relativedelta(months=1), "1y": relativedelta(years=1), "5y": relativedelta(years=5)}
+
+# Fractional slowdown (or memory growth) over the baseline that counts as a regression
+DEFAULT_THRESHOLD = 0.2
+# Isolated runs per scenario; see combine_runs
+DEFAULT_REPEAT = 3
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+class Scenario(NamedTuple):
+    target: str  # "hedge_fund" or "backtest"
+    universe: int
+    horizon: str
+
+    @property
+    def name(self) -> str:
+        return f"{self.target}-{self.universe}-{self.horizon}"
+
+
+ALL_SCENARIOS = [Scenario(target, universe, horizon) for target in ("hedge_fund", "backtest") for universe in UNIVERSE_SIZES for horizon in HORIZONS]
+
+# A backtest calls the whole graph once per trading day, so the large backtests only run in the full suite
+SUITES = {
+    "smoke": [Scenario("hedge_fund", 5, "1m"), Scenario("backtest", 5, "1m")],
+    "default": [scenario for scenario in ALL_SCENARIOS if scenario.target == "hedge_fund" or (scenario.universe, scenario.horizon) in ((5, "1m"), (5, "1y"), (50, "1m"))],
+    "full": ALL_SCENARIOS,
+}
+
+
+def _peak_rss_mb() -> float | None:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+@contextmanager
+def offline(market: SyntheticMarket, tickers: list[str], llm_latency: float = 0.0):
+    """Serve data from `market` and completions from the fake model, with fresh in-memory caches and no rate limit."""
+    from src.data.cache import Cache
+    from src.llm import models
+    from src.llm.cache import get_llm_cache
+    from src.tools import api
+    from src.utils.rate_limit import TokenBucket
+
+    from benchmarks.fake_llm import fake_structured_model
+
+    clients = {}
+
+    def get_client():
+        loop = asyncio.get_running_loop()
+        if loop not in clients:
+            clients[loop] = httpx.AsyncClient(transport=market.transport())
+        return clients[loop]
+
+    with ExitStack() as stack:
+        stack.enter_context(mock.patch.object(api, "_cache", Cache()))
+        stack.enter_context(mock.patch.object(api, "_get_client", get_client))
+        stack.enter_context(mock.patch.object(api, "_rate_limiter", TokenBucket(rate=1e9)))
+        stack.enter_context(mock.patch.object(models, "get_structured_model", fake_structured_model(tickers, llm_latency)))
+        stack.enter_context(mock.patch.object(get_llm_cache(), "_enabled", False))
+        yield
+
+
+def run_scenario(scenario: Scenario, llm_latency: float = 0.0) -> dict:
+    """Run one scenario in this process and return its measurements."""
+    from src.backtester import Backtester
+    from src.main import run_hedge_fund
+    from src.utils.analysts import ANALYST_CONFIG
+    from src.utils.tracing import tracer
+
+    tickers = synthetic_tickers(scenario.universe)
+    analysts = list(ANALYST_CONFIG)
+    start_date = (datetime.strptime(END_DATE, "%Y-%m-%d") - HORIZONS[scenario.horizon]).strftime("%Y-%m-%d")
+    market = SyntheticMarket(END_DATE)
+
+    # Graph node spans give the time spent in each agent
+    tracer.configure(enabled=True, kinds={"node"})
+    tracer.reset()
+
+    # The backtester clears the terminal through os.system, which writes past redirect_stdout
+    # onto the line that carries the scenario's JSON result
+    with offline(market, tickers, llm_latency), contextlib.redirect_stdout(io.StringIO()), mock.patch("os.system"):
+        started = time.perf_counter()
+        if scenario.target == "hedge_fund":
+            run_hedge_fund(
+                tickers=tickers,
+                start_date=start_date,
+                end_date=END_DATE,
+                portfolio={
+                    "cash": 100_000.0,
+                    "margin_requirement": 0.0,
+                    "positions": {ticker: {"long": 0, "short": 0, "long_cost_basis": 0.0, "short_cost_basis": 0.0} for ticker in tickers},
+                    "realized_gains": {ticker: {"long": 0.0, "short": 0.0} for ticker in tickers},
+                },
+                selected_analysts=analysts,
+                model_name=MODEL_NAME,
+                model_provider=MODEL_PROVIDER,
+            )
+        else:
+            backtester = Backtester(
+                agent=run_hedge_fund,
+                tickers=tickers,
+                start_date=start_date,
+                end_date=END_DATE,
+                initial_capital=100_000.0,
+                model_name=MODEL_NAME,
+                model_provider=MODEL_PROVIDER,
+                selected_analysts=analysts,
+            )
+            backtester.run_backtest()
+        wall_time = time.perf_counter() - started
+
+    agents: dict[str, float] = {}
+    for span in tracer.spans:
+        agents[span.name] = agents.get(span.name, 0.0) + span.duration
+    tracer.reset()
+
+    return {
+        "scenario": scenario.name,
+        "wall_time": wall_time,
+        "peak_rss_mb": _peak_rss_mb(),
+        "calls": dict(market.calls),
+        "agents": agents,
+    }
+
+
+def run_isolated(scenario: Scenario, llm_latency: float) -> dict:
+    """Run a scenario in a fresh interpreter, so its peak RSS and caches are its own."""
+    env = dict(os.environ, FINANCIAL_DATASETS_CACHE="memory", LLM_CACHE="off", MPLBACKEND="Agg")
+    command = [sys.executable, "-m", "benchmarks.run", "--scenario", scenario.name, "--llm-latency", str(llm_latency), "--json"]
+    completed = subprocess.run(command, env=env, capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    if completed.returncode != 0:
+        raise RuntimeError(f"Scenario {scenario.name} failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def combine_runs(runs: list[dict]) -> dict:
+    """
+    One result for repeated runs of a scenario: the run with the median wall time, with the largest
+    peak RSS and the most API calls per endpoint seen in any run, so one noisy run cannot fail the gate.
+    """
+    ordered = sorted(runs, key=lambda run: run["wall_time"])
+    result = dict(ordered[len(ordered) // 2])
+    peaks = [run["peak_rss_mb"] for run in runs if run["peak_rss_mb"]]
+    result["peak_rss_mb"] = max(peaks) if peaks else None
+    endpoints = {endpoint for run in runs for endpoint in run["calls"]}
+    result["calls"] = {endpoint: max(run["calls"].get(endpoint, 0) for run in runs) for endpoint in sorted(endpoints)}
+    result["runs"] = len(runs)
+    return result
+
+
+def find_regressions(result: dict, baseline: dict | None, threshold: float) -> list[str]:
+    """Describe how a result regressed against its baseline: slower, larger, or more API calls."""
+    if not baseline:
+        return []
+    regressions = []
+    if result["wall_time"] > baseline["wall_time"] * (1 + threshold):
+        regressions.append(f"wall time {baseline['wall_time']:.2f}s -> {result['wall_time']:.2f}s")
+    if result["peak_rss_mb"] and baseline.get("peak_rss_mb") and result["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + threshold):
+        regressions.append(f"peak RSS {baseline['peak_rss_mb']:.0f}MB -> {result['peak_rss_mb']:.0f}MB")
+    # Call counts are deterministic, so any increase is a regression
+    for endpoint, calls in result["calls"].items():
+        if calls > baseline["calls"].get(endpoint, 0):
+            regressions.append(f"{endpoint} calls {baseline['calls'].get(endpoint, 0)} -> {calls}")
+    return regressions
+
+
+def missing_baselines(results: list[dict], baseline: dict) -> list[str]:
+    """Scenarios among the results that the baseline has no numbers for."""
+    return [result["scenario"] for result in results if result["scenario"] not in baseline]
+
+
+def print_report(results: list[dict], regressions: dict[str, list[str]]):
+    rows = []
+    for result in results:
+        slowest = sorted(result["agents"].items(), key=lambda item: item[1], reverse=True)[:3]
+        rows.append(
+            [
+                result["scenario"],
+                f"{result['wall_time']:.2f}s",
+                f"{result['peak_rss_mb']:.0f}MB" if result["peak_rss_mb"] else "n/a",
+                ", ".join(f"{endpoint}={calls}" for endpoint, calls in sorted(result["calls"].items())),
+                ", ".join(f"{name.removesuffix('_agent')}={seconds:.2f}s" for name, seconds in slowest),
+                "; ".join(regressions.get(result["scenario"], [])) or "ok",
+            ]
+        )
+    print(tabulate(rows, headers=["Scenario", "Wall time", "Peak RSS", "API calls", "Slowest agents", "Regressions"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite")
+    parser.add_argument("--suite", choices=SUITES, default="default", help="Scenarios to run. Defaults to default")
+    parser.add_argument("--scenario", action="append", choices=[scenario.name for scenario in ALL_SCENARIOS], help="Run only this scenario (repeatable)")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds the fake model takes per call. Defaults to 0")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help=f"Runs per scenario, combined by median wall time and most API calls. Defaults to {DEFAULT_REPEAT}")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline results to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="Save these results as the baseline instead of comparing")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help=f"Slowdown that fails the run, as a fraction. Defaults to {DEFAULT_THRESHOLD}")
+    parser.add_argument(
+        "--require-baseline",
+        action="store_true",
+        default=bool(os.environ.get("CI")),
+        help="Fail when a scenario has no baseline to compare with. Defaults to on when the CI environment variable is set",
+    )
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    parser.add_argument("--json", action="store_true", help="Run the scenarios in this process and print their results as JSON")
+    args = parser.parse_args()
+
+    scenarios = [scenario for scenario in ALL_SCENARIOS if scenario.name in args.scenario] if args.scenario else SUITES[args.suite]
+
+    if args.json:
+        for scenario in scenarios:
+            print(json.dumps(run_scenario(scenario, args.llm_latency)))
+        return
+
+    results = []
+    for scenario in scenarios:
+        print(f"Running {scenario.name}...", flush=True)
+        results.append(combine_runs([run_isolated(scenario, args.llm_latency) for _ in range(max(1, args.repeat))]))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update({result["scenario"]: result for result in results})
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print_report(results, {})
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = {result["scenario"]: find_regressions(result, baseline.get(result["scenario"]), args.threshold) for result in results}
+    print_report(results, regressions)
+
+    # Without a baseline nothing can regress, so the gate would pass silently
+    unmeasured = missing_baselines(results, baseline)
+    if unmeasured:
+        print(f"No baseline in {args.baseline} for {', '.join(unmeasured)}; run with --save-baseline to record one")
+        if args.require_baseline:
+            sys.exit(2)
+    if any(regressions.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,24 @@ from pydantic import BaseModel
 import json
 from typing_extensions import Literal
 from src.utils.progress import progress
-from src.utils.llm import call_llm
+from src.utils.llm import call_llm, fill_analysis_prompt, generate_signals
+
+
+# Annual history used for Ackman's quality, balance sheet and activism checks
+LINE_ITEM_REQUEST = {
+    "line_items": [
+        "revenue",
+        "operating_margin",
+        "debt_to_equity",
+        "free_cash_flow",
+        "total_assets",
+        "total_liabilities",
+        "dividends_and_other_cash_distributions",
+        "outstanding_shares",
+    ],
+    "period": "annual",  # or "ttm" if you prefer trailing 12 months
+    "limit": 5,  # fetch up to 5 annual periods (or more if needed)
+}
 
 
 class BillAckmanSignal(BaseModel):
@@ -25,32 +42,14 @@ def bill_ackman_agent(state: AgentState):
     end_date = data["end_date"]
     tickers = data["tickers"]
 
-    analysis_data = {}
-    ackman_analysis = {}
-
-    for ticker in tickers:
+    def analyze_ticker(ticker: str) -> dict:
         progress.update_status("bill_ackman_agent", ticker, "Fetching financial metrics")
         # You can adjust these parameters (period="annual"/"ttm", limit=5/10, etc.)
         metrics = get_financial_metrics(ticker, end_date, period="annual", limit=5)
 
         progress.update_status("bill_ackman_agent", ticker, "Gathering financial line items")
         # Request multiple periods of data (annual or TTM) for a more robust long-term view.
-        financial_line_items = search_line_items(
-            ticker,
-            [
-                "revenue",
-                "operating_margin",
-                "debt_to_equity",
-                "free_cash_flow",
-                "total_assets",
-                "total_liabilities",
-                "dividends_and_other_cash_distributions",
-                "outstanding_shares",
-            ],
-            end_date,
-            period="annual",  # or "ttm" if you prefer trailing 12 months
-            limit=5,  # fetch up to 5 annual periods (or more if needed)
-        )
+        financial_line_items = search_line_items(ticker, end_date=end_date, **LINE_ITEM_REQUEST)
 
         progress.update_status("bill_ackman_agent", ticker, "Getting market cap")
         market_cap = get_market_cap(ticker, end_date)
@@ -76,7 +75,7 @@ def bill_ackman_agent(state: AgentState):
         else:
             signal = "neutral"
 
-        analysis_data[ticker] = {
+        return {
             "signal": signal,
             "score": total_score,
             "max_score": max_possible_score,
@@ -85,17 +84,16 @@ def bill_ackman_agent(state: AgentState):
             "valuation_analysis": valuation_analysis,
         }
 
-        progress.update_status("bill_ackman_agent", ticker, "Generating Ackman analysis")
-        ackman_output = generate_ackman_output(
-            ticker=ticker,
-            analysis_data=analysis_data,
-            model_name=state["metadata"]["model_name"],
-            model_provider=state["metadata"]["model_provider"],
-        )
-
-        ackman_analysis[ticker] = {"signal": ackman_output.signal, "confidence": ackman_output.confidence, "reasoning": ackman_output.reasoning}
-
-        progress.update_status("bill_ackman_agent", ticker, "Done")
+    ackman_analysis = generate_signals(
+        tickers,
+        analyze_ticker,
+        generate_output=generate_ackman_output,
+        create_prompt=create_ackman_prompt,
+        pydantic_model=BillAckmanSignal,
+        metadata=state["metadata"],
+        agent_name="bill_ackman_agent",
+        status="Generating Ackman analysis",
+    )
 
     # Wrap results in a single message for the chain
     message = HumanMessage(content=json.dumps(ackman_analysis), name="bill_ackman_agent")
@@ -298,15 +296,8 @@ def analyze_valuation(financial_line_items: list, market_cap: float) -> dict:
     return {"score": score, "details": "; ".join(details), "intrinsic_value": intrinsic_value, "margin_of_safety": margin_of_safety}
 
 
-def generate_ackman_output(
-    ticker: str,
-    analysis_data: dict[str, any],
-    model_name: str,
-    model_provider: str,
-) -> BillAckmanSignal:
-    """
-    Generates investment decisions in the style of Bill Ackman.
-    """
+def create_ackman_prompt(ticker: str, analysis_data: dict[str, any], model_name: str | None = None):
+    """Build the Ackman prompt for the analysis data of one ticker, or of several when batching."""
     template = ChatPromptTemplate.from_messages(
         [
             (
@@ -346,7 +337,19 @@ def generate_ackman_output(
         ]
     )
 
-    prompt = template.invoke({"analysis_data": json.dumps(analysis_data, indent=2), "ticker": ticker})
+    return fill_analysis_prompt(template, ticker, analysis_data, model_name, agent_name="bill_ackman_agent")
+
+
+def generate_ackman_output(
+    ticker: str,
+    analysis_data: dict[str, any],
+    model_name: str,
+    model_provider: str,
+) -> BillAckmanSignal:
+    """
+    Generates investment decisions in the style of Bill Ackman.
+    """
+    prompt = create_ackman_prompt(ticker, analysis_data, model_name)
 
     def create_default_bill_ackman_signal():
         return BillAckmanSignal(signal="neutral", confidence=0.0, reasoning="Error in analysis, defaulting to neutral")
@@ -6,7 +6,30 @@ from pydantic import BaseModel
 import json
 from typing_extensions import Literal
 from src.utils.progress import progress
-from src.utils.llm import call_llm
+from src.utils.llm import call_llm, fill_analysis_prompt, generate_signals
+
+
+# Munger looks at a decade of annual results
+LINE_ITEM_REQUEST = {
+    "line_items": [
+        "revenue",
+        "net_income",
+        "operating_income",
+        "return_on_invested_capital",
+        "gross_margin",
+        "operating_margin",
+        "free_cash_flow",
+        "capital_expenditure",
+        "cash_and_equivalents",
+        "total_debt",
+        "shareholders_equity",
+        "outstanding_shares",
+        "research_and_development",
+        "goodwill_and_intangible_assets",
+    ],
+    "period": "annual",
+    "limit": 10,  # Munger examines long-term trends
+}
 
 
 class CharlieMungerSignal(BaseModel):
@@ -24,36 +47,12 @@ def charlie_munger_agent(state: AgentState):
     end_date = data["end_date"]
     tickers = data["tickers"]
 
-    analysis_data = {}
-    munger_analysis = {}
-
-    for ticker in tickers:
+    def analyze_ticker(ticker: str) -> dict:
         progress.update_status("charlie_munger_agent", ticker, "Fetching financial metrics")
         metrics = get_financial_metrics(ticker, end_date, period="annual", limit=10)  # Munger looks at longer periods
 
         progress.update_status("charlie_munger_agent", ticker, "Gathering financial line items")
-        financial_line_items = search_line_items(
-            ticker,
-            [
-                "revenue",
-                "net_income",
-                "operating_income",
-                "return_on_invested_capital",
-                "gross_margin",
-                "operating_margin",
-                "free_cash_flow",
-                "capital_expenditure",
-                "cash_and_equivalents",
-                "total_debt",
-                "shareholders_equity",
-                "outstanding_shares",
-                "research_and_development",
-                "goodwill_and_intangible_assets",
-            ],
-            end_date,
-            period="annual",
-            limit=10,  # Munger examines long-term trends
-        )
+        financial_line_items = search_line_items(ticker, end_date=end_date, **LINE_ITEM_REQUEST)
 
         progress.update_status("charlie_munger_agent", ticker, "Getting market cap")
         market_cap = get_market_cap(ticker, end_date)
@@ -104,7 +103,7 @@ def charlie_munger_agent(state: AgentState):
         else:
             signal = "neutral"
 
-        analysis_data[ticker] = {
+        return {
             "signal": signal,
             "score": total_score,
             "max_score": max_possible_score,
@@ -116,17 +115,16 @@ def charlie_munger_agent(state: AgentState):
             "news_sentiment": analyze_news_sentiment(company_news) if company_news else "No news data available",
         }
 
-        progress.update_status("charlie_munger_agent", ticker, "Generating Charlie Munger analysis")
-        munger_output = generate_munger_output(
-            ticker=ticker,
-            analysis_data=analysis_data,
-            model_name=state["metadata"]["model_name"],
-            model_provider=state["metadata"]["model_provider"],
-        )
-
-        munger_analysis[ticker] = {"signal": munger_output.signal, "confidence": munger_output.confidence, "reasoning": munger_output.reasoning}
-
-        progress.update_status("charlie_munger_agent", ticker, "Done")
+    munger_analysis = generate_signals(
+        tickers,
+        analyze_ticker,
+        generate_output=generate_munger_output,
+        create_prompt=create_munger_prompt,
+        pydantic_model=CharlieMungerSignal,
+        metadata=state["metadata"],
+        agent_name="charlie_munger_agent",
+        status="Generating Charlie Munger analysis",
+    )
 
     # Wrap results in a single message for the chain
     message = HumanMessage(content=json.dumps(munger_analysis), name="charlie_munger_agent")
@@ -596,15 +594,8 @@ def analyze_news_sentiment(news_items: list) -> str:
     return f"Qualitative review of {len(news_items)} recent news items would be needed"
 
 
-def generate_munger_output(
-    ticker: str,
-    analysis_data: dict[str, any],
-    model_name: str,
-    model_provider: str,
-) -> CharlieMungerSignal:
-    """
-    Generates investment decisions in the style of Charlie Munger.
-    """
+def create_munger_prompt(ticker: str, analysis_data: dict[str, any], model_name: str | None = None):
+    """Build the Munger prompt for the analysis data of one ticker, or of several when batching."""
     template = ChatPromptTemplate.from_messages(
         [
             (
@@ -661,7 +652,19 @@ def generate_munger_output(
         ]
     )
 
-    prompt = template.invoke({"analysis_data": json.dumps(analysis_data, indent=2), "ticker": ticker})
+    return fill_analysis_prompt(template, ticker, analysis_data, model_name, agent_name="charlie_munger_agent")
+
+
+def generate_munger_output(
+    ticker: str,
+    analysis_data: dict[str, any],
+    model_name: str,
+    model_provider: str,
+) -> CharlieMungerSignal:
+    """
+    Generates investment decisions in the style of Charlie Munger.
+    """
+    prompt = create_munger_prompt(ticker, analysis_data, model_name)
 
     def create_default_charlie_munger_signal():
         return CharlieMungerSignal(signal="neutral", confidence=0.0, reasoning="Error in analysis, defaulting to neutral")
@@ -1,6 +1,7 @@
 from langchain_core.messages import HumanMessage
 from src.graph.state import AgentState, show_agent_reasoning
 from src.utils.progress import progress
+from src.utils.concurrency import map_tickers
 import json
 
 from src.tools.api import get_financial_metrics
@@ -16,7 +17,7 @@ def fundamentals_agent(state: AgentState):
     # Initialize fundamental analysis for each ticker
     fundamental_analysis = {}
 
-    for ticker in tickers:
+    def analyze_ticker(ticker: str) -> dict | None:
         progress.update_status("fundamentals_agent", ticker, "Fetching financial metrics")
 
         # Get the financial metrics
@@ -29,7 +30,7 @@ def fundamentals_agent(state: AgentState):
 
         if not financial_metrics:
             progress.update_status("fundamentals_agent", ticker, "Failed: No financial metrics found")
-            continue
+            return None
 
         # Pull the most recent financial metrics
         metrics = financial_metrics[0]
@@ -142,13 +143,18 @@ def fundamentals_agent(state: AgentState):
         total_signals = len(signals)
         confidence = round(max(bullish_signals, bearish_signals) / total_signals, 2) * 100
 
-        fundamental_analysis[ticker] = {
+        result = {
             "signal": overall_signal,
             "confidence": confidence,
             "reasoning": reasoning,
         }
 
         progress.update_status("fundamentals_agent", ticker, "Done")
+        return result
+
+    for ticker, result in zip(tickers, map_tickers(analyze_ticker, tickers)):
+        if result is not None:
+            fundamental_analysis[ticker] = result
 
     # Create the fundamental analysis message
     message = HumanMessage(
@@ -1,6 +1,7 @@
 from langchain_core.messages import HumanMessage
 from src.graph.state import AgentState, show_agent_reasoning
 from src.utils.progress import progress
+from src.utils.concurrency import map_tickers
 import pandas as pd
 import numpy as np
 import json
@@ -18,7 +19,7 @@ def sentiment_agent(state: AgentState):
     # Initialize sentiment analysis for each ticker
     sentiment_analysis = {}
 
-    for ticker in tickers:
+    def analyze_ticker(ticker: str) -> dict:
         progress.update_status("sentiment_agent", ticker, "Fetching insider trades")
 
         # Get the insider trades
@@ -66,13 +67,17 @@ def sentiment_agent(state: AgentState):
             confidence = round(max(bullish_signals, bearish_signals) / total_weighted_signals, 2) * 100
         reasoning = f"Weighted Bullish signals: {bullish_signals:.1f}, Weighted Bearish signals: {bearish_signals:.1f}"
 
-        sentiment_analysis[ticker] = {
+        result = {
             "signal": overall_signal,
             "confidence": confidence,
             "reasoning": reasoning,
         }
 
         progress.update_status("sentiment_agent", ticker, "Done")
+        return result
+
+    for ticker, result in zip(tickers, map_tickers(analyze_ticker, tickers)):
+        sentiment_analysis[ticker] = result
 
     # Create the sentiment message
     message = HumanMessage(
@@ -1,4 +1,7 @@
 import math
+import warnings
+from collections import deque
+from functools import cached_property
 
 from langchain_core.messages import HumanMessage
 
@@ -7,9 +10,24 @@ from src.graph.state import AgentState, show_agent_reasoning
 import json
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 
-from src.tools.api import get_prices, prices_to_df
+from src.tools.api import get_price_data
 from src.utils.progress import progress
+from src.utils.concurrency import map_tickers
+
+
+# Weights of each strategy in the combined signal
+STRATEGY_WEIGHTS = {
+    "trend": 0.25,
+    "mean_reversion": 0.20,
+    "momentum": 0.25,
+    "volatility": 0.15,
+    "stat_arb": 0.15,
+}
+
+# Closes kept by streaming indicator state for the Hurst exponent
+HURST_WINDOW = 252
 
 
 ##### Technical Analyst #####
@@ -27,94 +45,39 @@ def technical_analyst_agent(state: AgentState):
     end_date = data["end_date"]
     tickers = data["tickers"]
 
-    # Initialize analysis for each ticker
-    technical_analysis = {}
+    # Indicator state carried over from earlier calls (set by backtests that opt in)
+    indicator_states = state["metadata"].get("indicator_states")
 
-    for ticker in tickers:
+    def fetch_prices(ticker: str) -> pd.DataFrame:
         progress.update_status("technical_analyst_agent", ticker, "Analyzing price data")
+        if indicator_states is not None:
+            # Only the bars the carried-over state has not folded in yet
+            return get_price_data(ticker, indicator_states.resume_date(ticker), end_date)
+        return get_price_data(ticker, start_date, end_date)
+
+    # Get the historical price data, then score every ticker in one pass over a price panel
+    frames = dict(zip(tickers, map_tickers(fetch_prices, tickers)))
+    if indicator_states is not None:
+        for ticker, prices_df in frames.items():
+            indicator_states.update(ticker, prices_df)
+        analyzed = [ticker for ticker in tickers if ticker in indicator_states]
+    else:
+        frames = {ticker: prices_df for ticker, prices_df in frames.items() if not prices_df.empty}
+        analyzed = list(frames)
 
-        # Get the historical price data
-        prices = get_prices(
-            ticker=ticker,
-            start_date=start_date,
-            end_date=end_date,
-        )
-
-        if not prices:
+    for ticker in tickers:
+        if ticker in analyzed:
+            progress.update_status("technical_analyst_agent", ticker, "Calculating signals")
+        else:
             progress.update_status("technical_analyst_agent", ticker, "Failed: No price data found")
-            continue
-
-        # Convert prices to a DataFrame
-        prices_df = prices_to_df(prices)
-
-        progress.update_status("technical_analyst_agent", ticker, "Calculating trend signals")
-        trend_signals = calculate_trend_signals(prices_df)
-
-        progress.update_status("technical_analyst_agent", ticker, "Calculating mean reversion")
-        mean_reversion_signals = calculate_mean_reversion_signals(prices_df)
-
-        progress.update_status("technical_analyst_agent", ticker, "Calculating momentum")
-        momentum_signals = calculate_momentum_signals(prices_df)
-
-        progress.update_status("technical_analyst_agent", ticker, "Analyzing volatility")
-        volatility_signals = calculate_volatility_signals(prices_df)
-
-        progress.update_status("technical_analyst_agent", ticker, "Statistical analysis")
-        stat_arb_signals = calculate_stat_arb_signals(prices_df)
-
-        # Combine all signals using a weighted ensemble approach
-        strategy_weights = {
-            "trend": 0.25,
-            "mean_reversion": 0.20,
-            "momentum": 0.25,
-            "volatility": 0.15,
-            "stat_arb": 0.15,
-        }
-
-        progress.update_status("technical_analyst_agent", ticker, "Combining signals")
-        combined_signal = weighted_signal_combination(
-            {
-                "trend": trend_signals,
-                "mean_reversion": mean_reversion_signals,
-                "momentum": momentum_signals,
-                "volatility": volatility_signals,
-                "stat_arb": stat_arb_signals,
-            },
-            strategy_weights,
-        )
 
-        # Generate detailed analysis report for this ticker
-        technical_analysis[ticker] = {
-            "signal": combined_signal["signal"],
-            "confidence": round(combined_signal["confidence"] * 100),
-            "strategy_signals": {
-                "trend_following": {
-                    "signal": trend_signals["signal"],
-                    "confidence": round(trend_signals["confidence"] * 100),
-                    "metrics": normalize_pandas(trend_signals["metrics"]),
-                },
-                "mean_reversion": {
-                    "signal": mean_reversion_signals["signal"],
-                    "confidence": round(mean_reversion_signals["confidence"] * 100),
-                    "metrics": normalize_pandas(mean_reversion_signals["metrics"]),
-                },
-                "momentum": {
-                    "signal": momentum_signals["signal"],
-                    "confidence": round(momentum_signals["confidence"] * 100),
-                    "metrics": normalize_pandas(momentum_signals["metrics"]),
-                },
-                "volatility": {
-                    "signal": volatility_signals["signal"],
-                    "confidence": round(volatility_signals["confidence"] * 100),
-                    "metrics": normalize_pandas(volatility_signals["metrics"]),
-                },
-                "statistical_arbitrage": {
-                    "signal": stat_arb_signals["signal"],
-                    "confidence": round(stat_arb_signals["confidence"] * 100),
-                    "metrics": normalize_pandas(stat_arb_signals["metrics"]),
-                },
-            },
-        }
+    if not analyzed:
+        technical_analysis = {}
+    elif indicator_states is not None:
+        technical_analysis = analyze_indicator_snapshot(indicator_states.snapshot(analyzed))
+    else:
+        technical_analysis = analyze_indicator_snapshot(calculate_indicator_snapshot(PricePanel(frames)))
+    for ticker in analyzed:
         progress.update_status("technical_analyst_agent", ticker, "Done")
 
     # Create the technical analyst message
@@ -135,215 +98,469 @@ def technical_analyst_agent(state: AgentState):
     }
 
 
-def calculate_trend_signals(prices_df):
+class PricePanel:
     """
-    Advanced trend following strategy using multiple timeframes and indicators
+    OHLCV prices of many tickers as (bar x ticker) arrays, right-aligned so that every
+    ticker's latest bar is the last row. Shorter histories are padded with NaN at the top,
+    so windowed and exponentially weighted statistics match running each ticker on its own.
+
+    Intermediates used by more than one indicator are computed once and cached.
     """
-    # Calculate EMAs for multiple timeframes
-    ema_8 = calculate_ema(prices_df, 8)
-    ema_21 = calculate_ema(prices_df, 21)
-    ema_55 = calculate_ema(prices_df, 55)
 
-    # Calculate ADX for trend strength
-    adx = calculate_adx(prices_df, 14)
+    FIELDS = ("open", "high", "low", "close", "volume")
+
+    def __init__(self, frames: dict[str, pd.DataFrame]):
+        self.tickers = list(frames)
+        length = max(len(frame) for frame in frames.values())
+        for field in self.FIELDS:
+            values = np.full((length, len(self.tickers)), np.nan)
+            for index, frame in enumerate(frames.values()):
+                values[length - len(frame) :, index] = frame[field].to_numpy(dtype=float)
+            setattr(self, field, values)
+
+    @cached_property
+    def valid(self) -> np.ndarray:
+        """Mask of real (non-padding) bars."""
+        return ~np.isnan(self.close)
+
+    @cached_property
+    def close_diff(self) -> np.ndarray:
+        return np.vstack([np.full((1, len(self.tickers)), np.nan), np.diff(self.close, axis=0)])
+
+    @cached_property
+    def returns(self) -> np.ndarray:
+        return self.close_diff / np.vstack([np.full((1, len(self.tickers)), np.nan), self.close[:-1]])
+
+    @cached_property
+    def true_range(self) -> np.ndarray:
+        previous_close = np.vstack([np.full((1, len(self.tickers)), np.nan), self.close[:-1]])
+        # fmax skips the missing previous close on each ticker's first bar
+        return np.fmax(self.high - self.low, np.fmax(np.abs(self.high - previous_close), np.abs(self.low - previous_close)))
+
+
+def calculate_indicator_snapshot(panel: PricePanel) -> pd.DataFrame:
+    """
+    Compute every indicator the strategies use at the latest bar, for all tickers at once.
+
+    Returns a DataFrame indexed by ticker with one column per indicator.
+    """
+    close = panel.close[-1]
+    returns = panel.returns
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Trend: EMAs for multiple timeframes and ADX for trend strength
+        snapshot = {
+            "ema_8": calculate_ema(panel, 8),
+            "ema_21": calculate_ema(panel, 21),
+            "ema_55": calculate_ema(panel, 55),
+            "adx": calculate_adx(panel, 14),
+        }
+
+        # Mean reversion: z-score against the 50-bar mean, Bollinger Bands and RSI
+        closes_50 = _tail(panel.close, 50)
+        snapshot["z_score"] = (close - closes_50.mean(axis=0)) / closes_50.std(axis=0, ddof=1)
+        bb_upper, bb_lower = calculate_bollinger_bands(panel)
+        snapshot["price_vs_bb"] = (close - bb_lower) / (bb_upper - bb_lower)
+        snapshot["rsi_14"] = calculate_rsi(panel, 14)
+        snapshot["rsi_28"] = calculate_rsi(panel, 28)
+
+        # Momentum: summed returns over 1, 3 and 6 months, and volume against its 21-bar mean
+        snapshot["momentum_1m"] = _tail(returns, 21).sum(axis=0)
+        snapshot["momentum_3m"] = _tail(returns, 63).sum(axis=0)
+        snapshot["momentum_6m"] = _tail(returns, 126).sum(axis=0)
+        snapshot["volume_momentum"] = panel.volume[-1] / _tail(panel.volume, 21).mean(axis=0)
+
+        # Volatility: 21-bar annualized volatility over the last 63 bars, its regime and z-score
+        hist_vol = sliding_window_view(_tail(returns, 63 + 20), 21, axis=0).std(axis=-1, ddof=1) * math.sqrt(252)
+        vol_ma = hist_vol.mean(axis=0)
+        snapshot["historical_volatility"] = hist_vol[-1]
+        snapshot["volatility_regime"] = hist_vol[-1] / vol_ma
+        snapshot["volatility_z_score"] = (hist_vol[-1] - vol_ma) / hist_vol.std(axis=0, ddof=1)
+        snapshot["atr_ratio"] = calculate_atr(panel) / close
+
+        # Statistical arbitrage: Hurst exponent and shape of the 63-bar return distribution
+        snapshot["hurst_exponent"] = calculate_hurst_exponents(panel.close.T)
+        snapshot["skewness"], snapshot["kurtosis"] = _skew_kurtosis(_tail(returns, 63))
+
+    return pd.DataFrame(snapshot, index=panel.tickers)
+
+
+class _RollingWindow:
+    """Running power sums of the last `size` values, updated in O(1) per value."""
+
+    def __init__(self, size: int, moments: int = 1):
+        self.size = size
+        self.values = deque()
+        self.sums = [0.0] * moments
+        self._evictions = 0
+
+    def push(self, value: float):
+        self.values.append(value)
+        for power in range(len(self.sums)):
+            self.sums[power] += value ** (power + 1)
+        if len(self.values) > self.size:
+            evicted = self.values.popleft()
+            for power in range(len(self.sums)):
+                self.sums[power] -= evicted ** (power + 1)
+            # Re-sum once per window length so rounding error cannot accumulate
+            self._evictions += 1
+            if self._evictions == self.size:
+                self._evictions = 0
+                self.sums = [sum(value ** (power + 1) for value in self.values) for power in range(len(self.sums))]
+
+    @property
+    def full(self) -> bool:
+        return len(self.values) == self.size
+
+    def sum(self) -> float:
+        return self.sums[0] if self.full else np.nan
+
+    def mean(self) -> float:
+        return self.sums[0] / self.size if self.full else np.nan
+
+    def std(self) -> float:
+        if not self.full:
+            return np.nan
+        variance = (self.sums[1] - self.sums[0] ** 2 / self.size) / (self.size - 1)
+        return math.sqrt(max(variance, 0.0))
+
+    def skew_kurtosis(self) -> tuple[float, float]:
+        if not self.full:
+            return np.nan, np.nan
+        count = self.size
+        mean = self.sums[0] / count
+        s2, s3, s4 = (total / count for total in self.sums[1:4])
+        m2 = np.float64(s2 - mean**2)
+        m3 = s3 - 3 * mean * s2 + 2 * mean**3
+        m4 = s4 - 4 * mean * s3 + 6 * mean**2 * s2 - 3 * mean**4
+        skew = math.sqrt(count * (count - 1)) * m3 / ((count - 2) * m2**1.5)
+        kurtosis = ((count * count - 1) * m4 / m2**2 - 3 * (count - 1) ** 2) / ((count - 2) * (count - 3))
+        return skew, kurtosis
+
+
+class _EwmState:
+    """Exponentially weighted mean of a stream, matching pandas' `ewm(span=...).mean()`."""
+
+    def __init__(self, span: int, adjust: bool = True):
+        self.alpha = 2.0 / (span + 1.0)
+        self.adjust = adjust
+        self.value = np.nan
+        self.old_weight = 1.0
+
+    def update(self, value: float) -> float:
+        if np.isnan(self.value):
+            self.value = value
+            return self.value
+        self.old_weight *= 1 - self.alpha
+        if not np.isnan(value):
+            new_weight = 1.0 if self.adjust else self.alpha
+            self.value = (self.old_weight * self.value + new_weight * value) / (self.old_weight + new_weight)
+            self.old_weight = self.old_weight + new_weight if self.adjust else 1.0
+        return self.value
+
+
+class IndicatorState:
+    """
+    Streaming technical indicators of one ticker.
+
+    `update` folds in one bar in O(1); `snapshot` returns the values calculate_indicator_snapshot
+    computes from the full history seen so far, with the Hurst exponent over the last HURST_WINDOW closes.
+    """
+
+    def __init__(self):
+        self.last_time: str | None = None
+        self.previous: tuple[float, float, float] | None = None
+        self.close = self.volume = np.nan
+        self.emas = {span: _EwmState(span, adjust=False) for span in (8, 21, 55)}
+        self.smoothed_tr, self.plus_dm, self.minus_dm, self.adx = (_EwmState(14) for _ in range(4))
+        self.closes_50 = _RollingWindow(50, moments=2)
+        self.closes_20 = _RollingWindow(20, moments=2)
+        self.gains = {period: _RollingWindow(period) for period in (14, 28)}
+        self.losses = {period: _RollingWindow(period) for period in (14, 28)}
+        self.returns_21 = _RollingWindow(21, moments=2)
+        self.returns_63 = _RollingWindow(63, moments=4)
+        self.returns_126 = _RollingWindow(126)
+        self.hist_vol_63 = _RollingWindow(63, moments=2)
+        self.volumes_21 = _RollingWindow(21)
+        self.true_ranges_14 = _RollingWindow(14)
+        self.hurst_closes = deque(maxlen=HURST_WINDOW)
+
+    def update(self, time: str, high: float, low: float, close: float, volume: float):
+        """Fold in the next bar."""
+        # NumPy scalars so flat bars divide to inf/NaN like the vectorized engine instead of raising
+        high, low, close, volume = np.float64(high), np.float64(low), np.float64(close), np.float64(volume)
+        if self.previous is None:
+            true_range, plus_dm, minus_dm, change, ret = high - low, 0.0, 0.0, 0.0, np.nan
+        else:
+            previous_high, previous_low, previous_close = self.previous
+            true_range = max(high - low, abs(high - previous_close), abs(low - previous_close))
+            up_move, down_move = high - previous_high, previous_low - low
+            plus_dm = up_move if up_move > down_move and up_move > 0 else 0.0
+            minus_dm = down_move if down_move > up_move and down_move > 0 else 0.0
+            change = close - previous_close
+            ret = change / previous_close
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for ema in self.emas.values():
+                ema.update(close)
+            smoothed_tr = self.smoothed_tr.update(true_range)
+            plus_di = 100 * (self.plus_dm.update(plus_dm) / smoothed_tr)
+            minus_di = 100 * (self.minus_dm.update(minus_dm) / smoothed_tr)
+            self.adx.update(100 * abs(plus_di - minus_di) / (plus_di + minus_di))
+
+            self.closes_50.push(close)
+            self.closes_20.push(close)
+            for period in (14, 28):
+                self.gains[period].push(max(change, 0.0))
+                self.losses[period].push(max(-change, 0.0))
+            if not np.isnan(ret):
+                self.returns_21.push(ret)
+                self.returns_63.push(ret)
+                self.returns_126.push(ret)
+                if self.returns_21.full:
+                    self.hist_vol_63.push(self.returns_21.std() * math.sqrt(252))
+            self.volumes_21.push(volume)
+            self.true_ranges_14.push(true_range)
+
+        self.hurst_closes.append(close)
+        self.previous = (high, low, close)
+        self.close, self.volume, self.last_time = close, volume, time
+
+    def update_frame(self, prices_df: pd.DataFrame):
+        """Fold in the bars of a price frame that are newer than the last one seen."""
+        times = prices_df["time"].to_numpy(dtype=str)
+        start = 0 if self.last_time is None else times.searchsorted(self.last_time, side="right")
+        columns = [prices_df[field].to_numpy(dtype=float)[start:] for field in ("high", "low", "close", "volume")]
+        for time, high, low, close, volume in zip(times[start:], *columns):
+            self.update(time, high, low, close, volume)
+
+    def snapshot(self) -> dict[str, float]:
+        """Indicator values at the latest bar, keyed like calculate_indicator_snapshot's columns."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            close = self.close
+            sma_20, std_20 = self.closes_20.mean(), self.closes_20.std()
+            bb_upper, bb_lower = sma_20 + std_20 * 2, sma_20 - std_20 * 2
+            hist_vol = self.returns_21.std() * math.sqrt(252)
+            vol_ma = self.hist_vol_63.mean()
+            skew, kurtosis = self.returns_63.skew_kurtosis()
+            return {
+                "ema_8": self.emas[8].value,
+                "ema_21": self.emas[21].value,
+                "ema_55": self.emas[55].value,
+                "adx": self.adx.value,
+                "z_score": (close - self.closes_50.mean()) / np.float64(self.closes_50.std()),
+                "price_vs_bb": (close - bb_lower) / np.float64(bb_upper - bb_lower),
+                "rsi_14": 100 - (100 / (1 + self.gains[14].mean() / np.float64(self.losses[14].mean()))),
+                "rsi_28": 100 - (100 / (1 + self.gains[28].mean() / np.float64(self.losses[28].mean()))),
+                "momentum_1m": self.returns_21.sum(),
+                "momentum_3m": self.returns_63.sum(),
+                "momentum_6m": self.returns_126.sum(),
+                "volume_momentum": self.volume / np.float64(self.volumes_21.mean()),
+                "historical_volatility": hist_vol,
+                "volatility_regime": hist_vol / np.float64(vol_ma),
+                "volatility_z_score": (hist_vol - vol_ma) / np.float64(self.hist_vol_63.std()),
+                "atr_ratio": self.true_ranges_14.mean() / close,
+                "hurst_exponent": calculate_hurst_exponent(np.fromiter(self.hurst_closes, dtype=float)),
+                "skewness": skew,
+                "kurtosis": kurtosis,
+            }
+
+
+class IndicatorStates:
+    """
+    IndicatorState per ticker, carried across technical analyst calls (e.g. the days of a backtest)
+    so each call only folds in new bars instead of recomputing every indicator from scratch.
+    """
+
+    def __init__(self, history_start: str):
+        # First date to warm the indicators up from
+        self.history_start = history_start
+        self.states: dict[str, IndicatorState] = {}
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker in self.states
+
+    def resume_date(self, ticker: str) -> str:
+        """First date whose bars a ticker's state may still be missing."""
+        state = self.states.get(ticker)
+        return state.last_time[:10] if state is not None else self.history_start
+
+    def update(self, ticker: str, prices_df: pd.DataFrame):
+        if prices_df.empty:
+            return
+        self.states.setdefault(ticker, IndicatorState()).update_frame(prices_df)
+
+    def snapshot(self, tickers: list[str]) -> pd.DataFrame:
+        return pd.DataFrame([self.states[ticker].snapshot() for ticker in tickers], index=tickers)
+
+
+def analyze_indicator_snapshot(snapshot: pd.DataFrame) -> dict[str, dict]:
+    """Run every strategy over an indicator snapshot and build each ticker's technical analysis report."""
+    signals = {
+        "trend": calculate_trend_signals(snapshot),
+        "mean_reversion": calculate_mean_reversion_signals(snapshot),
+        "momentum": calculate_momentum_signals(snapshot),
+        "volatility": calculate_volatility_signals(snapshot),
+        "stat_arb": calculate_stat_arb_signals(snapshot),
+    }
+    report_names = {
+        "trend": "trend_following",
+        "mean_reversion": "mean_reversion",
+        "momentum": "momentum",
+        "volatility": "volatility",
+        "stat_arb": "statistical_arbitrage",
+    }
+    # Plain dicts for the per-ticker loop; Series lookups are slow at universe scale
+    signals = {
+        strategy: {
+            "signal": strategy_signals["signal"].to_dict(),
+            "confidence": strategy_signals["confidence"].astype(float).to_dict(),
+            "metrics": {name: values.astype(float).to_dict() for name, values in strategy_signals["metrics"].items()},
+        }
+        for strategy, strategy_signals in signals.items()
+    }
+
+    technical_analysis = {}
+    for ticker in snapshot.index:
+        ticker_signals = {
+            strategy: {
+                "signal": strategy_signals["signal"][ticker],
+                "confidence": strategy_signals["confidence"][ticker],
+                "metrics": {name: values[ticker] for name, values in strategy_signals["metrics"].items()},
+            }
+            for strategy, strategy_signals in signals.items()
+        }
+
+        # Combine all signals using a weighted ensemble approach
+        combined_signal = weighted_signal_combination(ticker_signals, STRATEGY_WEIGHTS)
 
+        # Generate detailed analysis report for this ticker
+        technical_analysis[ticker] = {
+            "signal": combined_signal["signal"],
+            "confidence": round(combined_signal["confidence"] * 100),
+            "strategy_signals": {
+                report_names[strategy]: {
+                    "signal": signal["signal"],
+                    "confidence": round(signal["confidence"] * 100),
+                    "metrics": signal["metrics"],
+                }
+                for strategy, signal in ticker_signals.items()
+            },
+        }
+    return technical_analysis
+
+
+def _select_signal(bullish: pd.Series, bearish: pd.Series) -> pd.Series:
+    """Label each ticker bullish or bearish by the first matching mask, neutral otherwise."""
+    return pd.Series(np.select([bullish, bearish], ["bullish", "bearish"], "neutral"), index=bullish.index)
+
+
+def calculate_trend_signals(snapshot: pd.DataFrame) -> dict:
+    """
+    Advanced trend following strategy using multiple timeframes and indicators
+    """
     # Determine trend direction and strength
-    short_trend = ema_8 > ema_21
-    medium_trend = ema_21 > ema_55
+    short_trend = snapshot["ema_8"] > snapshot["ema_21"]
+    medium_trend = snapshot["ema_21"] > snapshot["ema_55"]
 
     # Combine signals with confidence weighting
-    trend_strength = adx["adx"].iloc[-1] / 100.0
+    trend_strength = snapshot["adx"] / 100.0
 
-    if short_trend.iloc[-1] and medium_trend.iloc[-1]:
-        signal = "bullish"
-        confidence = trend_strength
-    elif not short_trend.iloc[-1] and not medium_trend.iloc[-1]:
-        signal = "bearish"
-        confidence = trend_strength
-    else:
-        signal = "neutral"
-        confidence = 0.5
+    bullish = short_trend & medium_trend
+    bearish = ~short_trend & ~medium_trend
 
     return {
-        "signal": signal,
-        "confidence": confidence,
+        "signal": _select_signal(bullish, bearish),
+        "confidence": trend_strength.where(bullish | bearish, 0.5),
         "metrics": {
-            "adx": float(adx["adx"].iloc[-1]),
-            "trend_strength": float(trend_strength),
+            "adx": snapshot["adx"],
+            "trend_strength": trend_strength,
         },
     }
 
 
-def calculate_mean_reversion_signals(prices_df):
+def calculate_mean_reversion_signals(snapshot: pd.DataFrame) -> dict:
     """
     Mean reversion strategy using statistical measures and Bollinger Bands
     """
-    # Calculate z-score of price relative to moving average
-    ma_50 = prices_df["close"].rolling(window=50).mean()
-    std_50 = prices_df["close"].rolling(window=50).std()
-    z_score = (prices_df["close"] - ma_50) / std_50
-
-    # Calculate Bollinger Bands
-    bb_upper, bb_lower = calculate_bollinger_bands(prices_df)
-
-    # Calculate RSI with multiple timeframes
-    rsi_14 = calculate_rsi(prices_df, 14)
-    rsi_28 = calculate_rsi(prices_df, 28)
-
-    # Mean reversion signals
-    price_vs_bb = (prices_df["close"].iloc[-1] - bb_lower.iloc[-1]) / (bb_upper.iloc[-1] - bb_lower.iloc[-1])
+    z_score = snapshot["z_score"]
+    price_vs_bb = snapshot["price_vs_bb"]
 
     # Combine signals
-    if z_score.iloc[-1] < -2 and price_vs_bb < 0.2:
-        signal = "bullish"
-        confidence = min(abs(z_score.iloc[-1]) / 4, 1.0)
-    elif z_score.iloc[-1] > 2 and price_vs_bb > 0.8:
-        signal = "bearish"
-        confidence = min(abs(z_score.iloc[-1]) / 4, 1.0)
-    else:
-        signal = "neutral"
-        confidence = 0.5
+    bullish = (z_score < -2) & (price_vs_bb < 0.2)
+    bearish = (z_score > 2) & (price_vs_bb > 0.8)
 
     return {
-        "signal": signal,
-        "confidence": confidence,
+        "signal": _select_signal(bullish, bearish),
+        "confidence": np.minimum(z_score.abs() / 4, 1.0).where(bullish | bearish, 0.5),
         "metrics": {
-            "z_score": float(z_score.iloc[-1]),
-            "price_vs_bb": float(price_vs_bb),
-            "rsi_14": float(rsi_14.iloc[-1]),
-            "rsi_28": float(rsi_28.iloc[-1]),
+            "z_score": z_score,
+            "price_vs_bb": price_vs_bb,
+            "rsi_14": snapshot["rsi_14"],
+            "rsi_28": snapshot["rsi_28"],
         },
     }
 
 
-def calculate_momentum_signals(prices_df):
+def calculate_momentum_signals(snapshot: pd.DataFrame) -> dict:
     """
     Multi-factor momentum strategy
     """
-    # Price momentum
-    returns = prices_df["close"].pct_change()
-    mom_1m = returns.rolling(21).sum()
-    mom_3m = returns.rolling(63).sum()
-    mom_6m = returns.rolling(126).sum()
-
-    # Volume momentum
-    volume_ma = prices_df["volume"].rolling(21).mean()
-    volume_momentum = prices_df["volume"] / volume_ma
-
     # Relative strength
     # (would compare to market/sector in real implementation)
 
     # Calculate momentum score
-    momentum_score = (0.4 * mom_1m + 0.3 * mom_3m + 0.3 * mom_6m).iloc[-1]
+    momentum_score = 0.4 * snapshot["momentum_1m"] + 0.3 * snapshot["momentum_3m"] + 0.3 * snapshot["momentum_6m"]
 
     # Volume confirmation
-    volume_confirmation = volume_momentum.iloc[-1] > 1.0
+    volume_confirmation = snapshot["volume_momentum"] > 1.0
 
-    if momentum_score > 0.05 and volume_confirmation:
-        signal = "bullish"
-        confidence = min(abs(momentum_score) * 5, 1.0)
-    elif momentum_score < -0.05 and volume_confirmation:
-        signal = "bearish"
-        confidence = min(abs(momentum_score) * 5, 1.0)
-    else:
-        signal = "neutral"
-        confidence = 0.5
+    bullish = (momentum_score > 0.05) & volume_confirmation
+    bearish = (momentum_score < -0.05) & volume_confirmation
 
     return {
-        "signal": signal,
-        "confidence": confidence,
-        "metrics": {
-            "momentum_1m": float(mom_1m.iloc[-1]),
-            "momentum_3m": float(mom_3m.iloc[-1]),
-            "momentum_6m": float(mom_6m.iloc[-1]),
-            "volume_momentum": float(volume_momentum.iloc[-1]),
-        },
+        "signal": _select_signal(bullish, bearish),
+        "confidence": np.minimum(momentum_score.abs() * 5, 1.0).where(bullish | bearish, 0.5),
+        "metrics": {name: snapshot[name] for name in ["momentum_1m", "momentum_3m", "momentum_6m", "volume_momentum"]},
     }
 
 
-def calculate_volatility_signals(prices_df):
+def calculate_volatility_signals(snapshot: pd.DataFrame) -> dict:
     """
     Volatility-based trading strategy
     """
-    # Calculate various volatility metrics
-    returns = prices_df["close"].pct_change()
-
-    # Historical volatility
-    hist_vol = returns.rolling(21).std() * math.sqrt(252)
-
-    # Volatility regime detection
-    vol_ma = hist_vol.rolling(63).mean()
-    vol_regime = hist_vol / vol_ma
-
-    # Volatility mean reversion
-    vol_z_score = (hist_vol - vol_ma) / hist_vol.rolling(63).std()
-
-    # ATR ratio
-    atr = calculate_atr(prices_df)
-    atr_ratio = atr / prices_df["close"]
+    vol_regime = snapshot["volatility_regime"]
+    vol_z = snapshot["volatility_z_score"]
 
     # Generate signal based on volatility regime
-    current_vol_regime = vol_regime.iloc[-1]
-    vol_z = vol_z_score.iloc[-1]
-
-    if current_vol_regime < 0.8 and vol_z < -1:
-        signal = "bullish"  # Low vol regime, potential for expansion
-        confidence = min(abs(vol_z) / 3, 1.0)
-    elif current_vol_regime > 1.2 and vol_z > 1:
-        signal = "bearish"  # High vol regime, potential for contraction
-        confidence = min(abs(vol_z) / 3, 1.0)
-    else:
-        signal = "neutral"
-        confidence = 0.5
+    bullish = (vol_regime < 0.8) & (vol_z < -1)  # Low vol regime, potential for expansion
+    bearish = (vol_regime > 1.2) & (vol_z > 1)  # High vol regime, potential for contraction
 
     return {
-        "signal": signal,
-        "confidence": confidence,
-        "metrics": {
-            "historical_volatility": float(hist_vol.iloc[-1]),
-            "volatility_regime": float(current_vol_regime),
-            "volatility_z_score": float(vol_z),
-            "atr_ratio": float(atr_ratio.iloc[-1]),
-        },
+        "signal": _select_signal(bullish, bearish),
+        "confidence": np.minimum(vol_z.abs() / 3, 1.0).where(bullish | bearish, 0.5),
+        "metrics": {name: snapshot[name] for name in ["historical_volatility", "volatility_regime", "volatility_z_score", "atr_ratio"]},
     }
 
 
-def calculate_stat_arb_signals(prices_df):
+def calculate_stat_arb_signals(snapshot: pd.DataFrame) -> dict:
     """
     Statistical arbitrage signals based on price action analysis
     """
-    # Calculate price distribution statistics
-    returns = prices_df["close"].pct_change()
-
-    # Skewness and kurtosis
-    skew = returns.rolling(63).skew()
-    kurt = returns.rolling(63).kurt()
-
-    # Test for mean reversion using Hurst exponent
-    hurst = calculate_hurst_exponent(prices_df["close"])
+    hurst = snapshot["hurst_exponent"]
+    skew = snapshot["skewness"]
 
     # Correlation analysis
     # (would include correlation with related securities in real implementation)
 
     # Generate signal based on statistical properties
-    if hurst < 0.4 and skew.iloc[-1] > 1:
-        signal = "bullish"
-        confidence = (0.5 - hurst) * 2
-    elif hurst < 0.4 and skew.iloc[-1] < -1:
-        signal = "bearish"
-        confidence = (0.5 - hurst) * 2
-    else:
-        signal = "neutral"
-        confidence = 0.5
+    bullish = (hurst < 0.4) & (skew > 1)
+    bearish = (hurst < 0.4) & (skew < -1)
 
     return {
-        "signal": signal,
-        "confidence": confidence,
-        "metrics": {
-            "hurst_exponent": float(hurst),
-            "skewness": float(skew.iloc[-1]),
-            "kurtosis": float(kurt.iloc[-1]),
-        },
+        "signal": _select_signal(bullish, bearish),
+        "confidence": ((0.5 - hurst) * 2).where(bullish | bearish, 0.5),
+        "metrics": {name: snapshot[name] for name in ["hurst_exponent", "skewness", "kurtosis"]},
     }
 
 
@@ -382,107 +599,124 @@ def weighted_signal_combination(signals, weights):
     return {"signal": signal, "confidence": abs(final_score)}
 
 
-def normalize_pandas(obj):
-    """Convert pandas Series/DataFrames to primitive Python types"""
-    if isinstance(obj, pd.Series):
-        return obj.tolist()
-    elif isinstance(obj, pd.DataFrame):
-        return obj.to_dict("records")
-    elif isinstance(obj, dict):
-        return {k: normalize_pandas(v) for k, v in obj.items()}
-    elif isinstance(obj, (list, tuple)):
-        return [normalize_pandas(item) for item in obj]
-    return obj
-
-
-def calculate_rsi(prices_df: pd.DataFrame, period: int = 14) -> pd.Series:
-    delta = prices_df["close"].diff()
-    gain = (delta.where(delta > 0, 0)).fillna(0)
-    loss = (-delta.where(delta < 0, 0)).fillna(0)
-    avg_gain = gain.rolling(window=period).mean()
-    avg_loss = loss.rolling(window=period).mean()
+def _tail(values: np.ndarray, window: int, fill: float | bool = np.nan) -> np.ndarray:
+    """Last `window` bars of a panel array, padded at the top with `fill` when the history is shorter."""
+    if len(values) >= window:
+        return values[-window:]
+    return np.vstack([np.full((window - len(values), values.shape[1]), fill, dtype=values.dtype), values])
+
+
+def _ewm(values: np.ndarray, span: int, adjust: bool = True) -> np.ndarray:
+    """
+    Exponentially weighted mean down each column, following pandas' `ewm(span=...).mean()`:
+    each column starts at its first observation and carries its weights across missing bars.
+    """
+    alpha = 2.0 / (span + 1.0)
+    new_weight = 1.0 if adjust else alpha
+    weighted = values[0].copy()
+    old_weight = np.ones(values.shape[1])
+    result = np.empty_like(values)
+    result[0] = weighted
+    for index in range(1, len(values)):
+        current = values[index]
+        observed = ~np.isnan(current)
+        started = ~np.isnan(weighted)
+        update = started & observed
+        old_weight = np.where(started, old_weight * (1 - alpha), old_weight)
+        weighted = np.where(update, (old_weight * weighted + new_weight * current) / (old_weight + new_weight), weighted)
+        old_weight = np.where(update, old_weight + new_weight if adjust else 1.0, old_weight)
+        # Columns whose history starts on this bar
+        weighted = np.where(~started & observed, current, weighted)
+        result[index] = weighted
+    return result
+
+
+def _skew_kurtosis(window: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Bias-corrected sample skewness and excess kurtosis of each column, as pandas computes them."""
+    count = len(window)
+    deviations = window - window.mean(axis=0)
+    m2 = (deviations**2).mean(axis=0)
+    m3 = (deviations**3).mean(axis=0)
+    m4 = (deviations**4).mean(axis=0)
+    skew = np.sqrt(count * (count - 1)) * m3 / ((count - 2) * m2**1.5)
+    kurtosis = ((count * count - 1) * m4 / m2**2 - 3 * (count - 1) ** 2) / ((count - 2) * (count - 3))
+    return skew, kurtosis
+
+
+def calculate_rsi(panel: PricePanel, period: int = 14) -> np.ndarray:
+    """Latest RSI of each ticker from simple averages of gains and losses over `period` bars."""
+    delta = _tail(panel.close_diff, period)
+    # The first bar of each history has no change and counts as flat
+    delta = np.where(np.isnan(delta) & _tail(panel.valid, period, fill=False), 0.0, delta)
+    avg_gain = np.where(delta > 0, delta, np.where(np.isnan(delta), np.nan, 0.0)).mean(axis=0)
+    avg_loss = np.where(delta < 0, -delta, np.where(np.isnan(delta), np.nan, 0.0)).mean(axis=0)
     rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
+    return 100 - (100 / (1 + rs))
 
 
-def calculate_bollinger_bands(prices_df: pd.DataFrame, window: int = 20) -> tuple[pd.Series, pd.Series]:
-    sma = prices_df["close"].rolling(window).mean()
-    std_dev = prices_df["close"].rolling(window).std()
-    upper_band = sma + (std_dev * 2)
-    lower_band = sma - (std_dev * 2)
-    return upper_band, lower_band
+def calculate_bollinger_bands(panel: PricePanel, window: int = 20) -> tuple[np.ndarray, np.ndarray]:
+    """Latest upper and lower Bollinger Band of each ticker."""
+    closes = _tail(panel.close, window)
+    sma = closes.mean(axis=0)
+    std_dev = closes.std(axis=0, ddof=1)
+    return sma + (std_dev * 2), sma - (std_dev * 2)
 
 
-def calculate_ema(df: pd.DataFrame, window: int) -> pd.Series:
+def calculate_ema(panel: PricePanel, window: int) -> np.ndarray:
     """
     Calculate Exponential Moving Average
 
     Args:
-        df: DataFrame with price data
+        panel: Price panel
         window: EMA period
 
     Returns:
-        pd.Series: EMA values
+        np.ndarray: Latest EMA of each ticker
     """
-    return df["close"].ewm(span=window, adjust=False).mean()
+    return _ewm(panel.close, window, adjust=False)[-1]
 
 
-def calculate_adx(df: pd.DataFrame, period: int = 14) -> pd.DataFrame:
+def calculate_adx(panel: PricePanel, period: int = 14) -> np.ndarray:
     """
     Calculate Average Directional Index (ADX)
 
     Args:
-        df: DataFrame with OHLC data
+        panel: Price panel
         period: Period for calculations
 
     Returns:
-        DataFrame with ADX values
+        np.ndarray: Latest ADX of each ticker
     """
-    # Calculate True Range
-    df["high_low"] = df["high"] - df["low"]
-    df["high_close"] = abs(df["high"] - df["close"].shift())
-    df["low_close"] = abs(df["low"] - df["close"].shift())
-    df["tr"] = df[["high_low", "high_close", "low_close"]].max(axis=1)
-
     # Calculate Directional Movement
-    df["up_move"] = df["high"] - df["high"].shift()
-    df["down_move"] = df["low"].shift() - df["low"]
+    up_move = np.vstack([np.full((1, len(panel.tickers)), np.nan), np.diff(panel.high, axis=0)])
+    down_move = np.vstack([np.full((1, len(panel.tickers)), np.nan), -np.diff(panel.low, axis=0)])
 
-    df["plus_dm"] = np.where((df["up_move"] > df["down_move"]) & (df["up_move"] > 0), df["up_move"], 0)
-    df["minus_dm"] = np.where((df["down_move"] > df["up_move"]) & (df["down_move"] > 0), df["down_move"], 0)
+    plus_dm = np.where(panel.valid, np.where((up_move > down_move) & (up_move > 0), up_move, 0.0), np.nan)
+    minus_dm = np.where(panel.valid, np.where((down_move > up_move) & (down_move > 0), down_move, 0.0), np.nan)
 
     # Calculate ADX
-    df["+di"] = 100 * (df["plus_dm"].ewm(span=period).mean() / df["tr"].ewm(span=period).mean())
-    df["-di"] = 100 * (df["minus_dm"].ewm(span=period).mean() / df["tr"].ewm(span=period).mean())
-    df["dx"] = 100 * abs(df["+di"] - df["-di"]) / (df["+di"] + df["-di"])
-    df["adx"] = df["dx"].ewm(span=period).mean()
-
-    return df[["adx", "+di", "-di"]]
+    smoothed_tr = _ewm(panel.true_range, period)
+    plus_di = 100 * (_ewm(plus_dm, period) / smoothed_tr)
+    minus_di = 100 * (_ewm(minus_dm, period) / smoothed_tr)
+    dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+    return _ewm(dx, period)[-1]
 
 
-def calculate_atr(df: pd.DataFrame, period: int = 14) -> pd.Series:
+def calculate_atr(panel: PricePanel, period: int = 14) -> np.ndarray:
     """
     Calculate Average True Range
 
     Args:
-        df: DataFrame with OHLC data
+        panel: Price panel
         period: Period for ATR calculation
 
     Returns:
-        pd.Series: ATR values
+        np.ndarray: Latest ATR of each ticker
     """
-    high_low = df["high"] - df["low"]
-    high_close = abs(df["high"] - df["close"].shift())
-    low_close = abs(df["low"] - df["close"].shift())
+    return _tail(panel.true_range, period).mean(axis=0)
 
-    ranges = pd.concat([high_low, high_close, low_close], axis=1)
-    true_range = ranges.max(axis=1)
 
-    return true_range.rolling(period).mean()
-
-
-def calculate_hurst_exponent(price_series: pd.Series, max_lag: int = 20) -> float:
+def calculate_hurst_exponent(price_series: pd.Series | np.ndarray, max_lag: int = 20) -> float:
     """
     Calculate Hurst Exponent to determine long-term memory of time series
     H < 0.5: Mean reverting series
@@ -491,19 +725,42 @@ def calculate_hurst_exponent(price_series: pd.Series, max_lag: int = 20) -> floa
 
     Args:
         price_series: Array-like price data
-        max_lag: Maximum lag for R/S calculation
+        max_lag: Maximum lag for the lagged-difference scaling
 
     Returns:
         float: Hurst exponent
     """
-    lags = range(2, max_lag)
-    # Add small epsilon to avoid log(0)
-    tau = [max(1e-8, np.sqrt(np.std(np.subtract(price_series[lag:], price_series[:-lag])))) for lag in lags]
-
-    # Return the Hurst exponent from linear fit
-    try:
-        reg = np.polyfit(np.log(lags), np.log(tau), 1)
-        return reg[0]  # Hurst exponent is the slope
-    except (ValueError, RuntimeWarning):
-        # Return 0.5 (random walk) if calculation fails
-        return 0.5
+    return float(calculate_hurst_exponents(np.asarray(price_series, dtype=float)[np.newaxis, :], max_lag)[0])
+
+
+def calculate_hurst_exponents(prices: np.ndarray, max_lag: int = 20) -> np.ndarray:
+    """
+    Hurst exponent of every row of a (tickers x time) price matrix.
+
+    The standard deviation of lag-k price differences scales like k**H, so H is the slope of
+    log(std) against log(k) for k in 2..max_lag-1. Differences for every lag come from one strided
+    view over the NaN-padded prices, so rows may be left-padded with NaN for shorter histories.
+    Rows with fewer than two usable lags get 0.5 (random walk).
+    """
+    lags = np.arange(2, max_lag)
+    series_count, length = prices.shape
+    # windows[i, t, k] = prices[i, t + k], NaN past the end of the row
+    padded = np.concatenate([prices, np.full((series_count, max_lag), np.nan)], axis=1)
+    windows = sliding_window_view(padded, max_lag, axis=1)[:, :length]
+    differences = windows[:, :, lags] - windows[:, :, :1]
+
+    with np.errstate(divide="ignore", invalid="ignore"), warnings.catch_warnings():
+        # Rows too short for a lag yield an all-NaN slice; those lags are dropped from the fit
+        warnings.simplefilter("ignore", RuntimeWarning)
+        tau = np.nanstd(differences, axis=1)
+        # Flat stretches have zero spread; floor it to avoid log(0)
+        log_tau = np.log(np.maximum(tau, 1e-8))
+
+        # Least-squares slope of log(tau) on log(lag), over the lags each row has data for
+        usable = ~np.isnan(log_tau)
+        log_lags = np.where(usable, np.log(lags), np.nan)
+        lag_deviation = log_lags - np.nanmean(log_lags, axis=1, keepdims=True)
+        tau_deviation = log_tau - np.nanmean(log_tau, axis=1, keepdims=True)
+        slope = np.nansum(lag_deviation * tau_deviation, axis=1) / np.nansum(lag_deviation**2, axis=1)
+
+    return np.where(usable.sum(axis=1) >= 2, slope, 0.5)
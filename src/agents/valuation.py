@@ -1,11 +1,26 @@
 from langchain_core.messages import HumanMessage
 from src.graph.state import AgentState, show_agent_reasoning
 from src.utils.progress import progress
+from src.utils.concurrency import map_tickers
 import json
 
 from src.tools.api import get_financial_metrics, get_market_cap, search_line_items
 
 
+# Current and previous TTM values for the owner earnings and DCF models
+LINE_ITEM_REQUEST = {
+    "line_items": [
+        "free_cash_flow",
+        "net_income",
+        "depreciation_and_amortization",
+        "capital_expenditure",
+        "working_capital",
+    ],
+    "period": "ttm",
+    "limit": 2,
+}
+
+
 ##### Valuation Agent #####
 def valuation_agent(state: AgentState):
     """Performs detailed valuation analysis using multiple methodologies for multiple tickers."""
@@ -16,7 +31,7 @@ def valuation_agent(state: AgentState):
     # Initialize valuation analysis for each ticker
     valuation_analysis = {}
 
-    for ticker in tickers:
+    def analyze_ticker(ticker: str) -> dict | None:
         progress.update_status("valuation_agent", ticker, "Fetching financial data")
 
         # Fetch the financial metrics
@@ -29,30 +44,18 @@ def valuation_agent(state: AgentState):
         # Add safety check for financial metrics
         if not financial_metrics:
             progress.update_status("valuation_agent", ticker, "Failed: No financial metrics found")
-            continue
+            return None
 
         metrics = financial_metrics[0]
 
         progress.update_status("valuation_agent", ticker, "Gathering line items")
         # Fetch the specific line_items that we need for valuation purposes
-        financial_line_items = search_line_items(
-            ticker=ticker,
-            line_items=[
-                "free_cash_flow",
-                "net_income",
-                "depreciation_and_amortization",
-                "capital_expenditure",
-                "working_capital",
-            ],
-            end_date=end_date,
-            period="ttm",
-            limit=2,
-        )
+        financial_line_items = search_line_items(ticker, end_date=end_date, **LINE_ITEM_REQUEST)
 
         # Add safety check for financial line items
         if len(financial_line_items) < 2:
             progress.update_status("valuation_agent", ticker, "Failed: Insufficient financial line items")
-            continue
+            return None
 
         # Pull the current and previous financial line items
         current_financial_line_item = financial_line_items[0]
@@ -112,13 +115,18 @@ def valuation_agent(state: AgentState):
         }
 
         confidence = round(abs(valuation_gap), 2) * 100
-        valuation_analysis[ticker] = {
+        result = {
             "signal": signal,
             "confidence": confidence,
             "reasoning": reasoning,
         }
 
         progress.update_status("valuation_agent", ticker, "Done")
+        return result
+
+    for ticker, result in zip(tickers, map_tickers(analyze_ticker, tickers)):
+        if result is not None:
+            valuation_analysis[ticker] = result
 
     message = HumanMessage(
         content=json.dumps(valuation_analysis),
@@ -10,16 +10,15 @@ from colorama import Fore, Style, init
 import numpy as np
 import itertools
 
+from src.agents.technicals import IndicatorStates
 from src.llm.models import LLM_ORDER, get_model_info
+from src.utils.llm import LLM_MODES
 from src.utils.analysts import ANALYST_ORDER
+from src.utils.cassette import cassette_from_args
+from src.utils.checkpoint import DEFAULT_CHECKPOINT_EVERY, BacktestCheckpoint, default_checkpoint_path
 from src.main import run_hedge_fund
-from src.tools.api import (
-    get_company_news,
-    get_price_data,
-    get_prices,
-    get_financial_metrics,
-    get_insider_trades,
-)
+from src.tools.api import get_close_asof
+from src.data.prefetch import DEFAULT_PREFETCH_WORKERS, PrefetchManager, plan_prefetch
 from src.utils.display import print_backtest_results, format_backtest_row
 from typing_extensions import Callable
 
@@ -38,6 +37,13 @@ class Backtester:
         model_provider: str = "OpenAI",
         selected_analysts: list[str] = [],
         initial_margin_requirement: float = 0.0,
+        streaming_technicals: bool = False,
+        batch_llm_calls: bool = False,
+        llm_mode: str = "llm",
+        ambiguity_band: tuple[float, float] | None = None,
+        prefetch_workers: int = DEFAULT_PREFETCH_WORKERS,
+        checkpoint_path: str | None = None,
+        checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY,
     ):
         """
         :param agent: The trading agent (Callable).
@@ -49,6 +55,14 @@ class Backtester:
         :param model_provider: Which LLM provider (OpenAI, etc).
         :param selected_analysts: List of analyst names or IDs to incorporate.
         :param initial_margin_requirement: The margin ratio (e.g. 0.5 = 50%).
+        :param streaming_technicals: Carry technical indicator state from day to day instead of
+            recomputing it from a 30-day lookback on every day.
+        :param batch_llm_calls: Let persona agents analyze many tickers per LLM call.
+        :param llm_mode: "llm", "deterministic" (persona agents skip the LLM) or "hybrid".
+        :param ambiguity_band: Score / max score range in which hybrid mode asks the LLM.
+        :param prefetch_workers: Downloads run at once while prefetching the backtest's data.
+        :param checkpoint_path: File to checkpoint completed days to, so the backtest can be resumed.
+        :param checkpoint_every: Completed days between checkpoint writes.
         """
         self.agent = agent
         self.tickers = tickers
@@ -58,10 +72,18 @@ class Backtester:
         self.model_name = model_name
         self.model_provider = model_provider
         self.selected_analysts = selected_analysts
+        self.streaming_technicals = streaming_technicals
+        self.batch_llm_calls = batch_llm_calls
+        self.llm_mode = llm_mode
+        self.ambiguity_band = ambiguity_band
+        self.prefetch_workers = prefetch_workers
+        self.history_start = start_date
 
         # Store the margin ratio (e.g. 0.5 means 50% margin required).
         self.margin_ratio = initial_margin_requirement
 
+        self.checkpoint = BacktestCheckpoint(checkpoint_path, self.checkpoint_config(), checkpoint_every) if checkpoint_path else None
+
         # Initialize portfolio with support for long/short positions
         self.portfolio_values = []
         self.portfolio = {
@@ -84,6 +106,23 @@ class Backtester:
             }
         }
 
+    def checkpoint_config(self) -> dict:
+        """The settings a checkpoint must match to be resumed."""
+        return {
+            "tickers": self.tickers,
+            "start_date": self.start_date,
+            "end_date": self.end_date,
+            "initial_capital": self.initial_capital,
+            "margin_ratio": self.margin_ratio,
+            "model_name": self.model_name,
+            "model_provider": self.model_provider,
+            "selected_analysts": self.selected_analysts,
+            "streaming_technicals": self.streaming_technicals,
+            "batch_llm_calls": self.batch_llm_calls,
+            "llm_mode": self.llm_mode,
+            "ambiguity_band": self.ambiguity_band,
+        }
+
     def execute_trade(self, ticker: str, action: str, quantity: float, current_price: float):
         """
         Execute trades with support for both long and short positions.
@@ -274,23 +313,18 @@ class Backtester:
         """Pre-fetch all data needed for the backtest period."""
         print("\nPre-fetching data for the entire backtest period...")
 
-        # Convert end_date string to datetime, fetch up to 1 year before
+        # Convert end_date string to datetime, fetch up to 1 year before (or from the backtest start if earlier)
         end_date_dt = datetime.strptime(self.end_date, "%Y-%m-%d")
-        start_date_dt = end_date_dt - relativedelta(years=1)
+        start_date_dt = min(end_date_dt - relativedelta(years=1), datetime.strptime(self.start_date, "%Y-%m-%d"))
         start_date_str = start_date_dt.strftime("%Y-%m-%d")
+        self.history_start = start_date_str
 
-        for ticker in self.tickers:
-            # Fetch price data for the entire period, plus 1 year
-            get_prices(ticker, start_date_str, self.end_date)
-
-            # Fetch financial metrics
-            get_financial_metrics(ticker, self.end_date, limit=10)
-
-            # Fetch insider trades
-            get_insider_trades(ticker, self.end_date, start_date=self.start_date, limit=1000)
-
-            # Fetch company news
-            get_company_news(ticker, self.end_date, start_date=self.start_date, limit=1000)
+        # Download prices (plus 1 year), financial metrics, every selected analyst's line items,
+        # insider trades and news for all tickers concurrently, skipping what an earlier run already fetched
+        jobs = plan_prefetch(self.tickers, self.start_date, self.end_date, history_start=start_date_str, selected_analysts=self.selected_analysts)
+        stats = PrefetchManager(jobs, max_workers=self.prefetch_workers).run()
+        for job, error in stats.failures:
+            print(f"Could not prefetch {job.endpoint} for {job.ticker}: {error}")
 
         print("Data pre-fetch complete.")
 
@@ -305,7 +339,29 @@ class Backtester:
             print(f"Error parsing action: {agent_output}")
             return {"action": "hold", "quantity": 0}
 
-    def run_backtest(self):
+    def restore_checkpoint(self, table_rows: list, performance_metrics: dict) -> str | None:
+        """Restore the days recorded in the checkpoint and return the last one, or None if there are none."""
+        days = self.checkpoint.resume()
+        if not days:
+            print(f"No checkpoint at {self.checkpoint.path}, starting from the first day.")
+            return None
+
+        for day in days:
+            self.portfolio = day["portfolio"]
+            self.portfolio_values.append({**day["portfolio_value"], "Date": pd.Timestamp(day["portfolio_value"]["Date"])})
+            table_rows.extend(day["rows"])
+        if len(self.portfolio_values) > 3:
+            self._update_performance_metrics(performance_metrics)
+
+        print(f"Resuming after {days[-1]['date']} ({len(days)} days restored from {self.checkpoint.path}).")
+        print_backtest_results(table_rows)
+        return days[-1]["date"]
+
+    def run_backtest(self, resume: bool = False):
+        """
+        Run the backtest day by day. With a checkpoint, every completed day is recorded, and
+        `resume` continues after the last recorded day instead of starting over.
+        """
         # Pre-fetch all data at the start
         self.prefetch_data()
 
@@ -320,6 +376,17 @@ class Backtester:
             'net_exposure': None
         }
 
+        # Options only passed to the agent when enabled, so custom agents need not accept them
+        agent_options = {}
+        if self.streaming_technicals:
+            # Technical indicators warm up over the prefetched history, then advance one day at a time
+            agent_options["indicator_states"] = IndicatorStates(self.history_start)
+        if self.batch_llm_calls:
+            agent_options["batch_llm_calls"] = True
+        if self.llm_mode != "llm":
+            agent_options["llm_mode"] = self.llm_mode
+            agent_options["ambiguity_band"] = self.ambiguity_band
+
         print("\nStarting backtest...")
 
         # Initialize portfolio values list with initial capital
@@ -328,26 +395,45 @@ class Backtester:
         else:
             self.portfolio_values = []
 
+        completed_through = None
+        if self.checkpoint is not None:
+            if resume:
+                completed_through = self.restore_checkpoint(table_rows, performance_metrics)
+            else:
+                self.checkpoint.start()
+
+        try:
+            self._run_days(dates, completed_through, agent_options, table_rows, performance_metrics)
+        finally:
+            # Keep the days completed before a crash or interrupt
+            if self.checkpoint is not None:
+                self.checkpoint.flush()
+
+        return performance_metrics
+
+    def _run_days(self, dates, completed_through: str | None, agent_options: dict, table_rows: list, performance_metrics: dict):
+        """Trade each day after `completed_through`, extending the table, the metrics and the checkpoint."""
         for current_date in dates:
             lookback_start = (current_date - timedelta(days=30)).strftime("%Y-%m-%d")
             current_date_str = current_date.strftime("%Y-%m-%d")
-            previous_date_str = (current_date - timedelta(days=1)).strftime("%Y-%m-%d")
 
             # Skip if there's no prior day to look back (i.e., first date in the range)
             if lookback_start == current_date_str:
                 continue
 
-            # Get current prices for all tickers
-            try:
-                current_prices = {
-                    ticker: get_price_data(ticker, previous_date_str, current_date_str).iloc[-1]["close"]
-                    for ticker in self.tickers
-                }
-            except Exception:
-                # If data is missing or there's an API error, skip this day
-                print(f"Error fetching prices between {previous_date_str} and {current_date_str}")
+            # Days restored from the checkpoint are already in the portfolio and the table
+            if completed_through is not None and current_date_str <= completed_through:
                 continue
 
+            # Get the latest close for all tickers as of today, downloading any prices the prefetch missed
+            closes = get_close_asof(self.tickers, current_date_str, start_date=self.history_start)
+            if np.isnan(closes).any():
+                # If a ticker has no price yet, skip this day
+                missing = [ticker for ticker, close in zip(self.tickers, closes) if np.isnan(close)]
+                print(f"No prices as of {current_date_str} for {', '.join(missing)}")
+                continue
+            current_prices = dict(zip(self.tickers, closes.tolist()))
+
             # ---------------------------------------------------------------
             # 1) Execute the agent's trades
             # ---------------------------------------------------------------
@@ -359,6 +445,7 @@ class Backtester:
                 model_name=self.model_name,
                 model_provider=self.model_provider,
                 selected_analysts=self.selected_analysts,
+                **agent_options,
             )
             decisions = output["decisions"]
             analyst_signals = output["analyst_signals"]
@@ -490,7 +577,17 @@ class Backtester:
             if len(self.portfolio_values) > 3:
                 self._update_performance_metrics(performance_metrics)
 
-        return performance_metrics
+            if self.checkpoint is not None:
+                self.checkpoint.add(
+                    {
+                        "date": current_date_str,
+                        "portfolio": self.portfolio,
+                        "portfolio_value": {**self.portfolio_values[-1], "Date": current_date_str},
+                        "rows": date_rows,
+                        "decisions": decisions,
+                        "analyst_signals": analyst_signals,
+                    }
+                )
 
     def _update_performance_metrics(self, performance_metrics):
         """Helper method to update performance metrics using daily returns."""
@@ -649,6 +746,65 @@ if __name__ == "__main__":
         default=0.0,
         help="Margin ratio for short positions, e.g. 0.5 for 50% (default: 0.0)",
     )
+    parser.add_argument(
+        "--prefetch-workers",
+        type=int,
+        default=DEFAULT_PREFETCH_WORKERS,
+        help=f"Downloads run at once while prefetching data (default: {DEFAULT_PREFETCH_WORKERS})",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        type=str,
+        metavar="PATH",
+        help="Checkpoint file for the backtest (default: one per backtest settings under ~/.cache/ai-hedge-fund/backtests)",
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=DEFAULT_CHECKPOINT_EVERY,
+        help=f"Completed days between checkpoint writes (default: {DEFAULT_CHECKPOINT_EVERY})",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue from the last day in the checkpoint instead of starting over",
+    )
+    parser.add_argument(
+        "--streaming-technicals",
+        action="store_true",
+        help="Update technical indicators incrementally day by day instead of recomputing them",
+    )
+    parser.add_argument(
+        "--batch-llm",
+        action="store_true",
+        help="Let each persona agent analyze many tickers per LLM call",
+    )
+    parser.add_argument(
+        "--llm-mode",
+        choices=LLM_MODES,
+        default="llm",
+        help="Persona agents: always ask the LLM (llm), never (deterministic), or only for ambiguous scores (hybrid)",
+    )
+    cassette_group = parser.add_mutually_exclusive_group()
+    cassette_group.add_argument(
+        "--record-cassette",
+        type=str,
+        metavar="PATH",
+        help="Record every API response and LLM result of the backtest to a compressed cassette",
+    )
+    cassette_group.add_argument(
+        "--replay-cassette",
+        type=str,
+        metavar="PATH",
+        help="Serve every API response and LLM result from a recorded cassette, without network access",
+    )
+    parser.add_argument(
+        "--ambiguity-band",
+        type=float,
+        nargs=2,
+        metavar=("LOW", "HIGH"),
+        help="Score / max score range in which hybrid mode asks the LLM (default: 0.4 0.6)",
+    )
 
     args = parser.parse_args()
 
@@ -717,7 +873,19 @@ if __name__ == "__main__":
         model_provider=model_provider,
         selected_analysts=selected_analysts,
         initial_margin_requirement=args.margin_requirement,
+        streaming_technicals=args.streaming_technicals,
+        batch_llm_calls=args.batch_llm,
+        llm_mode=args.llm_mode,
+        ambiguity_band=tuple(args.ambiguity_band) if args.ambiguity_band else None,
+        prefetch_workers=args.prefetch_workers,
+    )
+    # Without --checkpoint, each backtest's settings get their own checkpoint, which --resume finds again
+    backtester.checkpoint = BacktestCheckpoint(
+        args.checkpoint or default_checkpoint_path(backtester.checkpoint_config()),
+        backtester.checkpoint_config(),
+        args.checkpoint_every,
     )
 
-    performance_metrics = backtester.run_backtest()
+    with cassette_from_args(record=args.record_cassette, replay=args.replay_cassette):
+        performance_metrics = backtester.run_backtest(resume=args.resume)
     performance_df = backtester.analyze_performance()
@@ -1,77 +1,400 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Default location of the on-disk cache. Override with FINANCIAL_DATASETS_CACHE_DIR,
+# or set FINANCIAL_DATASETS_CACHE=memory to keep everything in-process.
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ai-hedge-fund")
+
+# Per-dataset persistence policy.
+# `key_fields` identify a row within a ticker's dataset, so several rows may share a date.
+# A row whose date key is at least `settle_days` older than the day it was fetched
+# describes a closed historical period and is kept forever. Newer rows may still
+# change (intraday bars, restated filings, late news) and expire after `ttl` seconds.
+DATASET_POLICIES = {
+    "prices": {"key_fields": ("time",), "ttl": 6 * 3600, "settle_days": 1},
+    "price_coverage": {"key_fields": ("end_date", "start_date"), "ttl": 6 * 3600, "settle_days": 1},
+    "financial_metrics": {"key_fields": ("report_period", "period"), "ttl": 24 * 3600, "settle_days": 90},
+    "line_items": {"key_fields": ("report_period", "period"), "ttl": 24 * 3600, "settle_days": 90},
+    "line_item_coverage": {"key_fields": ("end_date", "period", "limit", "line_items"), "ttl": 24 * 3600, "settle_days": 90},
+    "insider_trades": {
+        "key_fields": ("filing_date", "name", "transaction_date", "transaction_shares", "transaction_price_per_share", "security_title"),
+        "ttl": 6 * 3600, "settle_days": 2},
+    "company_news": {"key_fields": ("date", "url"), "ttl": 3600, "settle_days": 1},
+}
+
+
+# Columns of the per-ticker price frame and their dtypes
+PRICE_COLUMNS = {"open": float, "close": float, "high": float, "low": float, "volume": np.int64, "time": object}
+
+
+def row_key(dataset: str, item: dict[str, any]) -> str:
+    """Build the storage key of a row. The first key field is always its date."""
+    return "|".join(str(item.get(field)) for field in DATASET_POLICIES[dataset]["key_fields"])
+
+
+def _shift_day(date: str, days: int) -> str:
+    """Move a YYYY-MM-DD date by `days` calendar days."""
+    return (datetime.strptime(date, "%Y-%m-%d") + timedelta(days=days)).strftime("%Y-%m-%d")
+
+
+def build_price_frame(rows: list[dict[str, any]]) -> pd.DataFrame:
+    """Build a date-indexed price DataFrame from price rows, sorted by time."""
+    rows = sorted(rows, key=lambda row: row["time"])
+    frame = pd.DataFrame({column: np.array([row[column] for row in rows], dtype=dtype) for column, dtype in PRICE_COLUMNS.items()})
+    frame.index = pd.DatetimeIndex(pd.to_datetime(frame["time"]), name="Date")
+    return frame
+
+
+def get_cache_dir() -> str | None:
+    """Return the configured cache directory, or None if persistence is disabled."""
+    if os.environ.get("FINANCIAL_DATASETS_CACHE", "").lower() in ("memory", "off", "0", "false"):
+        return None
+    return os.environ.get("FINANCIAL_DATASETS_CACHE_DIR") or DEFAULT_CACHE_DIR
+
+
+class CacheBackend:
+    """Interface for persistent storage behind the in-memory cache."""
+
+    def load(self, dataset: str, ticker: str) -> list[dict[str, any]] | None:
+        """Return the rows still valid for a dataset/ticker, or None if nothing is stored."""
+        raise NotImplementedError
+
+    def save(self, dataset: str, ticker: str, data: dict[str, dict[str, any]]):
+        """Upsert rows for a dataset/ticker, given as a mapping of row key to row."""
+        raise NotImplementedError
+
+    def clear(self):
+        """Remove everything from persistent storage."""
+        raise NotImplementedError
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """Stores cached API rows in a single SQLite database under the cache directory."""
+
+    def __init__(self, cache_dir: str | None = None, policies: dict[str, dict] | None = None):
+        # The directory is resolved on first use so that .env files loaded after import still apply
+        self._cache_dir = cache_dir
+        self._policies = policies or DATASET_POLICIES
+        self._conn: sqlite3.Connection | None = None
+        self._resolved = False
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> str | None:
+        cache_dir = self._cache_dir or get_cache_dir()
+        return os.path.join(cache_dir, "financial_data.sqlite") if cache_dir else None
+
+    def _connect(self) -> sqlite3.Connection | None:
+        if self._resolved:
+            return self._conn
+        self._resolved = True
+        path = self.path
+        if not path:
+            return None
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache_rows (
+                dataset TEXT NOT NULL,
+                ticker TEXT NOT NULL,
+                key TEXT NOT NULL,
+                data TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (dataset, ticker, key)
+            )
+            """
+        )
+        self._conn.commit()
+        return self._conn
+
+    def _is_valid(self, dataset: str, key: str, fetched_at: float, now: float) -> bool:
+        """Closed periods never expire; open ones are valid until their TTL runs out."""
+        policy = self._policies.get(dataset)
+        if policy is None:
+            return True
+        settled_before = (datetime.fromtimestamp(fetched_at) - timedelta(days=policy["settle_days"])).strftime("%Y-%m-%d")
+        if key[:10] <= settled_before:
+            return True
+        return now - fetched_at < policy["ttl"]
+
+    def load(self, dataset: str, ticker: str) -> list[dict[str, any]] | None:
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return None
+            rows = conn.execute(
+                "SELECT key, data, fetched_at FROM cache_rows WHERE dataset = ? AND ticker = ?",
+                (dataset, ticker),
+            ).fetchall()
+
+        now = time.time()
+        data = [json.loads(row_data) for key, row_data, fetched_at in rows if self._is_valid(dataset, key, fetched_at, now)]
+        if dataset in self._policies:
+            # Rows stored under an older key scheme come back once per row identity
+            data = list({row_key(dataset, item): item for item in data}.values())
+        return data or None
+
+    def save(self, dataset: str, ticker: str, data: dict[str, dict[str, any]]):
+        if not data:
+            return
+        fetched_at = time.time()
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            conn.executemany(
+                "INSERT OR REPLACE INTO cache_rows (dataset, ticker, key, data, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                [(dataset, ticker, key, json.dumps(item), fetched_at) for key, item in data.items()],
+            )
+            conn.commit()
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            conn.execute("DELETE FROM cache_rows")
+            conn.commit()
+
+
 class Cache:
-    """In-memory cache for API responses."""
+    """In-memory cache for API responses, optionally backed by persistent storage."""
 
-    def __init__(self):
+    def __init__(self, backend: CacheBackend | None = None):
+        self.backend = backend
         self._prices_cache: dict[str, list[dict[str, any]]] = {}
+        self._price_coverage_cache: dict[str, list[dict[str, any]]] = {}
         self._financial_metrics_cache: dict[str, list[dict[str, any]]] = {}
         self._line_items_cache: dict[str, list[dict[str, any]]] = {}
+        self._line_item_coverage_cache: dict[str, list[dict[str, any]]] = {}
         self._insider_trades_cache: dict[str, list[dict[str, any]]] = {}
         self._company_news_cache: dict[str, list[dict[str, any]]] = {}
+        # Columnar view of each ticker's prices: sorted time strings and the matching frame
+        self._price_frames: dict[str, tuple[np.ndarray, pd.DataFrame]] = {}
+        # Forward-filled (time x ticker) close matrices keyed by ticker tuple
+        self._close_matrices: dict[tuple[str, ...], tuple[np.ndarray, np.ndarray]] = {}
+        # (dataset, ticker) pairs already read from the backend into memory
+        self._loaded: set[tuple[str, str]] = set()
+        # Analysts read and merge concurrently from worker threads
+        self._lock = threading.RLock()
 
-    def reset(self):
-        """Clear all cached data."""
+    def reset(self, persistent: bool = False):
+        """Clear all in-memory data. Persistent data is only removed if `persistent` is True."""
         self._prices_cache = {}
+        self._price_coverage_cache = {}
+        self._price_frames = {}
+        self._close_matrices = {}
         self._financial_metrics_cache = {}
         self._line_items_cache = {}
+        self._line_item_coverage_cache = {}
         self._insider_trades_cache = {}
         self._company_news_cache = {}
+        self._loaded = set()
+        if persistent and self.backend:
+            self.backend.clear()
 
-    def _merge_data(self, existing: list[dict] | None, new_data: list[dict], key_field: str) -> list[dict]:
-        """Merge existing and new data, avoiding duplicates based on a key field."""
+    def _merge_data(self, existing: list[dict] | None, new_data: list[dict], key_field: str | tuple[str, ...]) -> list[dict]:
+        """Merge existing and new data, avoiding duplicates based on a key field (or a tuple of fields)."""
         if not existing:
             return new_data
 
+        key_fields = (key_field,) if isinstance(key_field, str) else key_field
+
+        def key(item: dict) -> tuple:
+            return tuple(item.get(field) for field in key_fields)
+
         # Create a set of existing keys for O(1) lookup
-        existing_keys = {item[key_field] for item in existing}
+        existing_keys = {key(item) for item in existing}
 
         # Only add items that don't exist yet
         merged = existing.copy()
-        merged.extend([item for item in new_data if item[key_field] not in existing_keys])
+        merged.extend([item for item in new_data if key(item) not in existing_keys])
         return merged
 
+    def _get(self, store: dict[str, list[dict]], dataset: str, ticker: str) -> list[dict[str, any]] | None:
+        """Read from memory, falling back to the persistent backend on first access."""
+        with self._lock:
+            if ticker not in store and self.backend and (dataset, ticker) not in self._loaded:
+                self._loaded.add((dataset, ticker))
+                if persisted := self.backend.load(dataset, ticker):
+                    store[ticker] = persisted
+            return store.get(ticker)
+
+    def _set(self, store: dict[str, list[dict]], dataset: str, ticker: str, data: list[dict[str, any]]):
+        """Merge into memory and write through to the persistent backend."""
+        with self._lock:
+            store[ticker] = self._merge_data(self._get(store, dataset, ticker), data, key_field=DATASET_POLICIES[dataset]["key_fields"])
+        if self.backend:
+            self.backend.save(dataset, ticker, {row_key(dataset, item): item for item in data})
+
     def get_prices(self, ticker: str) -> list[dict[str, any]] | None:
         """Get cached price data if available."""
-        return self._prices_cache.get(ticker)
+        return self._get(self._prices_cache, "prices", ticker)
+
+    def set_prices(self, ticker: str, data: list[dict[str, any]], start_date: str | None = None, end_date: str | None = None):
+        """Append new price data to cache, recording that it covers `start_date`..`end_date` when given."""
+        with self._lock:
+            self._set(self._prices_cache, "prices", ticker, data)
+            self._price_frames.pop(ticker, None)
+            self._close_matrices = {key: matrix for key, matrix in self._close_matrices.items() if ticker not in key}
+        if start_date is None or end_date is None:
+            return
+
+        coverage = {"start_date": start_date, "end_date": end_date}
+        key = row_key("price_coverage", coverage)
+        with self._lock:
+            existing = self._get(self._price_coverage_cache, "price_coverage", ticker) or []
+            self._price_coverage_cache[ticker] = [item for item in existing if row_key("price_coverage", item) != key] + [coverage]
+        if self.backend:
+            self.backend.save("price_coverage", ticker, {key: coverage})
+
+    def get_missing_price_ranges(self, ticker: str, start_date: str, end_date: str) -> list[tuple[str, str]]:
+        """Return the (start, end) sub-ranges of `start_date`..`end_date` that no earlier price fetch covered."""
+        covered = sorted((item["start_date"], item["end_date"]) for item in self._get(self._price_coverage_cache, "price_coverage", ticker) or [])
+        missing = []
+        cursor = start_date
+        for covered_start, covered_end in covered:
+            if covered_start > end_date:
+                break
+            if covered_end < cursor:
+                continue
+            if covered_start > cursor:
+                missing.append((cursor, _shift_day(covered_start, -1)))
+            cursor = max(cursor, _shift_day(covered_end, 1))
+        if cursor <= end_date:
+            missing.append((cursor, end_date))
+        return missing
+
+    def _get_price_columns(self, ticker: str) -> tuple[np.ndarray, pd.DataFrame] | None:
+        """Get a ticker's sorted time strings and price frame, building them on first use."""
+        with self._lock:
+            if (columns := self._price_frames.get(ticker)) is None:
+                if not (rows := self._get(self._prices_cache, "prices", ticker)):
+                    return None
+                frame = build_price_frame(rows)
+                columns = self._price_frames[ticker] = (frame["time"].to_numpy(dtype=str), frame)
+            return columns
+
+    def get_price_frame(self, ticker: str, start_date: str, end_date: str) -> pd.DataFrame | None:
+        """
+        Get cached prices with `start_date <= time <= end_date` as a date-indexed DataFrame.
 
-    def set_prices(self, ticker: str, data: list[dict[str, any]]):
-        """Append new price data to cache."""
-        self._prices_cache[ticker] = self._merge_data(self._prices_cache.get(ticker), data, key_field="time")
+        The range is located by binary search over the ticker's sorted times and returned as a
+        row slice of the cached frame, without copying. Callers must not modify it in place.
+        """
+        if (columns := self._get_price_columns(ticker)) is None:
+            return None
+        times, frame = columns
+        return frame.iloc[times.searchsorted(start_date, side="left") : times.searchsorted(end_date, side="right")]
+
+    def get_close_asof(self, tickers: list[str], date: str) -> np.ndarray:
+        """
+        Get each ticker's latest cached close with `time <= date`, or NaN if it has none.
+
+        The tickers' closes are laid out once as a forward-filled (time x ticker) matrix,
+        so every later lookup is one binary search and a row read.
+        """
+        key = tuple(tickers)
+        with self._lock:
+            if (matrix := self._close_matrices.get(key)) is None:
+                matrix = self._close_matrices[key] = self._build_close_matrix(tickers)
+        times, closes = matrix
+        row = times.searchsorted(date, side="right") - 1
+        return closes[row].copy() if row >= 0 else np.full(len(tickers), np.nan)
+
+    def _build_close_matrix(self, tickers: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        """Align the tickers' closes on the union of their times, carrying each close forward."""
+        columns = [self._get_price_columns(ticker) for ticker in tickers]
+        times = np.unique(np.concatenate([column[0] for column in columns if column is not None] or [np.array([], dtype=str)]))
+        closes = np.full((len(times), len(tickers)), np.nan)
+        for index, column in enumerate(columns):
+            if column is not None:
+                ticker_times, frame = column
+                closes[times.searchsorted(ticker_times), index] = frame["close"].to_numpy()
+        return times, pd.DataFrame(closes).ffill().to_numpy()
 
     def get_financial_metrics(self, ticker: str) -> list[dict[str, any]]:
         """Get cached financial metrics if available."""
-        return self._financial_metrics_cache.get(ticker)
+        return self._get(self._financial_metrics_cache, "financial_metrics", ticker)
 
     def set_financial_metrics(self, ticker: str, data: list[dict[str, any]]):
         """Append new financial metrics to cache."""
-        self._financial_metrics_cache[ticker] = self._merge_data(self._financial_metrics_cache.get(ticker), data, key_field="report_period")
+        self._set(self._financial_metrics_cache, "financial_metrics", ticker, data)
+
+    def get_line_items(self, ticker: str, period: str, end_date: str, limit: int) -> list[dict[str, any]]:
+        """Get the `limit` most recent cached line item rows for a period, up to `end_date`."""
+        rows = [row for row in self._get(self._line_items_cache, "line_items", ticker) or [] if row["period"] == period and row["report_period"] <= end_date]
+        rows.sort(key=lambda row: row["report_period"], reverse=True)
+        return rows[:limit]
+
+    def set_line_items(self, ticker: str, period: str, data: list[dict[str, any]], line_items: list[str], end_date: str, limit: int):
+        """Merge fetched line item values into cached rows and record which query they answer."""
+        with self._lock:
+            rows = {row_key("line_items", row): row for row in self._get(self._line_items_cache, "line_items", ticker) or []}
+            updated = {}
+            for item in data:
+                key = row_key("line_items", item)
+                # Rows for the same report period gain fields from every request
+                rows[key] = updated[key] = {**rows.get(key, {}), **item}
+            self._line_items_cache[ticker] = list(rows.values())
+        if self.backend:
+            self.backend.save("line_items", ticker, updated)
 
-    def get_line_items(self, ticker: str) -> list[dict[str, any]] | None:
-        """Get cached line items if available."""
-        return self._line_items_cache.get(ticker)
+        coverage = {
+            "end_date": end_date,
+            "period": period,
+            "limit": limit,
+            "line_items": sorted(line_items),
+            "report_periods": sorted(item["report_period"] for item in data),
+        }
+        key = row_key("line_item_coverage", coverage)
+        with self._lock:
+            existing = self._get(self._line_item_coverage_cache, "line_item_coverage", ticker) or []
+            self._line_item_coverage_cache[ticker] = [item for item in existing if row_key("line_item_coverage", item) != key] + [coverage]
+        if self.backend:
+            self.backend.save("line_item_coverage", ticker, {key: coverage})
 
-    def set_line_items(self, ticker: str, data: list[dict[str, any]]):
-        """Append new line items to cache."""
-        self._line_items_cache[ticker] = self._merge_data(self._line_items_cache.get(ticker), data, key_field="report_period")
+    def get_missing_line_items(self, ticker: str, line_items: list[str], end_date: str, period: str, limit: int) -> list[str]:
+        """Return the requested line items that the cache cannot fully answer for this query."""
+        covered = set()
+        for coverage in self._get(self._line_item_coverage_cache, "line_item_coverage", ticker) or []:
+            if coverage["period"] != period or coverage["end_date"] < end_date:
+                continue
+            # An earlier request answers this one if it returned its whole history, or if the
+            # periods it returned up to `end_date` are enough to fill `limit`
+            report_periods = coverage["report_periods"]
+            if len(report_periods) < coverage["limit"] or sum(report_period <= end_date for report_period in report_periods) >= limit:
+                covered.update(coverage["line_items"])
+        return [line_item for line_item in line_items if line_item not in covered]
 
     def get_insider_trades(self, ticker: str) -> list[dict[str, any]] | None:
         """Get cached insider trades if available."""
-        return self._insider_trades_cache.get(ticker)
+        return self._get(self._insider_trades_cache, "insider_trades", ticker)
 
     def set_insider_trades(self, ticker: str, data: list[dict[str, any]]):
         """Append new insider trades to cache."""
-        self._insider_trades_cache[ticker] = self._merge_data(self._insider_trades_cache.get(ticker), data, key_field="filing_date")  # Could also use transaction_date if preferred
+        self._set(self._insider_trades_cache, "insider_trades", ticker, data)
 
     def get_company_news(self, ticker: str) -> list[dict[str, any]] | None:
         """Get cached company news if available."""
-        return self._company_news_cache.get(ticker)
+        return self._get(self._company_news_cache, "company_news", ticker)
 
     def set_company_news(self, ticker: str, data: list[dict[str, any]]):
         """Append new company news to cache."""
-        self._company_news_cache[ticker] = self._merge_data(self._company_news_cache.get(ticker), data, key_field="date")
+        self._set(self._company_news_cache, "company_news", ticker, data)
 
 
-# Global cache instance
-_cache = Cache()
+# Global cache instance, persisted to disk unless FINANCIAL_DATASETS_CACHE=memory
+_cache = Cache(backend=SQLiteCacheBackend())
 
 
 def get_cache() -> Cache:
@@ -79,6 +402,6 @@ def get_cache() -> Cache:
     return _cache
 
 
-def reset_cache():
-    """Reset the global cache, clearing all cached data."""
-    _cache.reset()
+def reset_cache(persistent: bool = False):
+    """Reset the global cache, clearing in-memory data (and on-disk data if `persistent`)."""
+    _cache.reset(persistent=persistent)
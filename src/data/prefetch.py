@@ -0,0 +1,282 @@
+"""Plan and download all the data a backtest needs before its first day, resumably."""
+
+import asyncio
+import json
+import math
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, NamedTuple
+
+from src.data.cache import DATASET_POLICIES, get_cache_dir
+from src.tools import api
+from src.utils.concurrency import run_sync
+from src.utils.rate_limit import TokenBucket
+
+# Jobs downloading at once, and per endpoint; the API's plan quota and concurrency limit still apply on top
+DEFAULT_PREFETCH_WORKERS = 16
+DEFAULT_ENDPOINT_CONCURRENCY = 8
+ENDPOINT_CONCURRENCY = {
+    "prices": 8,
+    "financial_metrics": 8,
+    "line_items": 4,
+    "insider_trades": 4,
+    "company_news": 4,
+}
+
+# Optional requests per minute per endpoint, below the plan quota shared by every endpoint
+ENDPOINT_RATE_LIMITS: dict[str, float] = {}
+
+# Completed jobs are recorded here (in the cache directory) and skipped by later runs while their data is fresh:
+# for at most MANIFEST_TTL, no longer than the TTL of the dataset they filled, and only while the cache still holds it
+MANIFEST_FILE = "prefetch_manifest.json"
+MANIFEST_TTL = 6 * 3600
+
+# Minimum seconds between progress lines and manifest saves
+REPORT_INTERVAL = 1.0
+
+# Months between the report periods of each line item / financial metrics period
+PERIOD_MONTHS = {"annual": 12, "quarterly": 3, "ttm": 3}
+
+
+class PrefetchJob(NamedTuple):
+    """One download: an endpoint, a ticker and the keyword arguments of its API call (as sorted pairs)."""
+
+    endpoint: str
+    ticker: str
+    params: tuple
+
+    @property
+    def key(self) -> str:
+        return json.dumps([self.endpoint, self.ticker, self.params])
+
+    def kwargs(self) -> dict[str, Any]:
+        return {name: list(value) if isinstance(value, tuple) else value for name, value in self.params}
+
+
+def _job(endpoint: str, ticker: str, **params) -> PrefetchJob:
+    return PrefetchJob(endpoint, ticker, tuple(sorted((name, tuple(value) if isinstance(value, list) else value) for name, value in params.items())))
+
+
+def _periods_between(start_date: str, end_date: str, period: str) -> int:
+    """Report periods published between two dates, rounded up."""
+    months = (datetime.strptime(end_date, "%Y-%m-%d") - datetime.strptime(start_date, "%Y-%m-%d")).days / 30.4
+    return math.ceil(max(0.0, months) / PERIOD_MONTHS.get(period, 3))
+
+
+def plan_prefetch(
+    tickers: list[str],
+    start_date: str,
+    end_date: str,
+    history_start: str | None = None,
+    selected_analysts: list[str] | None = None,
+) -> list[PrefetchJob]:
+    """
+    Every download a backtest from `start_date` to `end_date` will make, as jobs.
+
+    Prices are fetched from `history_start` (default: `start_date`) for indicator warm-up. Line
+    items follow the selected analysts' merged requests (see get_line_item_plan). Because each
+    simulated day asks for the latest `limit` report periods as of that day, line items and
+    financial metrics are fetched as of `end_date` with enough extra periods to cover the first day.
+    """
+    from src.utils.analysts import get_line_item_plan
+
+    jobs = []
+    for ticker in tickers:
+        jobs.append(_job("prices", ticker, start_date=history_start or start_date, end_date=end_date))
+        jobs.append(_job("financial_metrics", ticker, end_date=end_date, period="ttm", limit=10 + _periods_between(start_date, end_date, "ttm")))
+        for period, request in get_line_item_plan(selected_analysts).items():
+            limit = request["limit"] + _periods_between(start_date, end_date, period)
+            jobs.append(_job("line_items", ticker, line_items=request["line_items"], end_date=end_date, period=period, limit=limit))
+        jobs.append(_job("insider_trades", ticker, end_date=end_date, start_date=start_date, limit=1000))
+        jobs.append(_job("company_news", ticker, end_date=end_date, start_date=start_date, limit=1000))
+    return jobs
+
+
+class PrefetchManifest:
+    """Keys of completed jobs with when they completed, saved as JSON. Without a path nothing persists."""
+
+    def __init__(self, path: str | None, ttl: float = MANIFEST_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._completed: dict[str, float] = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    completed = json.load(f)
+            except (OSError, ValueError):
+                # A manifest cut short by a crash only costs re-checking the cache
+                completed = {}
+            now = time.time()
+            self._completed = {key: completed_at for key, completed_at in completed.items() if now - completed_at < ttl}
+
+    def is_done(self, job: PrefetchJob) -> bool:
+        """Whether the job completed recently enough that the data it fetched cannot have expired yet."""
+        ttl = min(self.ttl, DATASET_POLICIES[job.endpoint]["ttl"]) if job.endpoint in DATASET_POLICIES else self.ttl
+        with self._lock:
+            completed_at = self._completed.get(job.key)
+        return completed_at is not None and time.time() - completed_at < ttl
+
+    def mark_done(self, job: PrefetchJob):
+        with self._lock:
+            self._completed[job.key] = time.time()
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            completed = dict(self._completed)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(completed, f)
+        os.replace(tmp_path, self.path)
+
+
+def default_manifest_path() -> str | None:
+    """The manifest next to the on-disk data cache, or None when the cache only lives in memory."""
+    cache_dir = get_cache_dir()
+    return os.path.join(cache_dir, MANIFEST_FILE) if cache_dir else None
+
+
+class PrefetchStats:
+    """Progress of a prefetch: jobs done, skipped thanks to the manifest, and failed."""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.skipped = 0
+        self.failures: list[tuple[PrefetchJob, Exception]] = []
+        self.started = time.monotonic()
+
+    @property
+    def remaining(self) -> int:
+        return self.total - self.done - self.skipped - len(self.failures)
+
+    def summary(self) -> str:
+        elapsed = time.monotonic() - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        line = f"Prefetch: {self.done + self.skipped}/{self.total} jobs"
+        if self.skipped:
+            line += f" ({self.skipped} already cached)"
+        if self.failures:
+            line += f", {len(self.failures)} failed"
+        line += f", {rate:.1f} jobs/s"
+        if self.remaining and rate > 0:
+            line += f", ETA {int(self.remaining / rate // 60)}m{int(self.remaining / rate % 60):02d}s"
+        return line
+
+
+class PrefetchManager:
+    """
+    Runs prefetch jobs concurrently on the shared event loop.
+
+    At most `max_workers` jobs run at once, and at most ENDPOINT_CONCURRENCY of them per endpoint,
+    each endpoint optionally paced by `rate_limits` (requests per minute). Completed jobs go into the
+    manifest, so an interrupted prefetch resumes where it stopped. Failed jobs are reported; the
+    backtest downloads missing prices before each day, and the agents fetch anything else they read.
+    """
+
+    def __init__(
+        self,
+        jobs: list[PrefetchJob],
+        max_workers: int = DEFAULT_PREFETCH_WORKERS,
+        rate_limits: dict[str, float] | None = None,
+        manifest_path: str | None = None,
+        report: Callable[[str], None] | None = None,
+    ):
+        self.jobs = jobs
+        self.max_workers = max(1, max_workers)
+        self.rate_limits = {**ENDPOINT_RATE_LIMITS, **(rate_limits or {})}
+        self.manifest = PrefetchManifest(manifest_path if manifest_path is not None else default_manifest_path())
+        self.report = report or _report_inline
+        self.stats = PrefetchStats(len(jobs))
+        self._last_report = 0.0
+
+    def run(self) -> PrefetchStats:
+        """Run every job not in the manifest yet and return the stats."""
+        try:
+            run_sync(self._run())
+        finally:
+            self.manifest.save()
+            self.report(self.stats.summary())
+            if self.report is _report_inline:
+                sys.stdout.write("\n")
+        return self.stats
+
+    async def _run(self):
+        workers = asyncio.Semaphore(self.max_workers)
+        endpoint_limits = {endpoint: asyncio.Semaphore(ENDPOINT_CONCURRENCY.get(endpoint, DEFAULT_ENDPOINT_CONCURRENCY)) for endpoint in {job.endpoint for job in self.jobs}}
+        buckets = {endpoint: TokenBucket(rate=rpm / 60) for endpoint, rpm in self.rate_limits.items()}
+
+        async def run_job(job: PrefetchJob):
+            if self.manifest.is_done(job) and _is_cached(job):
+                self.stats.skipped += 1
+                return
+            # A job waiting for its endpoint must not hold a worker slot another endpoint could use
+            async with endpoint_limits[job.endpoint], workers:
+                if bucket := buckets.get(job.endpoint):
+                    await bucket.acquire()
+                try:
+                    await _ENDPOINTS[job.endpoint](job.ticker, **job.kwargs())
+                except Exception as e:
+                    self.stats.failures.append((job, e))
+                else:
+                    self.stats.done += 1
+                    self.manifest.mark_done(job)
+            self._maybe_report()
+
+        await asyncio.gather(*(run_job(job) for job in self.jobs))
+
+    def _maybe_report(self):
+        now = time.monotonic()
+        if now - self._last_report >= REPORT_INTERVAL:
+            self._last_report = now
+            self.report(self.stats.summary())
+            self.manifest.save()
+
+
+def _is_cached(job: PrefetchJob) -> bool:
+    """
+    Whether the cache still holds a job's data, in case it was cleared or expired since the manifest
+    recorded it. Prices and line items are checked against the ranges and queries the cache recorded
+    as answered. Financial metrics need `limit` periods up to the job's end date, and insider trades
+    and news need rows inside the job's window, so a ticker without any is fetched again.
+    """
+    cache = api._cache
+    kwargs = job.kwargs()
+    if job.endpoint == "prices":
+        return not cache.get_missing_price_ranges(job.ticker, kwargs["start_date"], kwargs["end_date"])
+    if job.endpoint == "line_items":
+        return not cache.get_missing_line_items(job.ticker, kwargs["line_items"], kwargs["end_date"], kwargs["period"], kwargs["limit"])
+    if job.endpoint == "financial_metrics":
+        metrics = [metric for metric in cache.get_financial_metrics(job.ticker) or [] if metric["period"] == kwargs["period"] and metric["report_period"] <= kwargs["end_date"]]
+        return len(metrics) >= kwargs["limit"]
+    if job.endpoint == "insider_trades":
+        return _any_in_window([trade.get("transaction_date") or trade["filing_date"] for trade in cache.get_insider_trades(job.ticker) or []], kwargs)
+    if job.endpoint == "company_news":
+        return _any_in_window([news["date"] for news in cache.get_company_news(job.ticker) or []], kwargs)
+    return False
+
+
+def _any_in_window(dates: list[str], kwargs: dict[str, Any]) -> bool:
+    """Whether any date falls between the job's start date (if any) and end date, as the API functions filter them."""
+    return any((kwargs.get("start_date") is None or date >= kwargs["start_date"]) and date <= kwargs["end_date"] for date in dates)
+
+
+def _report_inline(line: str):
+    """Overwrite the previous progress line on a terminal."""
+    sys.stdout.write(f"\r{line}\033[K")
+    sys.stdout.flush()
+
+
+_ENDPOINTS = {
+    "prices": api.aget_price_frame,
+    "financial_metrics": api.aget_financial_metrics,
+    "line_items": api.asearch_line_items,
+    "insider_trades": api.aget_insider_trades,
+    "company_news": api.aget_company_news,
+}
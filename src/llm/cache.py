@@ -0,0 +1,177 @@
+"""Persistent cache of structured LLM responses."""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Type, TypeVar
+
+from pydantic import BaseModel
+
+from src.data.cache import get_cache_dir
+
+T = TypeVar("T", bound=BaseModel)
+
+# Set LLM_CACHE=off to always call the model, and LLM_CACHE_TTL to expire responses after that many seconds.
+# Responses are stored next to the financial data cache; with FINANCIAL_DATASETS_CACHE=memory they stay in-process.
+LLM_CACHE_FILE = "llm_responses.sqlite"
+
+
+def _env_ttl() -> float | None:
+    ttl = os.environ.get("LLM_CACHE_TTL")
+    return float(ttl) if ttl else None
+
+
+def canonicalize_prompt(prompt: Any) -> list[tuple[str, str]]:
+    """
+    Reduce a prompt to (role, content) pairs that only change when the model would see a different prompt.
+
+    Accepts a LangChain prompt value, a list of messages or a plain string. Indentation and trailing
+    whitespace of each line are dropped, since the prompt templates are indented as source code.
+    """
+    if hasattr(prompt, "to_messages"):
+        messages = prompt.to_messages()
+    elif isinstance(prompt, (list, tuple)):
+        messages = prompt
+    else:
+        messages = [prompt]
+
+    canonical = []
+    for message in messages:
+        if isinstance(message, str):
+            role, content = "human", message
+        else:
+            role, content = getattr(message, "type", type(message).__name__), getattr(message, "content", message)
+        if not isinstance(content, str):
+            content = json.dumps(content, sort_keys=True, default=str)
+        canonical.append((role, "\n".join(line.strip() for line in content.strip().splitlines())))
+    return canonical
+
+
+def llm_cache_key(prompt: Any, model_name: str, model_provider: str, pydantic_model: Type[BaseModel]) -> str:
+    """Hash of everything that determines a structured response: provider, model, output schema and prompt."""
+    payload = {
+        "model_provider": model_provider,
+        "model_name": model_name,
+        "schema": {"name": pydantic_model.__name__, "fields": pydantic_model.model_json_schema()},
+        "messages": canonicalize_prompt(prompt),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class LLMCache:
+    """
+    Structured LLM responses keyed by llm_cache_key, stored in SQLite.
+
+    The database is opened on first use so that .env files loaded after import still apply.
+    Without a cache directory responses are only kept in memory for the life of the process.
+    """
+
+    def __init__(self, cache_dir: str | None = None, ttl: float | None = None, enabled: bool | None = None):
+        self._cache_dir = cache_dir
+        self.ttl = ttl
+        self._enabled = enabled
+        self._conn: sqlite3.Connection | None = None
+        self._memory: dict[str, tuple[str, float]] = {}
+        self._resolved = False
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        if self._enabled is not None:
+            return self._enabled
+        return os.environ.get("LLM_CACHE", "").lower() not in ("off", "0", "false")
+
+    @property
+    def path(self) -> str | None:
+        cache_dir = self._cache_dir or get_cache_dir()
+        return os.path.join(cache_dir, LLM_CACHE_FILE) if cache_dir else None
+
+    def configure(self, enabled: bool | None = None, ttl: float | None = None):
+        """Turn the cache on or off and/or change how long responses stay valid."""
+        if enabled is not None:
+            self._enabled = enabled
+        if ttl is not None:
+            self.ttl = ttl
+
+    def _connect(self) -> sqlite3.Connection | None:
+        if self._resolved:
+            return self._conn
+        self._resolved = True
+        path = self.path
+        if not path:
+            return None
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                key TEXT PRIMARY KEY,
+                model_provider TEXT NOT NULL,
+                model_name TEXT NOT NULL,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        return self._conn
+
+    def _is_fresh(self, created_at: float) -> bool:
+        ttl = self.ttl if self.ttl is not None else _env_ttl()
+        return ttl is None or time.time() - created_at < ttl
+
+    def get(self, key: str, pydantic_model: Type[T]) -> T | None:
+        """Return the cached response for a key, or None if there is no fresh one."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                row = self._memory.get(key)
+            else:
+                row = conn.execute("SELECT data, created_at FROM llm_responses WHERE key = ?", (key,)).fetchone()
+        if row is None or not self._is_fresh(row[1]):
+            return None
+        try:
+            return pydantic_model.model_validate_json(row[0])
+        except ValueError:
+            # The schema changed shape without changing its name; treat as a miss
+            return None
+
+    def set(self, key: str, response: BaseModel, model_name: str, model_provider: str):
+        """Store a response under a key."""
+        if not self.enabled:
+            return
+        data, created_at = response.model_dump_json(), time.time()
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                self._memory[key] = (data, created_at)
+                return
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, model_provider, model_name, data, created_at) VALUES (?, ?, ?, ?, ?)",
+                (key, model_provider, model_name, data, created_at),
+            )
+            conn.commit()
+
+    def clear(self):
+        """Remove every cached response."""
+        with self._lock:
+            self._memory.clear()
+            conn = self._connect()
+            if conn is not None:
+                conn.execute("DELETE FROM llm_responses")
+                conn.commit()
+
+
+# Global LLM response cache, shared by every agent
+_llm_cache = LLMCache()
+
+
+def get_llm_cache() -> LLMCache:
+    """Get the global LLM response cache."""
+    return _llm_cache
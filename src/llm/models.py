@@ -1,4 +1,5 @@
 import os
+import threading
 from langchain_anthropic import ChatAnthropic
 from langchain_deepseek import ChatDeepSeek
 from langchain_google_genai import ChatGoogleGenerativeAI
@@ -6,7 +7,7 @@ from langchain_groq import ChatGroq
 from langchain_openai import ChatOpenAI
 from enum import Enum
 from pydantic import BaseModel
-from typing import Tuple
+from typing import Any, Tuple, Type
 
 
 class ModelProvider(str, Enum):
@@ -18,6 +19,16 @@ class ModelProvider(str, Enum):
     OPENAI = "OpenAI"
 
 
+# Rough tokenizer density per provider, used to estimate prompt sizes without a tokenizer
+DEFAULT_CHARS_PER_TOKEN = 4.0
+CHARS_PER_TOKEN = {
+    ModelProvider.ANTHROPIC: 3.5,
+    ModelProvider.DEEPSEEK: 3.8,
+    ModelProvider.GEMINI: 4.0,
+    ModelProvider.GROQ: 3.8,
+    ModelProvider.OPENAI: 4.0,
+}
+
 
 class LLMModel(BaseModel):
     """Represents an LLM model configuration"""
@@ -41,6 +52,10 @@ class LLMModel(BaseModel):
         """Check if the model is a Gemini model"""
         return self.model_name.startswith("gemini")
 
+    def chars_per_token(self) -> float:
+        """Average characters per token of the model's tokenizer on English text and JSON"""
+        return CHARS_PER_TOKEN.get(self.provider, DEFAULT_CHARS_PER_TOKEN)
+
 
 # Define available models
 AVAILABLE_MODELS = [
@@ -146,4 +161,37 @@ def get_model(model_name: str, model_provider: ModelProvider) -> ChatOpenAI | Ch
         if not api_key:
             print(f"API Key Error: Please make sure GOOGLE_API_KEY is set in your .env file.")
             raise ValueError("Google API key not found.  Please make sure GOOGLE_API_KEY is set in your .env file.")
-        return ChatGoogleGenerativeAI(model=model_name, api_key=api_key)
\ No newline at end of file
+        return ChatGoogleGenerativeAI(model=model_name, api_key=api_key)
+
+
+# Chat clients shared by every call, keyed by (provider, model, structured output schema)
+_model_registry: dict[tuple[str, str, Type[BaseModel] | None], Any] = {}
+_model_registry_lock = threading.Lock()
+
+
+def get_structured_model(model_name: str, model_provider: ModelProvider | str, pydantic_model: Type[BaseModel] | None = None) -> Any:
+    """
+    Get the shared chat client for a model, bound to a structured output schema when the model has JSON mode.
+
+    Clients are built once per (provider, model, schema) and reused by every agent and thread,
+    so their HTTP connection pools stay warm instead of being rebuilt for each call.
+    """
+    model_info = get_model_info(model_name)
+    if model_info and not model_info.has_json_mode():
+        # Models without JSON mode return raw text that the caller parses
+        pydantic_model = None
+    key = (getattr(model_provider, "value", model_provider), model_name, pydantic_model)
+
+    with _model_registry_lock:
+        if key not in _model_registry:
+            llm = get_model(model_name, model_provider)
+            if pydantic_model is not None:
+                llm = llm.with_structured_output(pydantic_model, method="json_mode")
+            _model_registry[key] = llm
+        return _model_registry[key]
+
+
+def clear_model_registry():
+    """Drop every shared client, e.g. after API keys changed."""
+    with _model_registry_lock:
+        _model_registry.clear()
@@ -15,10 +15,18 @@ from src.agents.sentiment import sentiment_agent
 from src.agents.warren_buffett import warren_buffett_agent
 from src.graph.state import AgentState
 from src.agents.valuation import valuation_agent
+from src.tools.api import prefetch_line_items
 from src.utils.display import print_trading_output
-from src.utils.analysts import ANALYST_ORDER, get_analyst_nodes
+from src.utils.analysts import ANALYST_ORDER, get_analyst_nodes, get_line_item_plan
+from src.utils import concurrency
 from src.utils.progress import progress
 from src.llm.models import LLM_ORDER, get_model_info
+from src.llm.cache import get_llm_cache
+from src.utils import llm as llm_utils
+from src.utils.llm import LLM_MODES
+from src.utils.prompt import compaction_stats
+from src.utils.tracing import DEFAULT_TOP_N, tracer
+from src.utils.cassette import cassette_from_args
 
 import argparse
 from datetime import datetime
@@ -58,44 +66,65 @@ def run_hedge_fund(
     selected_analysts: list[str] = [],
     model_name: str = "gpt-4o",
     model_provider: str = "OpenAI",
+    max_workers: int | None = None,
+    indicator_states=None,
+    batch_llm_calls: bool = False,
+    llm_mode: str = "llm",
+    ambiguity_band: tuple[float, float] | None = None,
 ):
+    # Size the shared per-ticker worker pool (HEDGE_FUND_MAX_WORKERS when not given)
+    concurrency.configure(max_workers=max_workers)
+
     # Start progress tracking
     progress.start()
 
     try:
-        # Create a new workflow if analysts are customized
-        if selected_analysts:
-            workflow = create_workflow(selected_analysts)
-            agent = workflow.compile()
-        else:
-            agent = app
-
-        final_state = agent.invoke(
-            {
-                "messages": [
-                    HumanMessage(
-                        content="Make trading decisions based on the provided data.",
-                    )
-                ],
-                "data": {
-                    "tickers": tickers,
-                    "portfolio": portfolio,
-                    "start_date": start_date,
-                    "end_date": end_date,
-                    "analyst_signals": {},
+        with tracer.span("run_hedge_fund", kind="run", tickers=",".join(tickers), model=model_name):
+            # Create a new workflow if analysts are customized
+            if selected_analysts:
+                workflow = create_workflow(selected_analysts)
+                agent = workflow.compile()
+            else:
+                agent = app
+
+            # Fetch the union of every selected analyst's line items once per (ticker, period), all
+            # pairs at once; each analyst's own search_line_items call is then served from the cache
+            with tracer.span("prefetch_line_items", kind="fetch"):
+                prefetch_line_items(tickers, get_line_item_plan(selected_analysts), end_date)
+
+            final_state = agent.invoke(
+                {
+                    "messages": [
+                        HumanMessage(
+                            content="Make trading decisions based on the provided data.",
+                        )
+                    ],
+                    "data": {
+                        "tickers": tickers,
+                        "portfolio": portfolio,
+                        "start_date": start_date,
+                        "end_date": end_date,
+                        "analyst_signals": {},
+                    },
+                    "metadata": {
+                        "show_reasoning": show_reasoning,
+                        "model_name": model_name,
+                        "model_provider": model_provider,
+                        # Technical indicator state carried across calls by streaming backtests
+                        "indicator_states": indicator_states,
+                        # Persona agents send many tickers per LLM request instead of one each
+                        "batch_llm_calls": batch_llm_calls,
+                        # Whether persona agents ask the LLM or report their rule-based signals (see needs_llm)
+                        "llm_mode": llm_mode,
+                        "ambiguity_band": ambiguity_band,
+                    },
                 },
-                "metadata": {
-                    "show_reasoning": show_reasoning,
-                    "model_name": model_name,
-                    "model_provider": model_provider,
-                },
-            },
-        )
+            )
 
-        return {
-            "decisions": parse_hedge_fund_response(final_state["messages"][-1].content),
-            "analyst_signals": final_state["data"]["analyst_signals"],
-        }
+            return {
+                "decisions": parse_hedge_fund_response(final_state["messages"][-1].content),
+                "analyst_signals": final_state["data"]["analyst_signals"],
+            }
     finally:
         # Stop progress tracking
         progress.stop()
@@ -109,7 +138,12 @@ def start(state: AgentState):
 def create_workflow(selected_analysts=None):
     """Create the workflow with selected analysts."""
     workflow = StateGraph(AgentState)
-    workflow.add_node("start_node", start)
+
+    def add_node(node_name, node_func):
+        # Each node runs as a span of the run, so traces show where its time went
+        workflow.add_node(node_name, tracer.traced(node_name, kind="node")(node_func))
+
+    add_node("start_node", start)
 
     # Get analyst nodes from the configuration
     analyst_nodes = get_analyst_nodes()
@@ -120,12 +154,12 @@ def create_workflow(selected_analysts=None):
     # Add selected analyst nodes
     for analyst_key in selected_analysts:
         node_name, node_func = analyst_nodes[analyst_key]
-        workflow.add_node(node_name, node_func)
+        add_node(node_name, node_func)
         workflow.add_edge("start_node", node_name)
 
     # Always add risk and portfolio management
-    workflow.add_node("risk_management_agent", risk_management_agent)
-    workflow.add_node("portfolio_management_agent", portfolio_management_agent)
+    add_node("risk_management_agent", risk_management_agent)
+    add_node("portfolio_management_agent", portfolio_management_agent)
 
     # Connect selected analysts to risk management
     for analyst_key in selected_analysts:
@@ -152,8 +186,40 @@ if __name__ == "__main__":
     parser.add_argument("--end-date", type=str, help="End date (YYYY-MM-DD). Defaults to today")
     parser.add_argument("--show-reasoning", action="store_true", help="Show reasoning from each agent")
     parser.add_argument("--show-agent-graph", action="store_true", help="Show the agent graph")
+    parser.add_argument("--max-workers", type=int, help="Threads used to analyze tickers in parallel. Defaults to HEDGE_FUND_MAX_WORKERS or 8")
+    parser.add_argument("--batch-llm", action="store_true", help="Let each persona agent analyze many tickers per LLM call")
+    parser.add_argument(
+        "--llm-mode",
+        choices=LLM_MODES,
+        default="llm",
+        help="Persona agents: always ask the LLM (llm), never (deterministic), or only for ambiguous scores (hybrid)",
+    )
+    parser.add_argument(
+        "--ambiguity-band",
+        type=float,
+        nargs=2,
+        metavar=("LOW", "HIGH"),
+        help="Score / max score range in which hybrid mode asks the LLM. Defaults to 0.4 0.6",
+    )
+    parser.add_argument("--stream-llm", action="store_true", help="Stream LLM responses and show their progress")
+    parser.add_argument("--llm-deadline", type=float, help="Seconds after which an LLM call is abandoned for a default signal")
+    parser.add_argument("--fallback-model", type=str, help="Model to fail over to while the selected model's provider keeps failing")
+    parser.add_argument("--progress-timings", type=str, help="Write how long each agent spent in each stage to this CSV file")
+    parser.add_argument("--trace", type=str, metavar="PATH", help="Record how long each node, data fetch and LLM call took and write the spans to PATH as JSON lines")
+    parser.add_argument("--trace-top", type=int, default=DEFAULT_TOP_N, help=f"Slowest spans listed in the trace summary. Defaults to {DEFAULT_TOP_N}")
+    cassette_group = parser.add_mutually_exclusive_group()
+    cassette_group.add_argument("--record-cassette", type=str, metavar="PATH", help="Record every API response and LLM result of the run to a compressed cassette")
+    cassette_group.add_argument("--replay-cassette", type=str, metavar="PATH", help="Serve every API response and LLM result from a recorded cassette, without network access")
+    parser.add_argument("--no-llm-cache", action="store_true", help="Always call the LLM instead of reusing cached responses to identical prompts")
 
     args = parser.parse_args()
+    if args.no_llm_cache:
+        get_llm_cache().configure(enabled=False)
+    llm_utils.configure(stream=args.stream_llm or None, deadline=args.llm_deadline)
+    if args.fallback_model:
+        llm_utils.scheduler.configure(fallback_model=args.fallback_model)
+    if args.trace:
+        tracer.configure(path=args.trace)
 
     # Parse tickers from comma-separated string
     tickers = [ticker.strip() for ticker in args.tickers.split(",")]
@@ -266,14 +332,27 @@ if __name__ == "__main__":
     }
 
     # Run the hedge fund
-    result = run_hedge_fund(
-        tickers=tickers,
-        start_date=start_date,
-        end_date=end_date,
-        portfolio=portfolio,
-        show_reasoning=args.show_reasoning,
-        selected_analysts=selected_analysts,
-        model_name=model_choice,
-        model_provider=model_provider,
-    )
+    with cassette_from_args(record=args.record_cassette, replay=args.replay_cassette):
+        result = run_hedge_fund(
+            tickers=tickers,
+            start_date=start_date,
+            end_date=end_date,
+            portfolio=portfolio,
+            show_reasoning=args.show_reasoning,
+            selected_analysts=selected_analysts,
+            model_name=model_choice,
+            model_provider=model_provider,
+            max_workers=args.max_workers,
+            batch_llm_calls=args.batch_llm,
+            llm_mode=args.llm_mode,
+            ambiguity_band=tuple(args.ambiguity_band) if args.ambiguity_band else None,
+        )
     print_trading_output(result)
+    if summary := compaction_stats.summary():
+        print(summary)
+    if args.progress_timings:
+        progress.export_timings(args.progress_timings)
+    if tracer.enabled:
+        print(tracer.summary(args.trace_top))
+        if path := tracer.export():
+            print(f"Trace written to {path}")
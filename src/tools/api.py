@@ -1,8 +1,18 @@
+import asyncio
+import functools
+import json
 import os
+import weakref
+
+import httpx
+import numpy as np
 import pandas as pd
-import requests
 
-from src.data.cache import get_cache
+from src.data.cache import build_price_frame, get_cache
+from src.utils import cassette
+from src.utils.concurrency import async_concurrency_limit, run_sync
+from src.utils.rate_limit import TokenBucket, backoff_delay, parse_retry_after
+from src.utils.tracing import tracer
 from src.data.models import (
     CompanyNews,
     CompanyNewsResponse,
@@ -19,10 +29,49 @@ from src.data.models import (
 # Global cache instance
 _cache = get_cache()
 
-# Use a shared requests session for connection pooling
-session = requests.Session()
 DEFAULT_TIMEOUT = 10  # seconds
 
+# Request quota of the Financial Datasets plan, in requests per minute
+DEFAULT_RATE_LIMIT = 1000
+_rate_limiter = TokenBucket(rate=float(os.environ.get("FINANCIAL_DATASETS_RATE_LIMIT", DEFAULT_RATE_LIMIT)) / 60)
+
+# Retries for rate-limited (429), server (5xx) and network failures
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0  # seconds
+BACKOFF_MAX = 30.0  # seconds
+
+# One pooled client and one table of in-flight requests per event loop
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_in_flight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[tuple, asyncio.Future]]" = weakref.WeakKeyDictionary()
+# Per event loop, one lock per (fetch function, ticker); see _one_fetch_per_ticker
+_ticker_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[tuple, asyncio.Lock]]" = weakref.WeakKeyDictionary()
+
+
+class FinancialDatasetsError(Exception):
+    """A request to the Financial Datasets API failed."""
+
+    def __init__(self, ticker: str, status_code: int | None, detail: str):
+        super().__init__(f"Error fetching data: {ticker} - {status_code if status_code is not None else 'network error'} - {detail}")
+        self.ticker = ticker
+        self.status_code = status_code
+        self.detail = detail
+
+
+class ClientError(FinancialDatasetsError):
+    """The API rejected the request (4xx other than 429); retrying will not help."""
+
+
+class RateLimitError(FinancialDatasetsError):
+    """The API kept answering 429 Too Many Requests after every retry."""
+
+    def __init__(self, ticker: str, status_code: int | None, detail: str, retry_after: float | None = None):
+        super().__init__(ticker, status_code, detail)
+        self.retry_after = retry_after
+
+
+class ServerError(FinancialDatasetsError):
+    """The API kept failing with 5xx responses or network errors after every retry."""
+
 
 def _get_api_headers() -> dict:
     """Return headers with API key if available."""
@@ -32,36 +81,143 @@ def _get_api_headers() -> dict:
     return headers
 
 
-def get_prices(ticker: str, start_date: str, end_date: str) -> list[Price]:
-    """Fetch price data from cache or API."""
-    # Check cache first
-    if cached_data := _cache.get_prices(ticker):
-        # Filter cached data by date range and convert to Price objects
-        filtered_data = [Price(**price) for price in cached_data if start_date <= price["time"] <= end_date]
-        if filtered_data:
-            return filtered_data
-
-    # If not in cache or no data in range, fetch from API
-    headers = _get_api_headers()
-
-    url = f"https://api.financialdatasets.ai/prices/?ticker={ticker}&interval=day&interval_multiplier=1&start_date={start_date}&end_date={end_date}"
-    response = session.get(url, headers=headers, timeout=DEFAULT_TIMEOUT)
-    if response.status_code != 200:
-        raise Exception(f"Error fetching data: {ticker} - {response.status_code} - {response.text}")
-
-    # Parse response with Pydantic model
-    price_response = PriceResponse(**response.json())
-    prices = price_response.prices
-
-    if not prices:
+def _get_client() -> httpx.AsyncClient:
+    """Get the connection-pooling HTTP client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    if (client := _clients.get(loop)) is None:
+        # Requests go through the cassette transport, which records or replays them while a cassette is in use
+        client = _clients[loop] = httpx.AsyncClient(timeout=DEFAULT_TIMEOUT, transport=cassette.CassetteTransport())
+    return client
+
+
+async def _request_json(ticker: str, method: str, url: str, body: dict | None) -> dict:
+    """
+    Send a request within the plan's rate limit and the data API concurrency limit.
+
+    429, 5xx and network failures are retried with backoff, honouring Retry-After;
+    anything still failing afterwards raises a FinancialDatasetsError subclass.
+    Replayed responses skip the rate limit and the backoff, since no request reaches the API.
+    """
+    with tracer.span(f"http.{method}", kind="http", ticker=ticker, url=url) as span:
+        for attempt in range(MAX_RETRIES + 1):
+            replaying = cassette.replaying()
+            if not replaying:
+                await _rate_limiter.acquire()
+            retry_after = None
+            span.set(attempts=attempt + 1)
+            try:
+                async with async_concurrency_limit("financial_datasets"):
+                    response = await _get_client().request(method, url, headers=_get_api_headers(), json=body)
+            except httpx.TransportError as e:
+                error = ServerError(ticker, None, repr(e))
+            else:
+                span.set(status=response.status_code, bytes=len(response.content))
+                if response.status_code == 200:
+                    return response.json()
+                if response.status_code == 429:
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    error = RateLimitError(ticker, response.status_code, response.text, retry_after)
+                    # Hold back every other request too; the quota is shared
+                    _rate_limiter.pause(retry_after if retry_after is not None else BACKOFF_BASE)
+                elif response.status_code >= 500:
+                    error = ServerError(ticker, response.status_code, response.text)
+                else:
+                    raise ClientError(ticker, response.status_code, response.text)
+
+            if attempt < MAX_RETRIES and not replaying:
+                await asyncio.sleep(backoff_delay(attempt, retry_after, base=BACKOFF_BASE, cap=BACKOFF_MAX))
+        raise error
+
+
+async def _fetch_json(ticker: str, method: str, url: str, body: dict | None = None) -> dict:
+    """Fetch a JSON payload, sharing one HTTP call between identical requests already in flight."""
+    key = (method, url, json.dumps(body, sort_keys=True))
+    # Counted on the caller's fetch span even when joining a request in flight, so it is not reported as a cache hit
+    tracer.current_span().add("requests")
+    in_flight = _in_flight.setdefault(asyncio.get_running_loop(), {})
+    # Shield the shared call so one caller being cancelled does not cancel it for the others
+    if (future := in_flight.get(key)) is not None:
+        return await asyncio.shield(future)
+    future = in_flight[key] = asyncio.ensure_future(_request_json(ticker, method, url, body))
+    try:
+        return await asyncio.shield(future)
+    finally:
+        # Dropped only once the first caller resumes and can cache the response; a done callback
+        # would run before that, leaving a moment when an identical request misses both
+        in_flight.pop(key, None)
+
+
+def _traced_fetch(fn):
+    """Trace a data fetch, recording whether the cache served all of it and how many records it returned."""
+
+    @functools.wraps(fn)
+    async def wrapper(ticker: str, *args, **kwargs):
+        with tracer.span(fn.__name__.removeprefix("a"), kind="fetch", ticker=ticker) as span:
+            result = await fn(ticker, *args, **kwargs)
+            span.set(cache_hit=not span.get("requests"), records=len(result))
+            return result
+
+    return wrapper
+
+
+def _one_fetch_per_ticker(fn):
+    """
+    Let one call at a time look up and fetch a ticker's rows of a dataset.
+
+    Agents ask for the same ticker's news, insider trades and metrics with different limits, so
+    their requests differ and are not shared in flight. Taking turns lets the later calls be served
+    from what the first one cached, rather than each missing the cache and calling the API.
+    """
+
+    @functools.wraps(fn)
+    async def wrapper(ticker: str, *args, **kwargs):
+        locks = _ticker_locks.setdefault(asyncio.get_running_loop(), {})
+        async with locks.setdefault((fn.__name__, ticker), asyncio.Lock()):
+            return await fn(ticker, *args, **kwargs)
+
+    return wrapper
+
+
+async def _fill_price_gaps(ticker: str, start_date: str, end_date: str):
+    """Fetch and cache only the parts of the date range that earlier price fetches did not cover."""
+
+    async def fetch_range(range_start: str, range_end: str):
+        # gather() starts this as a new task, and an identical fetch may have filled the range meanwhile
+        if not _cache.get_missing_price_ranges(ticker, range_start, range_end):
+            return
+        url = f"https://api.financialdatasets.ai/prices/?ticker={ticker}&interval=day&interval_multiplier=1&start_date={range_start}&end_date={range_end}"
+        data = await _fetch_json(ticker, "GET", url)
+
+        # Parse response with Pydantic model
+        price_response = PriceResponse(**data)
+
+        # Cache the results as dicts, recording the range even if it had no trading days
+        _cache.set_prices(ticker, [p.model_dump() for p in price_response.prices], range_start, range_end)
+
+    await asyncio.gather(*[fetch_range(range_start, range_end) for range_start, range_end in _cache.get_missing_price_ranges(ticker, start_date, end_date)])
+
+
+@_traced_fetch
+async def aget_prices(ticker: str, start_date: str, end_date: str) -> list[Price]:
+    """Fetch price data from cache, downloading only the missing sub-ranges from the API."""
+    await _fill_price_gaps(ticker, start_date, end_date)
+    cached_frame = _cache.get_price_frame(ticker, start_date, end_date)
+    if cached_frame is None:
         return []
+    return [Price(**price) for price in cached_frame.to_dict("records")]
 
-    # Cache the results as dicts
-    _cache.set_prices(ticker, [p.model_dump() for p in prices])
-    return prices
 
+@_traced_fetch
+async def aget_price_frame(ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
+    """Fetch prices as a date-indexed DataFrame, sliced from the columnar cache without building Price objects."""
+    await _fill_price_gaps(ticker, start_date, end_date)
+    frame = _cache.get_price_frame(ticker, start_date, end_date)
+    return frame if frame is not None else build_price_frame([])
 
-def get_financial_metrics(
+
+@_traced_fetch
+@_one_fetch_per_ticker
+async def aget_financial_metrics(
     ticker: str,
     end_date: str,
     period: str = "ttm",
@@ -77,15 +233,11 @@ def get_financial_metrics(
             return filtered_data[:limit]
 
     # If not in cache or insufficient data, fetch from API
-    headers = _get_api_headers()
-
     url = f"https://api.financialdatasets.ai/financial-metrics/?ticker={ticker}&report_period_lte={end_date}&limit={limit}&period={period}"
-    response = session.get(url, headers=headers, timeout=DEFAULT_TIMEOUT)
-    if response.status_code != 200:
-        raise Exception(f"Error fetching data: {ticker} - {response.status_code} - {response.text}")
+    data = await _fetch_json(ticker, "GET", url)
 
     # Parse response with Pydantic model
-    metrics_response = FinancialMetricsResponse(**response.json())
+    metrics_response = FinancialMetricsResponse(**data)
     # Return the FinancialMetrics objects directly instead of converting to dict
     financial_metrics = metrics_response.financial_metrics
 
@@ -97,40 +249,45 @@ def get_financial_metrics(
     return financial_metrics
 
 
-def search_line_items(
+@_traced_fetch
+async def asearch_line_items(
     ticker: str,
     line_items: list[str],
     end_date: str,
     period: str = "ttm",
     limit: int = 10,
 ) -> list[LineItem]:
-    """Fetch line items from API."""
-    # If not in cache or insufficient data, fetch from API
-    headers = _get_api_headers()
-
-    url = "https://api.financialdatasets.ai/financials/search/line-items"
-
-    body = {
-        "tickers": [ticker],
-        "line_items": line_items,
-        "end_date": end_date,
-        "period": period,
-        "limit": limit,
-    }
-    response = session.post(url, headers=headers, json=body, timeout=DEFAULT_TIMEOUT)
-    if response.status_code != 200:
-        raise Exception(f"Error fetching data: {ticker} - {response.status_code} - {response.text}")
-    data = response.json()
-    response_model = LineItemResponse(**data)
-    search_results = response_model.search_results
-    if not search_results:
-        return []
-
-    # Cache the results
-    return search_results[:limit]
-
-
-def get_insider_trades(
+    """Fetch line items from cache or API, requesting only the fields that are not cached yet."""
+    # Check cache first
+    missing_line_items = _cache.get_missing_line_items(ticker, line_items, end_date, period, limit)
+
+    # Fetch every missing field in a single request
+    if missing_line_items:
+        url = "https://api.financialdatasets.ai/financials/search/line-items"
+
+        body = {
+            "tickers": [ticker],
+            "line_items": missing_line_items,
+            "end_date": end_date,
+            "period": period,
+            "limit": limit,
+        }
+        data = await _fetch_json(ticker, "POST", url, body)
+        response_model = LineItemResponse(**data)
+        search_results = response_model.search_results[:limit]
+
+        # Cache the results, including an empty answer so it is not requested again
+        _cache.set_line_items(ticker, period, [item.model_dump() for item in search_results], missing_line_items, end_date, limit)
+
+    # Serve the requested slice of each cached row
+    fields = ["ticker", "report_period", "period", "currency", *line_items]
+    cached_rows = _cache.get_line_items(ticker, period, end_date, limit)
+    return [LineItem(**{field: row[field] for field in fields if field in row}) for row in cached_rows]
+
+
+@_traced_fetch
+@_one_fetch_per_ticker
+async def aget_insider_trades(
     ticker: str,
     end_date: str,
     start_date: str | None = None,
@@ -148,8 +305,6 @@ def get_insider_trades(
             return filtered_data
 
     # If not in cache or insufficient data, fetch from API
-    headers = _get_api_headers()
-
     all_trades = []
     current_end_date = end_date
     
@@ -159,11 +314,7 @@ def get_insider_trades(
             url += f"&filing_date_gte={start_date}"
         url += f"&limit={limit}"
         
-        response = session.get(url, headers=headers, timeout=DEFAULT_TIMEOUT)
-        if response.status_code != 200:
-            raise Exception(f"Error fetching data: {ticker} - {response.status_code} - {response.text}")
-        
-        data = response.json()
+        data = await _fetch_json(ticker, "GET", url)
         response_model = InsiderTradeResponse(**data)
         insider_trades = response_model.insider_trades
         
@@ -191,7 +342,9 @@ def get_insider_trades(
     return all_trades
 
 
-def get_company_news(
+@_traced_fetch
+@_one_fetch_per_ticker
+async def aget_company_news(
     ticker: str,
     end_date: str,
     start_date: str | None = None,
@@ -209,8 +362,6 @@ def get_company_news(
             return filtered_data
 
     # If not in cache or insufficient data, fetch from API
-    headers = _get_api_headers()
-
     all_news = []
     current_end_date = end_date
     
@@ -220,11 +371,7 @@ def get_company_news(
             url += f"&start_date={start_date}"
         url += f"&limit={limit}"
         
-        response = session.get(url, headers=headers, timeout=DEFAULT_TIMEOUT)
-        if response.status_code != 200:
-            raise Exception(f"Error fetching data: {ticker} - {response.status_code} - {response.text}")
-        
-        data = response.json()
+        data = await _fetch_json(ticker, "GET", url)
         response_model = CompanyNewsResponse(**data)
         company_news = response_model.news
         
@@ -252,6 +399,75 @@ def get_company_news(
     return all_news
 
 
+# Synchronous wrappers for existing callers; they run on the shared background event loop
+def get_prices(ticker: str, start_date: str, end_date: str) -> list[Price]:
+    """Fetch price data from cache, downloading only the missing sub-ranges from the API."""
+    return run_sync(aget_prices(ticker, start_date, end_date))
+
+
+def get_price_frame(ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
+    """Fetch prices as a date-indexed DataFrame, sliced from the columnar cache without building Price objects."""
+    return run_sync(aget_price_frame(ticker, start_date, end_date))
+
+
+def get_financial_metrics(
+    ticker: str,
+    end_date: str,
+    period: str = "ttm",
+    limit: int = 10,
+) -> list[FinancialMetrics]:
+    """Fetch financial metrics from cache or API."""
+    return run_sync(aget_financial_metrics(ticker, end_date, period, limit))
+
+
+def search_line_items(
+    ticker: str,
+    line_items: list[str],
+    end_date: str,
+    period: str = "ttm",
+    limit: int = 10,
+) -> list[LineItem]:
+    """Fetch line items from cache or API, requesting only the fields that are not cached yet."""
+    return run_sync(asearch_line_items(ticker, line_items, end_date, period, limit))
+
+
+def prefetch_line_items(tickers: list[str], line_item_plan: dict[str, dict], end_date: str):
+    """
+    Fill the cache with every ticker's line items for each period of `line_item_plan`
+    (see get_line_item_plan), fetching all (ticker, period) pairs concurrently.
+    """
+    run_sync(_search_all_line_items(tickers, line_item_plan, end_date))
+
+
+async def _search_all_line_items(tickers: list[str], line_item_plan: dict[str, dict], end_date: str):
+    await asyncio.gather(
+        *[
+            asearch_line_items(ticker, request["line_items"], end_date, period=period, limit=request["limit"])
+            for ticker in tickers
+            for period, request in line_item_plan.items()
+        ]
+    )
+
+
+def get_insider_trades(
+    ticker: str,
+    end_date: str,
+    start_date: str | None = None,
+    limit: int = 1000,
+) -> list[InsiderTrade]:
+    """Fetch insider trades from cache or API."""
+    return run_sync(aget_insider_trades(ticker, end_date, start_date, limit))
+
+
+def get_company_news(
+    ticker: str,
+    end_date: str,
+    start_date: str | None = None,
+    limit: int = 1000,
+) -> list[CompanyNews]:
+    """Fetch company news from cache or API."""
+    return run_sync(aget_company_news(ticker, end_date, start_date, limit))
+
 
 def get_market_cap(
     ticker: str,
@@ -266,19 +482,31 @@ def get_market_cap(
     return market_cap
 
 
+def get_close_asof(tickers: list[str], date: str, start_date: str | None = None) -> np.ndarray:
+    """
+    Get each ticker's latest close on or before `date`, in ticker order.
+
+    With `start_date`, any part of `start_date`..`date` that no earlier fetch covered (a failed
+    prefetch, an expired or cleared cache) is downloaded first. Without it only cached prices are
+    read. Tickers without a close yet are NaN.
+    """
+    if start_date is not None:
+        # Coverage is checked in memory, so fully prefetched days never leave this thread
+        uncovered = [ticker for ticker in tickers if _cache.get_missing_price_ranges(ticker, start_date, date)]
+        if uncovered:
+            run_sync(_fill_all_price_gaps(uncovered, start_date, date))
+    return _cache.get_close_asof(tickers, date)
+
+
+async def _fill_all_price_gaps(tickers: list[str], start_date: str, end_date: str):
+    await asyncio.gather(*[_fill_price_gaps(ticker, start_date, end_date) for ticker in tickers])
+
+
 def prices_to_df(prices: list[Price]) -> pd.DataFrame:
     """Convert prices to a DataFrame."""
-    df = pd.DataFrame([p.model_dump() for p in prices])
-    df["Date"] = pd.to_datetime(df["time"])
-    df.set_index("Date", inplace=True)
-    numeric_cols = ["open", "close", "high", "low", "volume"]
-    for col in numeric_cols:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
-    df.sort_index(inplace=True)
-    return df
+    return build_price_frame([p.model_dump() for p in prices])
 
 
-# Update the get_price_data function to use the new functions
 def get_price_data(ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
-    prices = get_prices(ticker, start_date, end_date)
-    return prices_to_df(prices)
+    """Get prices as a read-only, date-indexed DataFrame."""
+    return get_price_frame(ticker, start_date, end_date)
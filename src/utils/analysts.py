@@ -1,16 +1,16 @@
 """Constants and utilities related to analysts configuration."""
 
-from src.agents.ben_graham import ben_graham_agent
-from src.agents.bill_ackman import bill_ackman_agent
-from src.agents.cathie_wood import cathie_wood_agent
-from src.agents.charlie_munger import charlie_munger_agent
+from src.agents.ben_graham import LINE_ITEM_REQUEST as BEN_GRAHAM_LINE_ITEMS, ben_graham_agent
+from src.agents.bill_ackman import LINE_ITEM_REQUEST as BILL_ACKMAN_LINE_ITEMS, bill_ackman_agent
+from src.agents.cathie_wood import LINE_ITEM_REQUEST as CATHIE_WOOD_LINE_ITEMS, cathie_wood_agent
+from src.agents.charlie_munger import LINE_ITEM_REQUEST as CHARLIE_MUNGER_LINE_ITEMS, charlie_munger_agent
 from src.agents.fundamentals import fundamentals_agent
-from src.agents.phil_fisher import phil_fisher_agent
+from src.agents.phil_fisher import LINE_ITEM_REQUEST as PHIL_FISHER_LINE_ITEMS, phil_fisher_agent
 from src.agents.sentiment import sentiment_agent
-from src.agents.stanley_druckenmiller import stanley_druckenmiller_agent
+from src.agents.stanley_druckenmiller import LINE_ITEM_REQUEST as STANLEY_DRUCKENMILLER_LINE_ITEMS, stanley_druckenmiller_agent
 from src.agents.technicals import technical_analyst_agent
-from src.agents.valuation import valuation_agent
-from src.agents.warren_buffett import warren_buffett_agent
+from src.agents.valuation import LINE_ITEM_REQUEST as VALUATION_LINE_ITEMS, valuation_agent
+from src.agents.warren_buffett import LINE_ITEM_REQUEST as WARREN_BUFFETT_LINE_ITEMS, warren_buffett_agent
 
 # Display name for the risk management agent
 RISK_MANAGEMENT_DISPLAY = "Risk Management"
@@ -20,36 +20,43 @@ ANALYST_CONFIG = {
     "ben_graham": {
         "display_name": "Ben Graham",
         "agent_func": ben_graham_agent,
+        "line_item_request": BEN_GRAHAM_LINE_ITEMS,
         "order": 0,
     },
     "bill_ackman": {
         "display_name": "Bill Ackman",
         "agent_func": bill_ackman_agent,
+        "line_item_request": BILL_ACKMAN_LINE_ITEMS,
         "order": 1,
     },
     "cathie_wood": {
         "display_name": "Cathie Wood",
         "agent_func": cathie_wood_agent,
+        "line_item_request": CATHIE_WOOD_LINE_ITEMS,
         "order": 2,
     },
     "charlie_munger": {
         "display_name": "Charlie Munger",
         "agent_func": charlie_munger_agent,
+        "line_item_request": CHARLIE_MUNGER_LINE_ITEMS,
         "order": 3,
     },
     "phil_fisher": {
         "display_name": "Phil Fisher",
         "agent_func": phil_fisher_agent,
+        "line_item_request": PHIL_FISHER_LINE_ITEMS,
         "order": 4,
     },
     "stanley_druckenmiller": {
         "display_name": "Stanley Druckenmiller",
         "agent_func": stanley_druckenmiller_agent,
+        "line_item_request": STANLEY_DRUCKENMILLER_LINE_ITEMS,
         "order": 5,
     },
     "warren_buffett": {
         "display_name": "Warren Buffett",
         "agent_func": warren_buffett_agent,
+        "line_item_request": WARREN_BUFFETT_LINE_ITEMS,
         "order": 6,
     },
     "technical_analyst": {
@@ -70,6 +77,7 @@ ANALYST_CONFIG = {
     "valuation_analyst": {
         "display_name": "Valuation Analyst",
         "agent_func": valuation_agent,
+        "line_item_request": VALUATION_LINE_ITEMS,
         "order": 10,
     },
 }
@@ -94,6 +102,24 @@ ANALYST_ORDER_MAP = {display: idx for idx, (display, _) in enumerate(ANALYST_ORD
 ANALYST_ORDER_MAP["Risk Management"] = len(ANALYST_ORDER)
 
 
+def get_line_item_plan(selected_analysts: list[str] | None = None) -> dict[str, dict]:
+    """
+    Merge the line item requests of the selected analysts into one request per period.
+
+    Each period gets the union of the requested line items and the largest limit, so one
+    fetch per (ticker, period) fills the cache that every analyst then reads its slice from.
+    """
+    plan = {}
+    for analyst_key in selected_analysts or ANALYST_CONFIG:
+        request = ANALYST_CONFIG[analyst_key].get("line_item_request")
+        if not request:
+            continue
+        merged = plan.setdefault(request["period"], {"line_items": [], "limit": 0})
+        merged["line_items"].extend(item for item in request["line_items"] if item not in merged["line_items"])
+        merged["limit"] = max(merged["limit"], request["limit"])
+    return plan
+
+
 def get_analyst_nodes():
     """Get the mapping of analyst keys to their (node_name, agent_func) tuples."""
     return {key: (f"{key}_agent", config["agent_func"]) for key, config in ANALYST_CONFIG.items()}
@@ -0,0 +1,177 @@
+"""Record and replay every data API response and LLM completion of a run through a compressed cassette."""
+
+import base64
+import gzip
+import hashlib
+import json
+import os
+import threading
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from typing import Any, Iterator, Type
+
+import httpx
+from pydantic import BaseModel
+
+CASSETTE_MODES = ("record", "replay")
+
+# Response headers that describe the encoding on the wire rather than the body; the recorded body is already decoded
+_WIRE_HEADERS = ("content-encoding", "content-length", "transfer-encoding", "connection")
+
+
+class CassetteMiss(LookupError):
+    """A replayed run made a request or LLM call that the cassette did not record."""
+
+
+def http_key(method: str, url: str, content: bytes) -> str:
+    """Identify a request by method, URL and body. Headers are left out, so API keys are never written to a cassette."""
+    return f"{method} {url} {hashlib.sha256(content).hexdigest()}"
+
+
+class Cassette:
+    """
+    Responses of a run, stored as gzip-compressed JSON lines.
+
+    In "record" mode every HTTP response and LLM result passing through is appended and written out
+    by save(). In "replay" mode they are loaded from the file and served in the order they were
+    recorded for each request, repeating the last one once a request was made more often than when
+    recording. Anything not recorded raises CassetteMiss instead of reaching the network.
+    """
+
+    def __init__(self, path: str, mode: str = "replay"):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Unknown cassette mode {mode!r}, expected one of {CASSETTE_MODES}")
+        self.path = path
+        self.mode = mode
+        self._entries: list[dict[str, Any]] = []
+        self._recorded: dict[tuple[str, str], list[dict[str, Any]]] = {}
+        self._served: dict[tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        if mode == "replay":
+            self.load()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                self._recorded.setdefault((entry["type"], entry["key"]), []).append(entry)
+
+    def save(self):
+        """Write the recorded entries (record mode only), replacing the file atomically."""
+        if self.mode != "record":
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with self._lock:
+            entries = list(self._entries)
+        # A fixed mtime keeps the file identical for identical recordings
+        with open(tmp_path, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+            for entry in entries:
+                f.write((json.dumps(entry, sort_keys=True) + "\n").encode("utf-8"))
+        os.replace(tmp_path, self.path)
+
+    def _record(self, entry: dict[str, Any]):
+        with self._lock:
+            self._entries.append(entry)
+
+    def _replay(self, kind: str, key: str) -> dict[str, Any]:
+        with self._lock:
+            entries = self._recorded.get((kind, key))
+            if not entries:
+                raise CassetteMiss(f"No recorded {kind} response for {key}")
+            index = self._served.get((kind, key), 0)
+            self._served[(kind, key)] = index + 1
+            return entries[min(index, len(entries) - 1)]
+
+    def record_http(self, request: httpx.Request, status_code: int, headers: httpx.Headers, content: bytes):
+        self._record(
+            {
+                "type": "http",
+                "key": http_key(request.method, str(request.url), request.content),
+                "status": status_code,
+                "headers": [[name, value] for name, value in headers.items() if name.lower() not in _WIRE_HEADERS],
+                "content": base64.b64encode(content).decode("ascii"),
+            }
+        )
+
+    def replay_http(self, request: httpx.Request) -> httpx.Response:
+        entry = self._replay("http", http_key(request.method, str(request.url), request.content))
+        return httpx.Response(entry["status"], headers=entry["headers"], content=base64.b64decode(entry["content"]), request=request)
+
+    def record_llm(self, key: str, response: BaseModel | None):
+        self._record({"type": "llm", "key": key, "response": response.model_dump_json() if response is not None else None})
+
+    def replay_llm(self, key: str, pydantic_model: Type[BaseModel]) -> BaseModel | None:
+        response = self._replay("llm", key)["response"]
+        return pydantic_model.model_validate_json(response) if response is not None else None
+
+
+class CassetteTransport(httpx.AsyncBaseTransport):
+    """Sends requests through `transport`, recording them into or replaying them from the active cassette."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport | None = None):
+        self.transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        cassette = get_cassette()
+        if cassette is not None and cassette.replaying:
+            return cassette.replay_http(request)
+
+        response = await self.transport.handle_async_request(request)
+        if cassette is not None:
+            content = await response.aread()
+            await response.aclose()
+            cassette.record_http(request, response.status_code, response.headers, content)
+            return httpx.Response(response.status_code, headers=[(name, value) for name, value in response.headers.items() if name.lower() not in _WIRE_HEADERS], content=content, request=request)
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+_cassette: Cassette | None = None
+
+
+def get_cassette() -> Cassette | None:
+    """The cassette of the current run, if one is recording or replaying."""
+    return _cassette
+
+
+def replaying() -> bool:
+    """Whether responses are being served from a cassette instead of the network."""
+    return _cassette is not None and _cassette.replaying
+
+
+@contextmanager
+def use_cassette(path: str, mode: str) -> Iterator[Cassette]:
+    """Record into, or replay from, the cassette at `path` for the duration of the block; recordings are saved on exit."""
+    global _cassette
+    previous, _cassette = _cassette, Cassette(path, mode)
+    try:
+        yield _cassette
+    finally:
+        cassette, _cassette = _cassette, previous
+        cassette.save()
+
+
+def cassette_from_args(record: str | None = None, replay: str | None = None) -> AbstractContextManager:
+    """
+    The cassette for the --record-cassette / --replay-cassette options, or a no-op context without either.
+
+    Cassette runs keep the financial data cache in memory. A recording then holds every response the
+    run needed, and a replay serves them all, rather than either depending on the on-disk cache.
+    Call this before the first data fetch.
+    """
+    if record and replay:
+        raise ValueError("Cannot record and replay a cassette in the same run")
+    if record or replay:
+        os.environ["FINANCIAL_DATASETS_CACHE"] = "memory"
+    if record:
+        return use_cassette(record, "record")
+    if replay:
+        return use_cassette(replay, "replay")
+    return nullcontext()
@@ -0,0 +1,109 @@
+"""Checkpoint a backtest day by day, so an interrupted run resumes after its last completed day."""
+
+import gzip
+import hashlib
+import json
+import os
+import zlib
+from typing import Any
+
+from src.data.cache import DEFAULT_CACHE_DIR
+
+CHECKPOINT_VERSION = 1
+
+# Completed days buffered before they are appended to the checkpoint file
+DEFAULT_CHECKPOINT_EVERY = 1
+
+# Set BACKTEST_CHECKPOINT_DIR to keep checkpoints somewhere other than the cache directory
+DEFAULT_CHECKPOINT_DIR = os.path.join(DEFAULT_CACHE_DIR, "backtests")
+
+
+def backtest_fingerprint(config: dict[str, Any]) -> str:
+    """Hash of the settings that determine a backtest's results; a checkpoint only resumes the same backtest."""
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def default_checkpoint_path(config: dict[str, Any]) -> str:
+    directory = os.environ.get("BACKTEST_CHECKPOINT_DIR") or DEFAULT_CHECKPOINT_DIR
+    return os.path.join(directory, f"{backtest_fingerprint(config)[:16]}.jsonl.gz")
+
+
+class BacktestCheckpoint:
+    """
+    Completed backtest days as gzip-compressed JSON lines: a header with the backtest's settings,
+    then one record per day (portfolio after the day's trades, equity curve entry, table rows and the
+    agents' decisions and signals).
+
+    Days are appended as separate gzip members every `every` days, so checkpointing costs one small
+    write rather than rewriting the whole run. A member cut short by a crash is dropped on load.
+    """
+
+    def __init__(self, path: str, config: dict[str, Any], every: int = DEFAULT_CHECKPOINT_EVERY):
+        self.path = path
+        self.config = config
+        self.every = max(1, every)
+        self._pending: list[str] = []
+
+    def _header(self) -> dict[str, Any]:
+        return {"version": CHECKPOINT_VERSION, "fingerprint": backtest_fingerprint(self.config), "config": self.config}
+
+    def _write(self, lines: list[str]):
+        """Replace the checkpoint with `lines`, atomically."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+            f.write("".join(lines).encode("utf-8"))
+        os.replace(tmp_path, self.path)
+
+    def start(self):
+        """Begin a new checkpoint, discarding any earlier one at the same path."""
+        self._pending = []
+        self._write([json.dumps(self._header(), default=str) + "\n"])
+
+    def load(self) -> list[dict[str, Any]]:
+        """
+        The days recorded so far, in order, or an empty list without a checkpoint file.
+
+        Raises ValueError if the checkpoint belongs to a backtest with different settings.
+        """
+        if not os.path.exists(self.path):
+            return []
+
+        lines = []
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    lines.append(line)
+        except (EOFError, OSError, zlib.error):
+            # The last append was interrupted; everything read before it is intact
+            pass
+        if lines and not lines[-1].endswith("\n"):
+            lines.pop()
+        if not lines:
+            return []
+
+        header = json.loads(lines[0])
+        if header.get("version") != CHECKPOINT_VERSION or header.get("fingerprint") != backtest_fingerprint(self.config):
+            raise ValueError(f"Checkpoint {self.path} was written by a backtest with different settings: {header.get('config')}")
+        return [json.loads(line) for line in lines[1:]]
+
+    def resume(self) -> list[dict[str, Any]]:
+        """Load the recorded days and rewrite the file without any partial tail, ready for appending."""
+        days = self.load()
+        self._pending = []
+        self._write([json.dumps(self._header(), default=str) + "\n"] + [json.dumps(day, default=str) + "\n" for day in days])
+        return days
+
+    def add(self, day: dict[str, Any]):
+        """Record a completed day. It is serialized now, so later changes to the portfolio do not leak in."""
+        self._pending.append(json.dumps(day, default=str) + "\n")
+        if len(self._pending) >= self.every:
+            self.flush()
+
+    def flush(self):
+        """Append the buffered days to the checkpoint file."""
+        if not self._pending:
+            return
+        with open(self.path, "ab") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+            f.write("".join(self._pending).encode("utf-8"))
+        self._pending = []
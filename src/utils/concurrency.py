@@ -0,0 +1,114 @@
+"""Shared worker pool, background event loop and concurrency limits for per-ticker analyst work."""
+
+import asyncio
+import contextvars
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+# Threads shared by every analyst for per-ticker work. 1 runs tickers sequentially.
+DEFAULT_MAX_WORKERS = 8
+
+# Maximum in-flight calls per LLM provider (keyed by ModelProvider value) and per data API
+DEFAULT_CONCURRENCY_LIMIT = 4
+CONCURRENCY_LIMITS = {
+    "financial_datasets": 8,
+}
+
+_WORKER_PREFIX = "ticker-worker"
+
+_lock = threading.Lock()
+_executor: ThreadPoolExecutor | None = None
+_max_workers = int(os.environ.get("HEDGE_FUND_MAX_WORKERS", DEFAULT_MAX_WORKERS))
+_semaphores: dict[str, threading.BoundedSemaphore] = {}
+_async_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_thread: threading.Thread | None = None
+
+
+def configure(max_workers: int | None = None, limits: dict[str, int] | None = None):
+    """Resize the shared pool and/or override per-provider concurrency limits."""
+    global _executor, _max_workers
+    with _lock:
+        if max_workers is not None and max_workers != _max_workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+                _executor = None
+            _max_workers = max(1, max_workers)
+        for name, limit in (limits or {}).items():
+            CONCURRENCY_LIMITS[name] = limit
+            _semaphores.pop(name, None)
+            for semaphores in _async_semaphores.values():
+                semaphores.pop(name, None)
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Get the shared ticker worker pool, creating it on first use."""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=_max_workers, thread_name_prefix=_WORKER_PREFIX)
+        return _executor
+
+
+def map_tickers(fn: Callable[[str], T], tickers: list[str]) -> list[T]:
+    """
+    Run `fn` for every ticker on the shared pool and return the results in ticker order.
+
+    Falls back to a plain loop when the pool has a single worker, when there is only one
+    ticker, or when called from a pool worker (nested submissions could deadlock the pool).
+    Each call runs in a copy of the caller's context, so context variables such as the
+    current trace span carry over into the workers.
+    """
+    if _max_workers <= 1 or len(tickers) <= 1 or threading.current_thread().name.startswith(_WORKER_PREFIX):
+        return [fn(ticker) for ticker in tickers]
+
+    futures = [get_executor().submit(contextvars.copy_context().run, fn, ticker) for ticker in tickers]
+    return [future.result() for future in futures]
+
+
+def concurrency_limit(name: str) -> threading.BoundedSemaphore:
+    """Get the semaphore capping in-flight calls to an LLM provider or data API."""
+    with _lock:
+        if name not in _semaphores:
+            _semaphores[name] = threading.BoundedSemaphore(CONCURRENCY_LIMITS.get(name, DEFAULT_CONCURRENCY_LIMIT))
+        return _semaphores[name]
+
+
+def async_concurrency_limit(name: str) -> asyncio.Semaphore:
+    """Get the running event loop's semaphore capping in-flight async calls to an LLM provider or data API."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        semaphores = _async_semaphores.setdefault(loop, {})
+        if name not in semaphores:
+            semaphores[name] = asyncio.Semaphore(CONCURRENCY_LIMITS.get(name, DEFAULT_CONCURRENCY_LIMIT))
+        return semaphores[name]
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Get the shared background event loop, starting its thread on first use."""
+    global _loop, _loop_thread
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(target=_loop.run_forever, name="async-io", daemon=True)
+            _loop_thread.start()
+        return _loop
+
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """
+    Run a coroutine on the shared background event loop and block until it finishes.
+
+    Every synchronous caller shares the one loop, so async work started from different
+    worker threads can still see and join each other's in-flight requests.
+    """
+    loop = get_event_loop()
+    if threading.current_thread() is _loop_thread:
+        coro.close()
+        raise RuntimeError("run_sync() cannot be called from the background event loop; await the coroutine instead")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
@@ -1,13 +1,193 @@
 """Helper functions for LLM"""
 
+import asyncio
+import concurrent.futures
+import functools
 import json
-from typing import TypeVar, Type, Optional, Any
-from pydantic import BaseModel
+import os
+import threading
+import time
+from typing import Callable, TypeVar, Type, Optional, Any
+from langchain_core.messages import HumanMessage
+from pydantic import BaseModel, ValidationError, create_model
+from src.llm.cache import canonicalize_prompt, get_llm_cache, llm_cache_key
+from src.utils import concurrency
+from src.utils.cassette import get_cassette
+from src.utils.concurrency import concurrency_limit, map_tickers, run_sync
 from src.utils.progress import progress
+from src.utils.prompt import compact_analysis_data, estimate_tokens, serialize_analysis
+from src.utils.rate_limit import CircuitBreaker, TokenBucket, backoff_delay, parse_retry_after
+from src.utils.tracing import tracer
 
 T = TypeVar("T", bound=BaseModel)
 
+# Batched calls pack tickers into one request until their analysis data reaches about this many
+# tokens (override with LLM_BATCH_TOKEN_BUDGET), and never more than MAX_BATCH_TICKERS so the
+# response, which carries reasoning for every ticker, stays well inside the output limit.
+DEFAULT_BATCH_TOKEN_BUDGET = 6000
+MAX_BATCH_TICKERS = 10
 
+# How persona agents use the LLM, set per run in the state metadata ("llm_mode"):
+# "llm" always asks the model, "deterministic" reports the rule-based signal without calling it,
+# and "hybrid" only asks when score / max_score falls inside the ambiguity band ("ambiguity_band").
+LLM_MODES = ("llm", "deterministic", "hybrid")
+DEFAULT_AMBIGUITY_BAND = (0.4, 0.6)
+
+# Stream completions (LLM_STREAM=1) and give up on a call after LLM_DEADLINE seconds, falling back
+# to its default response. Both can also be set with configure().
+_stream = os.environ.get("LLM_STREAM", "").lower() in ("1", "true", "on")
+_deadline = float(os.environ["LLM_DEADLINE"]) if os.environ.get("LLM_DEADLINE") else None
+
+# Failed calls are retried after an exponential backoff with full jitter
+LLM_BACKOFF_BASE = 1.0
+LLM_BACKOFF_MAX = 30.0
+
+# A provider's circuit breaker opens once at least half of its last 20 calls (and at least 5) failed,
+# and lets a trial call through after 30 seconds
+BREAKER_FAILURE_THRESHOLD = 0.5
+BREAKER_WINDOW = 20
+BREAKER_MIN_CALLS = 5
+BREAKER_COOLDOWN = 30.0
+
+# Minimum seconds between progress updates while a completion streams
+STREAM_REPORT_INTERVAL = 0.5
+
+BATCH_INSTRUCTIONS = """The analysis data above covers these tickers: {tickers}.
+Assess each ticker on its own and return one signal per ticker, each in the JSON format given above, keyed by ticker:
+{{
+  "signals": {{
+    "<ticker>": <signal JSON>
+  }}
+}}"""
+
+
+def _parse_provider_values(value: str | None) -> dict[str, float]:
+    """Parse "OpenAI=500,Anthropic=50" style per-provider settings."""
+    settings = {}
+    for item in (value or "").split(","):
+        if "=" in item:
+            provider, number = item.split("=", 1)
+            settings[provider.strip()] = float(number)
+    return settings
+
+
+def _retry_after(error: Exception) -> float | None:
+    """Retry-After of a provider SDK's HTTP error, if it carries one."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    return parse_retry_after(headers.get("retry-after")) if headers is not None else None
+
+
+class ProviderScheduler:
+    """
+    Per-provider request pacing and health tracking for call_llm.
+
+    Each provider (keyed by ModelProvider value) gets an optional requests-per-minute token bucket
+    and a circuit breaker. In-flight requests are capped by the provider's concurrency limit.
+    Settings come from configure() or, on first use, from LLM_RATE_LIMITS and LLM_MAX_IN_FLIGHT
+    ("OpenAI=500,Anthropic=50"). When a provider's breaker is open, calls fail over to
+    `fallback_model` (LLM_FALLBACK_MODEL) if one is set.
+    """
+
+    def __init__(self):
+        self.fallback_model: str | None = None
+        self._rate_limits: dict[str, float] = {}
+        self._buckets: dict[str, TokenBucket] = {}
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._env_loaded = False
+        self._lock = threading.Lock()
+
+    def _load_env(self):
+        # Read lazily so that .env files loaded after import still apply
+        if self._env_loaded:
+            return
+        self._env_loaded = True
+        self._rate_limits.update(_parse_provider_values(os.environ.get("LLM_RATE_LIMITS")))
+        in_flight = _parse_provider_values(os.environ.get("LLM_MAX_IN_FLIGHT"))
+        if in_flight:
+            concurrency.configure(limits={provider: int(limit) for provider, limit in in_flight.items()})
+        self.fallback_model = self.fallback_model or os.environ.get("LLM_FALLBACK_MODEL") or None
+
+    def configure(
+        self,
+        provider: str | None = None,
+        requests_per_minute: float | None = None,
+        max_in_flight: int | None = None,
+        fallback_model: str | None = None,
+    ):
+        """Set a provider's request rate and in-flight cap, and/or the model to fail over to."""
+        with self._lock:
+            self._load_env()
+            if fallback_model is not None:
+                self.fallback_model = fallback_model or None
+            if provider is None:
+                return
+            provider = getattr(provider, "value", provider)
+            if requests_per_minute is not None:
+                self._rate_limits[provider] = requests_per_minute
+                self._buckets.pop(provider, None)
+        if provider is not None and max_in_flight is not None:
+            concurrency.configure(limits={provider: max_in_flight})
+
+    def breaker(self, provider: str) -> CircuitBreaker:
+        provider = getattr(provider, "value", provider)
+        with self._lock:
+            self._load_env()
+            if provider not in self._breakers:
+                self._breakers[provider] = CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_WINDOW, BREAKER_MIN_CALLS, BREAKER_COOLDOWN)
+            return self._breakers[provider]
+
+    def wait(self, provider: str):
+        """Block until the provider's request rate allows another call."""
+        provider = getattr(provider, "value", provider)
+        with self._lock:
+            self._load_env()
+            bucket = self._buckets.get(provider)
+            if bucket is None and self._rate_limits.get(provider):
+                bucket = self._buckets[provider] = TokenBucket(self._rate_limits[provider] / 60)
+        if bucket is not None and (delay := bucket.reserve()) > 0:
+            time.sleep(delay)
+
+    def reset(self):
+        """Forget every provider's rate limiter and breaker state."""
+        with self._lock:
+            self._buckets.clear()
+            self._breakers.clear()
+
+
+# Global scheduler shared by every LLM call
+scheduler = ProviderScheduler()
+
+
+def configure(stream: bool | None = None, deadline: float | None = None):
+    """Set whether call_llm streams completions and the default per-call deadline in seconds (0 for none)."""
+    global _stream, _deadline
+    if stream is not None:
+        _stream = stream
+    if deadline is not None:
+        _deadline = deadline or None
+
+
+def _replayable(call: Callable[..., T]) -> Callable[..., T]:
+    """Serve call_llm from the cassette in use when replaying, and add its results to it when recording."""
+
+    @functools.wraps(call)
+    def wrapper(prompt: Any, model_name: str, model_provider: str, pydantic_model: Type[T], *args, **kwargs) -> T:
+        cassette = get_cassette()
+        if cassette is None:
+            return call(prompt, model_name, model_provider, pydantic_model, *args, **kwargs)
+        key = llm_cache_key(prompt, model_name, model_provider, pydantic_model)
+        if cassette.replaying:
+            tracer.current_span().set(replayed=True)
+            return cassette.replay_llm(key, pydantic_model)
+        result = call(prompt, model_name, model_provider, pydantic_model, *args, **kwargs)
+        cassette.record_llm(key, result)
+        return result
+
+    return wrapper
+
+
+@tracer.traced("llm", kind="llm")
+@_replayable
 def call_llm(
     prompt: Any,
     model_name: str,
@@ -16,6 +196,10 @@ def call_llm(
     agent_name: Optional[str] = None,
     max_retries: int = 3,
     default_factory=None,
+    use_cache: bool = True,
+    stream: bool | None = None,
+    deadline: float | None = None,
+    allow_failover: bool = True,
 ) -> T:
     """
     Makes an LLM call with retry logic, handling both Deepseek and non-Deepseek models.
@@ -28,6 +212,10 @@ def call_llm(
         agent_name: Optional name of the agent for progress updates
         max_retries: Maximum number of retries (default: 3)
         default_factory: Optional factory function to create default response on failure
+        use_cache: Serve and store the response through the LLM response cache (default: True)
+        stream: Stream the completion, reporting its progress (default: LLM_STREAM)
+        deadline: Seconds after which the call is cancelled and the default response returned (default: LLM_DEADLINE)
+        allow_failover: Retry on the scheduler's fallback model while this provider's circuit breaker is open
 
     Returns:
         An instance of the specified Pydantic model
@@ -35,45 +223,248 @@ def call_llm(
     if not model_name or not model_provider:
         raise ValueError("Both model_name and model_provider must be provided")
 
-    from src.llm.models import get_model, get_model_info
+    span = tracer.current_span()
+    span.set(provider=model_provider, model=model_name, agent=agent_name)
 
+    # The same prompt to the same model and schema gets the stored response instead of a new completion
+    cache = get_llm_cache()
+    cache_key = llm_cache_key(prompt, model_name, model_provider, pydantic_model) if use_cache and cache.enabled else None
+    if cache_key and (cached := cache.get(cache_key, pydantic_model)) is not None:
+        span.set(cached=True)
+        return cached
+
+    from src.llm.models import get_model_info, get_structured_model
+
+    stream = _stream if stream is None else stream
+    deadline = _deadline if deadline is None else deadline or None
     model_info = get_model_info(model_name)
-    llm = get_model(model_name, model_provider)
+    # Shared client, already bound to the output schema for models with JSON mode.
+    # Streaming reads the raw text, so its JSON is parsed and validated against the schema here.
+    llm = get_structured_model(model_name, model_provider, None if stream else pydantic_model)
+    parse_text = stream or bool(model_info and not model_info.has_json_mode())
 
-    # For non-JSON support models, we can use structured output
-    if not (model_info and not model_info.has_json_mode()):
-        llm = llm.with_structured_output(
-            pydantic_model,
-            method="json_mode",
-        )
+    def default_response() -> T:
+        # Use default_factory if provided, otherwise create a basic default
+        if default_factory:
+            return default_factory()
+        return create_default_response(pydantic_model)
+
+    breaker = scheduler.breaker(model_provider)
 
     # Call the LLM with retries
     for attempt in range(max_retries):
+        if not breaker.allow():
+            # The provider keeps failing: fail over to the fallback model, or fail fast
+            fallback_model = scheduler.fallback_model
+            fallback_info = get_model_info(fallback_model) if allow_failover and fallback_model else None
+            if fallback_info and fallback_model != model_name:
+                span.set(outcome="failover")
+                if agent_name:
+                    progress.update_status(agent_name, None, f"{model_provider} unavailable - using {fallback_model}")
+                return call_llm(
+                    prompt,
+                    fallback_model,
+                    fallback_info.provider.value,
+                    pydantic_model,
+                    agent_name=agent_name,
+                    max_retries=max_retries,
+                    default_factory=default_factory,
+                    use_cache=use_cache,
+                    stream=stream,
+                    deadline=deadline,
+                    allow_failover=False,
+                )
+            span.set(outcome="circuit_open")
+            if agent_name:
+                progress.update_status(agent_name, None, f"{model_provider} unavailable - using default")
+            return default_response()
+
+        responded = False
+        span.set(attempts=attempt + 1)
         try:
-            # Call the LLM
-            result = llm.invoke(prompt)
-
-            # For non-JSON support models, we need to extract and parse the JSON manually
-            if model_info and not model_info.has_json_mode():
-                parsed_result = extract_json_from_deepseek_response(result.content)
-                if parsed_result:
-                    return pydantic_model(**parsed_result)
-            else:
-                return result
+            # Call the LLM, paced by the provider's request rate and capped by its concurrency limit
+            scheduler.wait(model_provider)
+            with concurrency_limit(model_provider):
+                if stream:
+                    result = run_sync(_stream_llm(llm, prompt, agent_name, deadline))
+                elif deadline:
+                    result = run_sync(asyncio.wait_for(llm.ainvoke(prompt), deadline))
+                else:
+                    result = llm.invoke(prompt)
+            breaker.record(True)
+            responded = True
+            if span.recording:
+                _record_usage(span, prompt, result, model_name)
+
+            # Streamed text, and output of models without JSON mode, is parsed manually
+            if parse_text:
+                text = result if isinstance(result, str) else result.content
+                parsed_result = extract_json_from_deepseek_response(text) or parse_partial_json(text, partial=False)
+                try:
+                    result = pydantic_model.model_validate(parsed_result)
+                except ValidationError:
+                    # No JSON, or JSON that does not match the schema: ask again
+                    if agent_name:
+                        progress.update_status(agent_name, None, f"Unparseable response - retry {attempt + 1}/{max_retries}")
+                    continue
+
+            # Fallback defaults on failure are never cached, only real responses
+            if cache_key and isinstance(result, BaseModel):
+                cache.set(cache_key, result, model_name, model_provider)
+            return result
+
+        except (asyncio.TimeoutError, concurrent.futures.TimeoutError):
+            # A slow completion is not retried, so it cannot hold up the rest of the graph.
+            # Before Python 3.11, run_sync() re-raises the deadline as concurrent.futures.TimeoutError
+            breaker.record(False)
+            span.set(outcome="timeout")
+            if agent_name:
+                progress.update_status(agent_name, None, f"Timed out after {deadline:g}s")
+            print(f"LLM call to {model_name} timed out after {deadline:g}s, using default response")
+            return default_response()
 
         except Exception as e:
+            # Responses that fail to parse say nothing about the provider's health
+            if not responded:
+                breaker.record(False)
             if agent_name:
                 progress.update_status(agent_name, None, f"Error - retry {attempt + 1}/{max_retries}")
 
             if attempt == max_retries - 1:
                 print(f"Error in LLM call after {max_retries} attempts: {e}")
-                # Use default_factory if provided, otherwise create a basic default
-                if default_factory:
-                    return default_factory()
-                return create_default_response(pydantic_model)
+                span.set(outcome="default")
+                return default_response()
+
+            time.sleep(backoff_delay(attempt, retry_after=_retry_after(e), base=LLM_BACKOFF_BASE, cap=LLM_BACKOFF_MAX))
+
+    # Every response failed to parse
+    print(f"LLM response from {model_name} did not match {pydantic_model.__name__} after {max_retries} attempts, using default response")
+    span.set(outcome="unparsed")
+    return default_response()
+
+
+def _record_usage(span, prompt: Any, result: Any, model_name: str):
+    """Attach token counts to an LLM span: the provider's reported usage, or estimates when it reports none."""
+    usage = getattr(result, "usage_metadata", None)
+    if usage:
+        span.set(prompt_tokens=usage.get("input_tokens"), completion_tokens=usage.get("output_tokens"))
+        return
+    prompt_text = "\n".join(content for _, content in canonicalize_prompt(prompt))
+    completion = result.model_dump_json() if isinstance(result, BaseModel) else _chunk_text(result)
+    span.set(
+        prompt_tokens=estimate_tokens(prompt_text, model_name),
+        completion_tokens=estimate_tokens(completion, model_name),
+        tokens_estimated=True,
+    )
 
-    # This should never be reached due to the retry logic above
-    return create_default_response(pydantic_model)
+
+def _chunk_text(chunk: Any) -> str:
+    """Text of a streamed message chunk, whose content may be a string or a list of content blocks."""
+    content = getattr(chunk, "content", chunk)
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") if isinstance(block, dict) else str(block) for block in content)
+
+
+async def _stream_llm(llm: Any, prompt: Any, agent_name: str | None, deadline: float | None) -> str:
+    """
+    Stream a completion and return its text.
+
+    Reports the tokens received, the time to first token and the signal once it has been
+    generated to `progress`. With a deadline, the stream is cancelled when it runs out.
+    """
+    started = time.monotonic()
+    chunks: list[str] = []
+
+    async def consume() -> str:
+        first_token = None
+        reported = 0.0
+        async for chunk in llm.astream(prompt):
+            now = time.monotonic()
+            first_token = now - started if first_token is None else first_token
+            chunks.append(_chunk_text(chunk))
+            if agent_name and now - reported >= STREAM_REPORT_INTERVAL:
+                reported = now
+                status = f"Streaming - {len(chunks)} tokens, first after {first_token:.1f}s"
+                partial = parse_partial_json("".join(chunks))
+                if isinstance(partial, dict) and partial.get("signal") in ("bullish", "bearish", "neutral"):
+                    status += f", signal {partial['signal']}"
+                progress.update_status(agent_name, None, status)
+        return "".join(chunks)
+
+    if deadline is None:
+        return await consume()
+    return await asyncio.wait_for(consume(), deadline)
+
+
+def parse_partial_json(text: str, partial: bool = True) -> Any:
+    """
+    Parse the first JSON object in a model response.
+
+    With `partial`, a response cut off mid-object (e.g. while streaming) is parsed as if every
+    open string, array and object were closed there, dropping a trailing incomplete value.
+    Returns None if there is nothing parseable yet.
+    """
+    start = text.find("{")
+    if start == -1:
+        return None
+
+    closers: list[str] = []
+    in_string = escaped = False
+    for index in range(start, len(text)):
+        char = text[index]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            closers.append("}" if char == "{" else "]")
+        elif char in "}]" and closers:
+            closers.pop()
+            if not closers:
+                try:
+                    return json.loads(text[start : index + 1])
+                except ValueError:
+                    return None
+
+    if not partial:
+        return None
+    # Cut back to the last point where closing everything still open gives valid JSON
+    fragment = text[start:]
+    for end in range(len(fragment), max(0, len(fragment) - 64), -1):
+        candidate = _close_json(fragment[:end])
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            continue
+    return None
+
+
+def _close_json(fragment: str) -> str:
+    """Append the quotes and brackets needed to close everything open at the end of a JSON fragment."""
+    closers: list[str] = []
+    in_string = escaped = False
+    for char in fragment:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            closers.append("}" if char == "{" else "]")
+        elif char in "}]" and closers:
+            closers.pop()
+    fragment = fragment + '"' if in_string else fragment.rstrip().rstrip(",")
+    return fragment + "".join(reversed(closers))
 
 
 def create_default_response(model_class: Type[T]) -> T:
@@ -111,3 +502,218 @@ def extract_json_from_deepseek_response(content: str) -> Optional[dict]:
     except Exception as e:
         print(f"Error extracting JSON from Deepseek response: {e}")
     return None
+
+
+def chunk_by_token_budget(analysis_data: dict[str, Any], token_budget: int, max_tickers: int = MAX_BATCH_TICKERS) -> list[list[str]]:
+    """Split tickers, in order, into groups whose serialized analysis data fits the token budget."""
+    chunks, chunk, used = [], [], 0
+    for ticker, data in analysis_data.items():
+        tokens = estimate_tokens(serialize_analysis(data))
+        if chunk and (used + tokens > token_budget or len(chunk) >= max_tickers):
+            chunks.append(chunk)
+            chunk, used = [], 0
+        chunk.append(ticker)
+        used += tokens
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+@functools.cache
+def batch_response_model(pydantic_model: Type[T]) -> Type[BaseModel]:
+    """Structured output model holding one `pydantic_model` per ticker, like PortfolioManagerOutput."""
+    return create_model(f"{pydantic_model.__name__}Batch", signals=(dict[str, pydantic_model], ...))
+
+
+def _append_instructions(prompt: Any, instructions: str) -> Any:
+    """Add a closing human message to a prompt value (or plain-text prompt)."""
+    if hasattr(prompt, "to_messages"):
+        return [*prompt.to_messages(), HumanMessage(content=instructions)]
+    return f"{prompt}\n\n{instructions}"
+
+
+def call_llm_batched(
+    analysis_data: dict[str, Any],
+    create_prompt: Callable[[str, dict[str, Any], str], Any],
+    generate_output: Callable[[str, dict[str, Any]], T],
+    pydantic_model: Type[T],
+    model_name: str,
+    model_provider: str,
+    agent_name: str,
+    token_budget: int | None = None,
+) -> dict[str, T]:
+    """
+    Get a signal for every ticker with as few LLM calls as possible.
+
+    Tickers are grouped by `chunk_by_token_budget` and each group is sent as one structured-output
+    request built by `create_prompt` (called with the comma-joined tickers, their analysis data and the model).
+    Tickers the response leaves out, or a group whose call fails, fall back to `generate_output`,
+    the agent's usual per-ticker call.
+
+    Args:
+        analysis_data: Analysis data by ticker, in ticker order
+        create_prompt: Builds the agent's prompt from (ticker, analysis data by ticker, model name)
+        generate_output: Makes the agent's single-ticker LLM call from (ticker, analysis data by ticker)
+        pydantic_model: The per-ticker signal model
+        token_budget: Analysis data tokens per request (default: LLM_BATCH_TOKEN_BUDGET or 6000)
+
+    Returns:
+        The signal of every ticker, in ticker order
+    """
+    token_budget = token_budget or int(os.environ.get("LLM_BATCH_TOKEN_BUDGET", DEFAULT_BATCH_TOKEN_BUDGET))
+    batch_model = batch_response_model(pydantic_model)
+
+    def generate_chunk(chunk: list[str]) -> dict[str, T]:
+        for ticker in chunk:
+            progress.update_status(agent_name, ticker, "Generating batched analysis")
+
+        signals = {}
+        if len(chunk) > 1:
+            prompt = create_prompt(", ".join(chunk), {ticker: analysis_data[ticker] for ticker in chunk}, model_name)
+            prompt = _append_instructions(prompt, BATCH_INSTRUCTIONS.format(tickers=", ".join(chunk)))
+            response = call_llm(prompt, model_name, model_provider, batch_model, agent_name=agent_name, default_factory=lambda: None)
+            signals = response.signals if response is not None else {}
+
+        outputs = {}
+        for ticker in chunk:
+            output = signals.get(ticker)
+            if output is None:
+                output = generate_output(ticker, {ticker: analysis_data[ticker]})
+            outputs[ticker] = output
+            progress.update_status(agent_name, ticker, "Done")
+        return outputs
+
+    results = {}
+    for outputs in map_tickers(generate_chunk, chunk_by_token_budget(analysis_data, token_budget)):
+        results.update(outputs)
+    return results
+
+
+def score_ratio(analysis: dict[str, Any]) -> float:
+    """Where an agent's rule-based score sits between 0 and its maximum, as a fraction."""
+    max_score = analysis.get("max_score") or 0
+    if max_score <= 0:
+        return 0.5
+    return min(1.0, max(0.0, analysis.get("score", 0) / max_score))
+
+
+def needs_llm(analysis: dict[str, Any], metadata: dict[str, Any]) -> bool:
+    """Whether the run's LLM mode asks the model about a ticker with this rule-based analysis."""
+    mode = metadata.get("llm_mode") or "llm"
+    if mode not in LLM_MODES:
+        raise ValueError(f"Unknown LLM mode {mode!r}; expected one of {', '.join(LLM_MODES)}")
+    if mode == "hybrid":
+        low, high = metadata.get("ambiguity_band") or DEFAULT_AMBIGUITY_BAND
+        return low <= score_ratio(analysis) <= high
+    return mode == "llm"
+
+
+def deterministic_signal(analysis: dict[str, Any]) -> dict[str, Any]:
+    """
+    Report an agent's rule-based signal in place of an LLM answer.
+
+    Confidence is how firmly score / max_score backs the signal: the ratio itself when bullish,
+    its complement when bearish, and its closeness to the midpoint when neutral.
+    """
+    ratio = score_ratio(analysis)
+    signal = analysis["signal"]
+    if signal == "bullish":
+        strength = ratio
+    elif signal == "bearish":
+        strength = 1 - ratio
+    else:
+        strength = 1 - 2 * abs(ratio - 0.5)
+    return {
+        "signal": signal,
+        "confidence": round(strength * 100, 1),
+        "reasoning": f"Rule-based signal (LLM skipped): score {analysis.get('score', 0):.2f} of {analysis.get('max_score', 0)}",
+    }
+
+
+def fill_analysis_prompt(template: Any, ticker: str, analysis_data: dict[str, Any], model_name: str | None, agent_name: str) -> Any:
+    """
+    Fill a persona agent's prompt template with a ticker (or comma-joined tickers) and its analysis data.
+
+    The analysis data is serialized compactly and trimmed to the prompt token budget of `model_name`
+    (see compact_analysis_data), for single and batched prompts alike.
+    """
+    return template.invoke({"analysis_data": compact_analysis_data(analysis_data, model_name=model_name, agent_name=agent_name), "ticker": ticker})
+
+
+def generate_signals(
+    tickers: list[str],
+    analyze: Callable[[str], dict[str, Any]],
+    generate_output: Callable[..., BaseModel],
+    create_prompt: Callable[[str, dict[str, Any], str], Any],
+    pydantic_model: Type[BaseModel],
+    metadata: dict[str, Any],
+    agent_name: str,
+    status: str,
+) -> dict[str, dict[str, Any]]:
+    """
+    Run a persona agent over every ticker and report each one's signal, confidence and reasoning.
+
+    `analyze` fetches a ticker's data and returns its rule-based analysis, with a signal, score and
+    max_score. The run's LLM mode decides whether that signal is reported as is (see needs_llm).
+    Otherwise the LLM is asked through `generate_output` right after the analysis. With
+    batch_llm_calls set, it is asked once every ticker is scored, in as few calls as possible
+    (see call_llm_batched).
+
+    Args:
+        tickers: Tickers to analyze
+        analyze: Builds a ticker's analysis data from its ticker
+        generate_output: The agent's single-ticker LLM call, taking ticker, analysis_data, model_name and model_provider
+        create_prompt: Builds the agent's prompt from (ticker, analysis data by ticker, model name)
+        pydantic_model: The agent's signal model
+        metadata: The run's state metadata (model, llm_mode, ambiguity_band, batch_llm_calls)
+        agent_name: Agent making the calls
+        status: Progress status while the LLM is asked about a ticker
+
+    Returns:
+        The signal of every ticker, in ticker order
+    """
+    model_name = metadata["model_name"]
+    model_provider = metadata["model_provider"]
+    batch_llm_calls = metadata.get("batch_llm_calls", False)
+
+    def ask_llm(ticker: str, ticker_data: dict[str, Any]) -> BaseModel:
+        return generate_output(ticker=ticker, analysis_data=ticker_data, model_name=model_name, model_provider=model_provider)
+
+    def analyze_ticker(ticker: str) -> tuple[dict[str, Any], dict[str, Any] | None]:
+        analysis = analyze(ticker)
+        if not needs_llm(analysis, metadata):
+            progress.update_status(agent_name, ticker, "Done")
+            return analysis, deterministic_signal(analysis)
+        if batch_llm_calls:
+            return analysis, None
+
+        progress.update_status(agent_name, ticker, status)
+        output = ask_llm(ticker, {ticker: analysis})
+        progress.update_status(agent_name, ticker, "Done")
+        return analysis, _signal_dict(output)
+
+    signals = {}
+    pending = {}
+    for ticker, (analysis, signal) in zip(tickers, map_tickers(analyze_ticker, tickers)):
+        if signal is None:
+            pending[ticker] = analysis
+        else:
+            signals[ticker] = signal
+
+    if pending:
+        outputs = call_llm_batched(
+            analysis_data=pending,
+            create_prompt=create_prompt,
+            generate_output=ask_llm,
+            pydantic_model=pydantic_model,
+            model_name=model_name,
+            model_provider=model_provider,
+            agent_name=agent_name,
+        )
+        signals.update({ticker: _signal_dict(output) for ticker, output in outputs.items()})
+
+    return {ticker: signals[ticker] for ticker in tickers}
+
+
+def _signal_dict(output: BaseModel) -> dict[str, Any]:
+    return {"signal": output.signal, "confidence": output.confidence, "reasoning": output.reasoning}
@@ -3,19 +3,45 @@ from rich.live import Live
 from rich.table import Table
 from rich.style import Style
 from rich.text import Text
-from typing import Dict, Optional
-from datetime import datetime
+from typing import Dict, NamedTuple, Optional
+from collections import deque
+import csv
+import threading
+import time
 
 console = Console()
 
+# Events kept for timing export; about 8 are recorded per agent and ticker
+MAX_EVENTS = 100_000
+
+# Statuses that end an agent's work on a ticker
+TERMINAL_STATUSES = ("done", "error")
+
+
+class ProgressEvent(NamedTuple):
+    """A timestamped status update from an agent."""
+
+    time: float
+    agent_name: str
+    ticker: Optional[str]
+    status: str
+
 
 class AgentProgress:
-    """Manages progress tracking for multiple agents."""
+    """
+    Manages progress tracking for multiple agents.
+
+    Status updates only append an event and update the agent's latest status, so agents can report
+    from worker threads without waiting on the display. The table is rebuilt by Rich's refresh thread
+    at most refresh_per_second times, from whatever the latest statuses are at that moment.
+    """
 
-    def __init__(self):
+    def __init__(self, refresh_per_second: float = 4):
         self.agent_status: Dict[str, Dict[str, str]] = {}
-        self.table = Table(show_header=False, box=None, padding=(0, 1))
-        self.live = Live(self.table, console=console, refresh_per_second=4)
+        self.events: deque[ProgressEvent] = deque(maxlen=MAX_EVENTS)
+        # Guards creating an agent's entry; appending to the deque needs no lock
+        self._lock = threading.Lock()
+        self.live = Live(console=console, refresh_per_second=refresh_per_second, get_renderable=self._render)
         self.started = False
 
     def start(self):
@@ -32,20 +58,62 @@ class AgentProgress:
 
     def update_status(self, agent_name: str, ticker: Optional[str] = None, status: str = ""):
         """Update the status of an agent."""
-        if agent_name not in self.agent_status:
-            self.agent_status[agent_name] = {"status": "", "ticker": None}
+        self.events.append(ProgressEvent(time.time(), agent_name, ticker, status))
+
+        info = self.agent_status.get(agent_name)
+        if info is None:
+            with self._lock:
+                info = self.agent_status.setdefault(agent_name, {"status": "", "ticker": None})
 
         if ticker:
-            self.agent_status[agent_name]["ticker"] = ticker
+            info["ticker"] = ticker
         if status:
-            self.agent_status[agent_name]["status"] = status
-
-        self._refresh_display()
-
-    def _refresh_display(self):
-        """Refresh the progress display."""
-        self.table.columns.clear()
-        self.table.add_column(width=100)
+            info["status"] = status
+
+    def stage_timings(self) -> list[dict]:
+        """
+        How long each agent spent in each stage, per ticker.
+
+        A stage starts with a status update and ends with the agent's next update for the same ticker.
+        Terminal statuses ("Done", "Error") and stages that have not ended yet are not reported.
+        """
+        timings = []
+        open_stages: dict[tuple[str, Optional[str]], ProgressEvent] = {}
+        for event in sorted(list(self.events), key=lambda event: event.time):
+            key = (event.agent_name, event.ticker)
+            previous = open_stages.pop(key, None)
+            if previous is not None:
+                timings.append(
+                    {
+                        "agent_name": previous.agent_name,
+                        "ticker": previous.ticker,
+                        "stage": previous.status,
+                        "start": previous.time,
+                        "end": event.time,
+                        "duration": event.time - previous.time,
+                    }
+                )
+            if event.status and event.status.lower() not in TERMINAL_STATUSES:
+                open_stages[key] = event
+        return timings
+
+    def export_timings(self, path: str):
+        """Write stage_timings to a CSV file."""
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["agent_name", "ticker", "stage", "start", "end", "duration"])
+            writer.writeheader()
+            writer.writerows(self.stage_timings())
+
+    def reset(self):
+        """Forget every status and event."""
+        with self._lock:
+            self.agent_status.clear()
+            self.events.clear()
+
+    def _render(self) -> Table:
+        """Build the progress table from the latest statuses."""
+        table = Table(show_header=False, box=None, padding=(0, 1))
+        table.add_column(width=100)
 
         # Sort agents with Risk Management and Portfolio Management at the bottom
         def sort_key(item):
@@ -57,7 +125,10 @@ class AgentProgress:
             else:
                 return (1, agent_name)
 
-        for agent_name, info in sorted(self.agent_status.items(), key=sort_key):
+        with self._lock:
+            statuses = [(agent_name, dict(info)) for agent_name, info in self.agent_status.items()]
+
+        for agent_name, info in sorted(statuses, key=sort_key):
             status = info["status"]
             ticker = info["ticker"]
 
@@ -81,7 +152,9 @@ class AgentProgress:
                 status_text.append(f"[{ticker}] ", style=Style(color="cyan"))
             status_text.append(status, style=style)
 
-            self.table.add_row(status_text)
+            table.add_row(status_text)
+
+        return table
 
 
 # Create a global instance
@@ -0,0 +1,156 @@
+"""Compact, token-budgeted serialization of agent analysis data for LLM prompts."""
+
+import json
+import math
+import os
+import threading
+from typing import Any
+
+# Tokens of analysis data allowed per ticker in a prompt (override with PROMPT_TOKEN_BUDGET)
+DEFAULT_PROMPT_TOKEN_BUDGET = 1500
+
+# Significant digits kept for floats
+FLOAT_DIGITS = 4
+
+# Trimming steps applied in order until the data fits the budget. Scores and signals are never trimmed.
+MAX_TEXT_CHARS = 160
+LOW_VALUE_FIELDS = ("details",)
+MAX_LIST_ITEMS = 4
+
+
+def estimate_tokens(text: str, model_name: str | None = None) -> int:
+    """Rough token count of a prompt for a model, from its provider's characters per token."""
+    chars_per_token = 4.0
+    if model_name:
+        from src.llm.models import get_model_info
+
+        model_info = get_model_info(model_name)
+        if model_info:
+            chars_per_token = model_info.chars_per_token()
+    return int(len(text) / chars_per_token) + 1
+
+
+def compact_value(value: Any) -> Any:
+    """Round floats to FLOAT_DIGITS significant digits and drop null fields, recursively."""
+    if isinstance(value, dict):
+        return {key: compact_value(item) for key, item in value.items() if item is not None}
+    if isinstance(value, (list, tuple)):
+        return [compact_value(item) for item in value]
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            return None
+        return float(f"{value:.{FLOAT_DIGITS}g}")
+    return value
+
+
+def serialize_analysis(analysis_data: Any) -> str:
+    """Serialize analysis data as compact JSON (no indentation, rounded floats, no nulls)."""
+    return json.dumps(compact_value(analysis_data), separators=(",", ":"), default=str)
+
+
+def _shorten_text(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: _shorten_text(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_shorten_text(item) for item in value]
+    if isinstance(value, str) and len(value) > MAX_TEXT_CHARS:
+        return value[: MAX_TEXT_CHARS - 3] + "..."
+    return value
+
+
+def _drop_low_value_fields(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: _drop_low_value_fields(item) for key, item in value.items() if key not in LOW_VALUE_FIELDS}
+    if isinstance(value, list):
+        return [_drop_low_value_fields(item) for item in value]
+    return value
+
+
+def _truncate_lists(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: _truncate_lists(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_truncate_lists(item) for item in value[:MAX_LIST_ITEMS]]
+    return value
+
+
+TRIM_STEPS = (_shorten_text, _drop_low_value_fields, _truncate_lists)
+
+
+class CompactionStats:
+    """Thread-safe record of the tokens prompt compaction saved on each call."""
+
+    def __init__(self):
+        self.calls: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def record(self, agent_name: str | None, original_tokens: int, prompt_tokens: int):
+        with self._lock:
+            self.calls.append(
+                {
+                    "agent_name": agent_name,
+                    "original_tokens": original_tokens,
+                    "prompt_tokens": prompt_tokens,
+                    "tokens_saved": original_tokens - prompt_tokens,
+                }
+            )
+
+    def tokens_saved(self) -> int:
+        with self._lock:
+            return sum(call["tokens_saved"] for call in self.calls)
+
+    def summary(self) -> str | None:
+        """One-line report of the savings so far, or None if nothing was compacted."""
+        with self._lock:
+            if not self.calls:
+                return None
+            original = sum(call["original_tokens"] for call in self.calls)
+            saved = sum(call["tokens_saved"] for call in self.calls)
+        return f"Prompt compaction saved ~{saved:,} of ~{original:,} analysis tokens over {len(self.calls)} LLM calls"
+
+    def reset(self):
+        with self._lock:
+            self.calls.clear()
+
+
+# Global record of compaction savings, shared by every agent
+compaction_stats = CompactionStats()
+
+
+def compact_analysis_data(
+    analysis_data: dict[str, Any],
+    model_name: str | None = None,
+    agent_name: str | None = None,
+    token_budget: int | None = None,
+) -> str:
+    """
+    Serialize analysis data (keyed by ticker) for a prompt within a token budget.
+
+    Starts from the compact serialization and, while the estimate for `model_name` is over budget,
+    shortens long free text, then drops the free-text `details` fields, then keeps only the first
+    MAX_LIST_ITEMS of each list. The tokens saved against the old indented JSON are recorded in
+    `compaction_stats`.
+
+    Args:
+        analysis_data: Analysis data by ticker
+        model_name: Model the prompt is for, used to estimate tokens
+        agent_name: Agent making the call, for the savings report
+        token_budget: Tokens allowed per ticker (default: PROMPT_TOKEN_BUDGET or 1500)
+
+    Returns:
+        The serialized analysis data
+    """
+    token_budget = token_budget or int(os.environ.get("PROMPT_TOKEN_BUDGET", DEFAULT_PROMPT_TOKEN_BUDGET))
+    budget = token_budget * max(1, len(analysis_data))
+
+    data = compact_value(analysis_data)
+    text = serialize_analysis(data)
+    for trim in TRIM_STEPS:
+        if estimate_tokens(text, model_name) <= budget:
+            break
+        data = trim(data)
+        text = serialize_analysis(data)
+
+    original_tokens = estimate_tokens(json.dumps(analysis_data, indent=2, default=str), model_name)
+    compaction_stats.record(agent_name, original_tokens, estimate_tokens(text, model_name))
+    return text
@@ -0,0 +1,135 @@
+"""Client-side rate limiting, retry backoff and circuit breaking for external APIs."""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by every caller of an API.
+
+    Tokens refill at `rate` per second up to `capacity`. Callers reserve a token
+    up front and wait out any debt, so concurrent callers queue in order and the
+    overall request rate settles at the quota ceiling instead of overshooting it.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token and return how many seconds the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._paused_until - now)
+
+    def pause(self, seconds: float):
+        """Hold every caller back for `seconds`, e.g. after the server asked us to slow down."""
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + seconds)
+            # Drop the burst allowance so requests resume at the steady rate
+            self._tokens = min(self._tokens, 0.0)
+
+    async def acquire(self):
+        """Wait until a token is available."""
+        if (wait := self.reserve()) > 0:
+            await asyncio.sleep(wait)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parse a Retry-After header given either as delay-seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt: int, retry_after: float | None = None, base: float = 1.0, cap: float = 30.0) -> float:
+    """
+    Seconds to wait before retry number `attempt` (0-based).
+
+    Uses exponential backoff with full jitter. A server-provided Retry-After is honoured
+    as the floor, with a little jitter on top so waiting clients do not retry in lockstep.
+    """
+    if retry_after is not None:
+        return retry_after + random.uniform(0, base)
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+class CircuitBreaker:
+    """
+    Trips when too many recent calls to a service fail, so callers fail fast instead of piling on.
+
+    While closed, call outcomes are kept over a sliding window. Once it holds at least `min_calls`
+    outcomes and the failure rate reaches `failure_threshold`, the breaker opens and rejects calls
+    for `cooldown` seconds. It then lets a single trial call through: success closes it again,
+    failure keeps it open for another cooldown.
+    """
+
+    def __init__(self, failure_threshold: float = 0.5, window: int = 20, min_calls: int = 5, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._opened_at: float | None = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half_open" if self._probing or time.monotonic() - self._opened_at >= self.cooldown else "open"
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or time.monotonic() - self._opened_at < self.cooldown:
+                return False
+            self._probing = True
+            return True
+
+    def record(self, success: bool):
+        """Record the outcome of a call that `allow` let through."""
+        with self._lock:
+            if self._probing:
+                self._probing = False
+                if success:
+                    self._opened_at = None
+                    self._outcomes.clear()
+                else:
+                    self._opened_at = time.monotonic()
+                return
+            if self._opened_at is not None:
+                # A call started before the breaker opened; the trial call decides when it closes
+                return
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_threshold:
+                self._opened_at = time.monotonic()
@@ -0,0 +1,251 @@
+"""Latency spans for graph nodes, data fetches and LLM calls, exported as JSON lines."""
+
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+# Set TRACE_FILE to record spans and write them there, or pass --trace PATH
+TRACE_FILE_ENV = "TRACE_FILE"
+
+# Slowest spans listed in the summary
+DEFAULT_TOP_N = 10
+
+
+class Span:
+    """
+    One timed operation. Spans opened while another is current become its children.
+
+    Exported with OpenTelemetry's span field names, so the JSON lines can be loaded by OTLP tooling.
+    """
+
+    __slots__ = ("name", "kind", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "status")
+
+    recording = True
+
+    def __init__(self, name: str, kind: str, parent: "Span | None", attributes: dict[str, Any]):
+        self.name = name
+        self.kind = kind
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.start_ns = time.time_ns()
+        self.end_ns: int | None = None
+        self.attributes = attributes
+        self.status = "ok"
+
+    @property
+    def duration(self) -> float:
+        """Seconds the span lasted (so far, if it is still open)."""
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def set(self, **attributes: Any):
+        """Attach attributes; None values are skipped."""
+        self.attributes.update({key: value for key, value in attributes.items() if value is not None})
+
+    def add(self, key: str, amount: int = 1):
+        """Increment a counter attribute."""
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.attributes.get(key, default)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "durationMs": round(self.duration * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Stands in for a span while tracing is off, so instrumented code needs no checks."""
+
+    recording = False
+    duration = 0.0
+
+    def set(self, **attributes: Any):
+        pass
+
+    def add(self, key: str, amount: int = 1):
+        pass
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return default
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """
+    Thread-safe collector of the spans of a run.
+
+    Off unless given a path (or TRACE_FILE is set), in which case opening a span costs a context
+    variable lookup and nothing more. Parents follow the context, so spans opened in worker threads
+    started with a copied context and in coroutines sent to the background loop nest correctly.
+    """
+
+    def __init__(self, path: str | None = None, enabled: bool | None = None, kinds: set[str] | None = None):
+        self._path = path
+        self._enabled = enabled
+        # Span kinds to record (None records every kind); spans of other kinds cost nothing
+        self.kinds = kinds
+        self._spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> str | None:
+        return self._path or os.environ.get(TRACE_FILE_ENV) or None
+
+    @property
+    def enabled(self) -> bool:
+        if self._enabled is not None:
+            return self._enabled
+        return self.path is not None
+
+    def configure(self, path: str | None = None, enabled: bool | None = None, kinds: set[str] | None = None):
+        """Set where spans are exported, turn tracing on or off and/or limit it to some span kinds."""
+        if path is not None:
+            self._path = path
+        if enabled is not None:
+            self._enabled = enabled
+        if kinds is not None:
+            self.kinds = kinds
+
+    @contextmanager
+    def span(self, name: str, kind: str = "internal", **attributes: Any) -> Iterator[Span | _NoopSpan]:
+        """Time the enclosed block as a child of the current span. Exceptions mark it as an error."""
+        if not self.enabled or (self.kinds is not None and kind not in self.kinds):
+            yield NOOP_SPAN
+            return
+
+        span = Span(name, kind, _current_span.get(), {key: value for key, value in attributes.items() if value is not None})
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.set(error=repr(e))
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            _current_span.reset(token)
+            with self._lock:
+                self._spans.append(span)
+
+    def current_span(self) -> Span | _NoopSpan:
+        """The innermost open span, or a no-op span outside any span or while tracing is off."""
+        return (_current_span.get() if self.enabled else None) or NOOP_SPAN
+
+    def traced(self, name: str | None = None, kind: str = "internal") -> Callable:
+        """Decorator wrapping every call of a function or coroutine function in a span."""
+
+        def decorator(fn: Callable) -> Callable:
+            span_name = name or fn.__name__
+
+            if asyncio.iscoroutinefunction(fn):
+
+                @functools.wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(span_name, kind):
+                        return await fn(*args, **kwargs)
+
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name, kind):
+                    return fn(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    @property
+    def spans(self) -> list[Span]:
+        """Every finished span, in the order they finished."""
+        with self._lock:
+            return list(self._spans)
+
+    def reset(self):
+        """Forget every recorded span."""
+        with self._lock:
+            self._spans.clear()
+
+    def export(self, path: str | None = None) -> str | None:
+        """Write the finished spans to `path` (default: the configured path) as JSON lines, returning the path."""
+        path = path or self.path
+        if not path:
+            return None
+        with open(path, "w") as f:
+            for span in self.spans:
+                f.write(json.dumps(span.to_dict(), default=str) + "\n")
+        return path
+
+    def slowest(self, n: int = DEFAULT_TOP_N) -> list[Span]:
+        """The n longest spans."""
+        return sorted(self.spans, key=lambda span: span.duration, reverse=True)[:n]
+
+    def critical_path(self) -> list[Span]:
+        """
+        The chain of spans that decided how long the longest root span took.
+
+        Starting from that root, repeatedly follows the child that finished last: anything that
+        finished earlier overlapped it and could not have delayed the parent.
+        """
+        spans = self.spans
+        span_ids = {span.span_id for span in spans}
+        children: dict[str, list[Span]] = {}
+        roots = []
+        for span in spans:
+            if span.parent_id in span_ids:
+                children.setdefault(span.parent_id, []).append(span)
+            else:
+                roots.append(span)
+        if not roots:
+            return []
+
+        path = [max(roots, key=lambda span: span.duration)]
+        while path[-1].span_id in children:
+            path.append(max(children[path[-1].span_id], key=lambda span: span.end_ns))
+        return path
+
+    def summary(self, top_n: int = DEFAULT_TOP_N) -> str | None:
+        """Critical path and slowest spans of the run, or None if nothing was traced."""
+        if not self.spans:
+            return None
+
+        def describe(span: Span) -> str:
+            label = span.name
+            if ticker := span.get("ticker"):
+                label += f" [{ticker}]"
+            if model := span.get("model"):
+                label += f" ({model})"
+            return label
+
+        lines = ["Critical path:"]
+        for depth, span in enumerate(self.critical_path()):
+            lines.append(f"  {'  ' * depth + describe(span):<60} {span.kind:<8} {span.duration:>8.3f}s")
+        lines.append(f"Slowest {top_n} spans:")
+        for span in self.slowest(top_n):
+            lines.append(f"  {describe(span):<60} {span.kind:<8} {span.duration:>8.3f}s")
+        return "\n".join(lines)
+
+
+# Global tracer, shared by the graph, the data API and the LLM helpers
+tracer = Tracer()
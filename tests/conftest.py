@@ -1,6 +1,12 @@
+import os
 import sys
 import types
 
+# Keep the financial data cache in memory so tests never touch the user's on-disk cache
+os.environ.setdefault("FINANCIAL_DATASETS_CACHE", "memory")
+# Never serve LLM responses cached by earlier runs
+os.environ.setdefault("LLM_CACHE", "off")
+
 
 class FakeChatPromptTemplate:
     @classmethod
@@ -24,3 +30,7 @@ sys.modules.setdefault(
     ),
 )
 sys.modules.setdefault("langchain_openai", types.SimpleNamespace(ChatOpenAI=object))
+sys.modules.setdefault("langchain_anthropic", types.SimpleNamespace(ChatAnthropic=object))
+sys.modules.setdefault("langchain_deepseek", types.SimpleNamespace(ChatDeepSeek=object))
+sys.modules.setdefault("langchain_google_genai", types.SimpleNamespace(ChatGoogleGenerativeAI=object))
+sys.modules.setdefault("langchain_groq", types.SimpleNamespace(ChatGroq=object))
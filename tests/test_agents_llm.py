@@ -61,11 +61,9 @@ class TestAgentLLMParameters(unittest.TestCase):
 
     def test_agents_raise_without_model(self):
         fake_models_mod = types.SimpleNamespace(
-            get_model_info=lambda name: types.SimpleNamespace(has_json_mode=lambda: True),
-            get_model=lambda *_, **__: types.SimpleNamespace(
-                with_structured_output=lambda *a, **k: types.SimpleNamespace(
-                    invoke=lambda *_: object(),
-                ),
+            get_model_info=lambda name: types.SimpleNamespace(has_json_mode=lambda: True, chars_per_token=lambda: 4.0),
+            get_structured_model=lambda *_, **__: types.SimpleNamespace(
+                invoke=lambda *_: object(),
             ),
         )
         for mod_name, func_name in AGENT_FUNCS:
@@ -11,5 +11,19 @@ class TestAnalystOrderMap(unittest.TestCase):
         self.assertEqual(order_map["Risk Management"], len(mod.ANALYST_ORDER))
 
 
+class TestLineItemPlan(unittest.TestCase):
+    def test_plan_merges_requests_per_period(self):
+        mod = __import__("src.utils.analysts", fromlist=[""])
+        plan = mod.get_line_item_plan(["charlie_munger", "phil_fisher", "warren_buffett", "valuation_analyst", "technical_analyst"])
+        self.assertEqual(set(plan), {"annual", "ttm"})
+        self.assertEqual(plan["annual"]["limit"], 10)
+        self.assertEqual(plan["ttm"]["limit"], 10)
+        for analyst_key in ["charlie_munger", "phil_fisher"]:
+            for line_item in mod.ANALYST_CONFIG[analyst_key]["line_item_request"]["line_items"]:
+                self.assertIn(line_item, plan["annual"]["line_items"])
+        self.assertEqual(len(plan["annual"]["line_items"]), len(set(plan["annual"]["line_items"])))
+        self.assertIn("working_capital", plan["ttm"]["line_items"])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,13 +1,13 @@
+import asyncio
+import json
 import os
-import sys
 import unittest
 from unittest import mock
 
-# Provide dummy modules for optional dependencies
-sys.modules.setdefault("pandas", mock.MagicMock())
-sys.modules.setdefault("requests", mock.MagicMock())
+import httpx
 
 import src.tools.api as api
+from src.data.cache import Cache
 
 
 class TestAPIUtils(unittest.TestCase):
@@ -19,16 +19,202 @@ class TestAPIUtils(unittest.TestCase):
         with mock.patch.dict(os.environ, {}, clear=True):
             self.assertEqual(api._get_api_headers(), {})
 
-    def test_get_prices_uses_session(self):
-        with mock.patch.object(api, "session") as mock_session:
-            mock_session.get.return_value.status_code = 200
-            mock_session.get.return_value.json.return_value = {"ticker": "AAPL", "prices": []}
+    def test_get_prices_sends_api_key(self):
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, json={"ticker": "AAPL", "prices": []})
+
+        with mock.patch.object(api, "_cache", Cache()), mock.patch.object(api, "_get_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))):
             with mock.patch.dict(os.environ, {"FINANCIAL_DATASETS_API_KEY": "k"}):
                 api.get_prices("AAPL", "2020-01-01", "2020-02-01")
-            mock_session.get.assert_called_once()
-            args, kwargs = mock_session.get.call_args
-            self.assertIn("timeout", kwargs)
-            self.assertEqual(kwargs["headers"], {"X-API-KEY": "k"})
+        self.assertEqual(len(requests), 1)
+        self.assertEqual(requests[0].headers["X-API-KEY"], "k")
+
+    def test_get_price_data_served_from_cache(self):
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            prices = [{"time": f"2024-01-0{day}", "open": 1.0, "close": float(day), "high": 1.0, "low": 1.0, "volume": 10} for day in (2, 3, 4)]
+            return httpx.Response(200, json={"ticker": "AAPL", "prices": prices})
+
+        with mock.patch.object(api, "_cache", Cache()), mock.patch.object(api, "_get_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))):
+            first = api.get_price_data("AAPL", "2024-01-01", "2024-01-05")
+            second = api.get_price_data("AAPL", "2024-01-03", "2024-01-03")
+            prices = api.get_prices("AAPL", "2024-01-01", "2024-01-05")
+        self.assertEqual(len(requests), 1)
+        self.assertEqual(list(first["close"]), [2.0, 3.0, 4.0])
+        self.assertEqual(second.iloc[-1]["close"], 3.0)
+        self.assertTrue(api.prices_to_df(prices).equals(first))
+
+    def test_get_prices_fetches_only_missing_ranges(self):
+        ranges = []
+
+        def handler(request):
+            start, end = request.url.params["start_date"], request.url.params["end_date"]
+            ranges.append((start, end))
+            prices = [{"time": day, "open": 1.0, "close": 1.0, "high": 1.0, "low": 1.0, "volume": 10} for day in ("2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05") if start <= day <= end]
+            return httpx.Response(200, json={"ticker": "AAPL", "prices": prices})
+
+        with mock.patch.object(api, "_cache", Cache()), mock.patch.object(api, "_get_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))):
+            api.get_prices("AAPL", "2024-01-03", "2024-01-04")
+            prices = api.get_prices("AAPL", "2024-01-01", "2024-01-05")
+            api.get_prices("AAPL", "2024-01-02", "2024-01-05")
+        self.assertEqual(ranges, [("2024-01-03", "2024-01-04"), ("2024-01-01", "2024-01-02"), ("2024-01-05", "2024-01-05")])
+        self.assertEqual([price.time for price in prices], ["2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05"])
+
+    def test_client_uses_default_timeout(self):
+        async def client_timeout():
+            return api._get_client().timeout.read
+
+        self.assertEqual(asyncio.run(client_timeout()), api.DEFAULT_TIMEOUT)
+
+    def test_identical_in_flight_requests_share_one_call(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request.url)
+            return httpx.Response(200, json={"ticker": "AAPL", "prices": []})
+
+        async def fetch_concurrently():
+            return await asyncio.gather(*[api.aget_prices("AAPL", "2024-01-01", "2024-01-05") for _ in range(10)])
+
+        with mock.patch.object(api, "_cache", Cache()), mock.patch.object(api, "_get_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))):
+            results = asyncio.run(fetch_concurrently())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [[]] * 10)
+
+    def test_prefetch_line_items_fetches_every_ticker_and_period_concurrently(self):
+        bodies, in_flight, peak = [], [0], [0]
+
+        async def handler(request):
+            body = json.loads(request.content)
+            bodies.append((body["tickers"][0], body["period"], body["limit"]))
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+            await asyncio.sleep(0.01)
+            in_flight[0] -= 1
+            return httpx.Response(200, json={"search_results": []})
+
+        plan = {"ttm": {"line_items": ["revenue"], "limit": 10}, "annual": {"line_items": ["net_income"], "limit": 5}}
+        with mock.patch.object(api, "_cache", Cache()), mock.patch.object(api, "_get_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))):
+            api.prefetch_line_items(["AAPL", "MSFT"], plan, "2024-01-01")
+        self.assertEqual(sorted(bodies), [("AAPL", "annual", 5), ("AAPL", "ttm", 10), ("MSFT", "annual", 5), ("MSFT", "ttm", 10)])
+        self.assertGreater(peak[0], 1)
+
+    def test_request_stays_shared_until_its_first_caller_resumes(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request.url)
+            return httpx.Response(200, json={"financial_metrics": []})
+
+        url = "https://api.financialdatasets.ai/financial-metrics/?ticker=AAPL"
+
+        async def fetch_as_first_caller_resumes():
+            first = asyncio.ensure_future(api._fetch_json("AAPL", "GET", url))
+            await asyncio.sleep(0)
+            shared = next(iter(api._in_flight[asyncio.get_running_loop()].values()))
+            while not shared.done():
+                await asyncio.sleep(0)
+            # The response has arrived and its callbacks have run, but the first caller has not resumed to cache it
+            await asyncio.sleep(0)
+            self.assertFalse(first.done())
+            second = await api._fetch_json("AAPL", "GET", url)
+            return [await first, second]
+
+        with mock.patch.object(api, "_cache", Cache()), mock.patch.object(api, "_get_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))):
+            results = asyncio.run(fetch_as_first_caller_resumes())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"financial_metrics": []}] * 2)
+
+    def test_price_range_filled_meanwhile_is_not_fetched_again(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request.url)
+            return httpx.Response(200, json={"ticker": "AAPL", "prices": []})
+
+        async def fill_while_scheduled():
+            gaps = asyncio.ensure_future(api._fill_price_gaps("AAPL", "2024-01-01", "2024-01-05"))
+            # The gaps are computed and their fetches scheduled; an identical fetch then finishes first
+            await asyncio.sleep(0)
+            api._cache.set_prices("AAPL", [], "2024-01-01", "2024-01-05")
+            await gaps
+
+        with mock.patch.object(api, "_cache", Cache()), mock.patch.object(api, "_get_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))):
+            asyncio.run(fill_while_scheduled())
+        self.assertEqual(calls, [])
+
+    def test_overlapping_queries_for_a_ticker_share_one_fetch(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request.url)
+            return httpx.Response(200, json={"news": [{"ticker": "AAPL", "title": "t", "author": "a", "source": "s", "date": "2024-01-01", "url": "u"}]})
+
+        async def fetch_concurrently():
+            return await asyncio.gather(api.aget_company_news("AAPL", "2024-01-01", limit=50), api.aget_company_news("AAPL", "2024-01-01", limit=100))
+
+        with mock.patch.object(api, "_cache", Cache()), mock.patch.object(api, "_get_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))):
+            results = asyncio.run(fetch_concurrently())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results[0], results[1])
+
+    def test_client_error_raises_without_retry(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(404, text="not found")
+
+        with mock.patch.object(api, "_cache", Cache()), mock.patch.object(api, "_get_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))):
+            with self.assertRaisesRegex(api.ClientError, "AAPL - 404"):
+                api.get_company_news("AAPL", "2024-01-01")
+        self.assertEqual(len(calls), 1)
+
+    def test_server_errors_retry_then_raise(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(500, text="boom")
+
+        with mock.patch.object(api, "_cache", Cache()), mock.patch.object(api, "BACKOFF_BASE", 0), mock.patch.object(api, "_get_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))):
+            with self.assertRaisesRegex(api.ServerError, "AAPL - 500"):
+                api.get_company_news("AAPL", "2024-01-01")
+        self.assertEqual(len(calls), api.MAX_RETRIES + 1)
+
+    def test_rate_limited_request_honours_retry_after(self):
+        responses = [httpx.Response(429, headers={"Retry-After": "0"}), httpx.Response(200, json={"ticker": "AAPL", "prices": []})]
+
+        with mock.patch.object(api, "_cache", Cache()), mock.patch.object(api, "BACKOFF_BASE", 0), mock.patch.object(api, "_get_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(lambda request: responses.pop(0)))):
+            with mock.patch.object(api, "backoff_delay", wraps=api.backoff_delay) as backoff:
+                self.assertEqual(api.get_prices("AAPL", "2020-01-01", "2020-02-01"), [])
+        self.assertEqual(responses, [])
+        self.assertEqual(backoff.call_args.args[1], 0.0)
+
+    def test_search_line_items_fetches_only_missing_fields(self):
+        requested = []
+
+        def handler(request):
+            fields = json.loads(request.content)["line_items"]
+            requested.append(fields)
+            rows = [{"ticker": "AAPL", "report_period": rp, "period": "annual", "currency": "USD", **{f: 1.0 for f in fields}} for rp in ("2023-12-31", "2022-12-31")]
+            return httpx.Response(200, json={"search_results": rows})
+
+        with mock.patch.object(api, "_cache", Cache()), mock.patch.object(api, "_get_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))):
+            first = api.search_line_items("AAPL", ["revenue", "net_income"], "2024-01-01", period="annual", limit=2)
+            second = api.search_line_items("AAPL", ["net_income", "free_cash_flow"], "2024-01-01", period="annual", limit=2)
+            third = api.search_line_items("AAPL", ["revenue", "free_cash_flow"], "2024-01-01", period="annual", limit=1)
+
+        self.assertEqual(requested, [["revenue", "net_income"], ["free_cash_flow"]])
+        self.assertEqual([item.report_period for item in first], ["2023-12-31", "2022-12-31"])
+        self.assertEqual(second[0].free_cash_flow, 1.0)
+        self.assertFalse(hasattr(second[0], "revenue"))
+        self.assertEqual(len(third), 1)
 
 
 if __name__ == "__main__":
@@ -4,7 +4,6 @@ import unittest
 from unittest import mock
 
 # Provide dummy modules for optional dependencies
-sys.modules.setdefault("pandas", mock.MagicMock())
 sys.modules.setdefault("requests", mock.MagicMock())
 
 import src.tools.api as api
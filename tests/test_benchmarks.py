@@ -0,0 +1,87 @@
+import json
+import unittest
+from typing import Literal
+
+from pydantic import BaseModel
+
+from benchmarks.fake_llm import FakeChatModel
+from benchmarks.fixtures import SyntheticMarket, synthetic_tickers
+from benchmarks.run import DEFAULT_BASELINE, SUITES, Scenario, combine_runs, find_regressions, missing_baselines, offline
+from src.tools import api
+
+
+class Decision(BaseModel):
+    action: Literal["buy", "sell", "hold"]
+    quantity: int
+    confidence: float
+    reasoning: str
+
+
+class Decisions(BaseModel):
+    decisions: dict[str, Decision]
+
+
+class TestSyntheticMarket(unittest.TestCase):
+    def test_api_is_served_offline_and_counted(self):
+        tickers = synthetic_tickers(2)
+        market = SyntheticMarket("2024-12-31")
+        with offline(market, tickers):
+            first = api.get_prices(tickers[0], "2024-12-02", "2024-12-31")
+            # Served from the cache after a gap fill, and identical to a fresh fetch
+            overlapping = api.get_prices(tickers[0], "2024-11-01", "2024-12-31")
+            metrics = api.get_financial_metrics(tickers[1], "2024-12-31", limit=4)
+            line_items = api.search_line_items(tickers[1], ["revenue", "net_income"], "2024-12-31", period="annual", limit=3)
+            news = api.get_company_news(tickers[0], "2024-12-31", start_date="2024-12-01")
+
+        self.assertEqual(market.calls, {"prices": 2, "financial_metrics": 1, "line_items": 1, "news": 1})
+        self.assertEqual([price.model_dump() for price in first], [price.model_dump() for price in overlapping[-len(first) :]])
+        self.assertEqual([metric.report_period for metric in metrics], ["2024-12-31", "2024-09-30", "2024-06-30", "2024-03-31"])
+        self.assertEqual([item.report_period for item in line_items], ["2024-12-31", "2023-12-31", "2022-12-31"])
+        self.assertGreater(line_items[0].revenue, 0)
+        self.assertTrue(news)
+
+
+class TestFakeChatModel(unittest.TestCase):
+    def test_answers_are_deterministic_and_cover_mentioned_tickers(self):
+        model = FakeChatModel(Decisions, synthetic_tickers(3))
+        prompt = 'Signals: {"SYN000": "bullish", "SYN002": "bearish"} as JSON'
+        answer = model.invoke(prompt)
+        self.assertEqual(sorted(answer.decisions), ["SYN000", "SYN002"])
+        self.assertEqual(answer, FakeChatModel(Decisions, synthetic_tickers(3)).invoke(prompt))
+        self.assertEqual(model.calls, 1)
+
+
+class TestRegressions(unittest.TestCase):
+    def test_slowdowns_and_extra_calls_are_regressions(self):
+        baseline = {"wall_time": 10.0, "peak_rss_mb": 100.0, "calls": {"prices": 5}}
+        self.assertEqual(find_regressions({"wall_time": 11.0, "peak_rss_mb": 110.0, "calls": {"prices": 5}}, baseline, 0.2), [])
+        regressions = find_regressions({"wall_time": 13.0, "peak_rss_mb": 100.0, "calls": {"prices": 6}}, baseline, 0.2)
+        self.assertEqual(len(regressions), 2)
+        self.assertEqual(find_regressions({"wall_time": 99.0, "peak_rss_mb": None, "calls": {}}, None, 0.2), [])
+
+    def test_scenario_names(self):
+        self.assertEqual(Scenario("backtest", 50, "1y").name, "backtest-50-1y")
+
+    def test_missing_baselines(self):
+        results = [{"scenario": "hedge_fund-5-1m"}, {"scenario": "backtest-5-1m"}]
+        self.assertEqual(missing_baselines(results, {"hedge_fund-5-1m": {}}), ["backtest-5-1m"])
+
+    def test_repeated_runs_keep_median_time_and_most_calls(self):
+        runs = [
+            {"scenario": "s", "wall_time": 3.0, "peak_rss_mb": 90.0, "calls": {"news": 5}, "agents": {"a": 3.0}},
+            {"scenario": "s", "wall_time": 1.0, "peak_rss_mb": 120.0, "calls": {"news": 7, "prices": 5}, "agents": {"a": 1.0}},
+            {"scenario": "s", "wall_time": 2.0, "peak_rss_mb": 100.0, "calls": {"news": 6, "prices": 5}, "agents": {"a": 2.0}},
+        ]
+        result = combine_runs(runs)
+        self.assertEqual((result["wall_time"], result["agents"], result["peak_rss_mb"]), (2.0, {"a": 2.0}, 120.0))
+        self.assertEqual(result["calls"], {"news": 7, "prices": 5})
+        self.assertEqual(result["runs"], 3)
+
+    def test_committed_baseline_covers_the_default_suite(self):
+        with open(DEFAULT_BASELINE) as f:
+            baseline = json.load(f)
+        self.assertEqual(missing_baselines([{"scenario": scenario.name} for scenario in SUITES["default"]], baseline), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,11 @@
+import tempfile
+import time
 import unittest
+from unittest import mock
 
-from src.data.cache import Cache
+import numpy as np
+
+from src.data.cache import Cache, SQLiteCacheBackend
 
 
 class TestCache(unittest.TestCase):
@@ -46,6 +51,140 @@ class TestCache(unittest.TestCase):
         self.assertIsNone(cache.get_prices("AAPL"))
         self.assertIsNone(cache.get_financial_metrics("AAPL"))
 
+    def test_price_frame_slices_sorted_range(self):
+        cache = Cache()
+
+        def price(day, close):
+            return {"time": f"2024-01-{day:02d}", "open": close, "close": close, "high": close, "low": close, "volume": 100}
+
+        cache.set_prices("AAPL", [price(3, 3.0), price(1, 1.0), price(5, 5.0)])
+        self.assertIsNone(cache.get_price_frame("MSFT", "2024-01-01", "2024-01-31"))
+
+        frame = cache.get_price_frame("AAPL", "2024-01-02", "2024-01-05")
+        self.assertEqual(list(frame["close"]), [3.0, 5.0])
+        self.assertEqual(frame.index.name, "Date")
+        self.assertEqual(frame["volume"].dtype, "int64")
+        self.assertTrue(cache.get_price_frame("AAPL", "2024-01-06", "2024-01-31").empty)
+
+        # New prices rebuild the columnar store
+        cache.set_prices("AAPL", [price(4, 4.0)])
+        self.assertEqual(list(cache.get_price_frame("AAPL", "2024-01-02", "2024-01-05")["close"]), [3.0, 4.0, 5.0])
+
+    def test_close_asof_carries_last_close_forward(self):
+        cache = Cache()
+
+        def price(time, close):
+            return {"time": time, "open": close, "close": close, "high": close, "low": close, "volume": 100}
+
+        # Friday and Monday for AAPL, only Monday for MSFT
+        cache.set_prices("AAPL", [price("2024-01-05", 10.0), price("2024-01-08", 11.0)])
+        cache.set_prices("MSFT", [price("2024-01-08", 20.0)])
+
+        self.assertEqual(cache.get_close_asof(["AAPL", "MSFT"], "2024-01-08").tolist(), [11.0, 20.0])
+        self.assertEqual(cache.get_close_asof(["AAPL", "MSFT"], "2024-01-10").tolist(), [11.0, 20.0])
+        sunday = cache.get_close_asof(["AAPL", "MSFT"], "2024-01-07")
+        self.assertEqual(sunday[0], 10.0)
+        self.assertTrue(np.isnan(sunday[1]))
+        self.assertTrue(np.isnan(cache.get_close_asof(["AAPL", "NVDA"], "2024-01-01")).all())
+
+        # New prices invalidate the matrix
+        cache.set_prices("MSFT", [price("2024-01-05", 19.0)])
+        self.assertEqual(cache.get_close_asof(["AAPL", "MSFT"], "2024-01-07").tolist(), [10.0, 19.0])
+
+    def test_missing_price_ranges(self):
+        cache = Cache()
+        self.assertEqual(cache.get_missing_price_ranges("AAPL", "2024-01-01", "2024-01-31"), [("2024-01-01", "2024-01-31")])
+        cache.set_prices("AAPL", [], "2024-01-05", "2024-01-10")
+        cache.set_prices("AAPL", [], "2024-01-11", "2024-01-15")
+        cache.set_prices("AAPL", [], "2024-01-20", "2024-01-25")
+
+        self.assertEqual(
+            cache.get_missing_price_ranges("AAPL", "2024-01-01", "2024-01-31"),
+            [("2024-01-01", "2024-01-04"), ("2024-01-16", "2024-01-19"), ("2024-01-26", "2024-01-31")],
+        )
+        self.assertEqual(cache.get_missing_price_ranges("AAPL", "2024-01-06", "2024-01-14"), [])
+        self.assertEqual(cache.get_missing_price_ranges("AAPL", "2024-01-24", "2024-01-26"), [("2024-01-26", "2024-01-26")])
+
+    def test_line_item_coverage(self):
+        cache = Cache()
+        rows = [{"ticker": "AAPL", "report_period": rp, "period": "annual", "currency": "USD", "revenue": 1.0} for rp in ("2023-12-31", "2022-12-31", "2021-12-31")]
+        cache.set_line_items("AAPL", "annual", rows, ["revenue"], "2024-06-01", 3)
+
+        self.assertEqual(cache.get_missing_line_items("AAPL", ["revenue", "net_income"], "2024-06-01", "annual", 3), ["net_income"])
+        # An earlier end date is answered while enough of the fetched periods precede it
+        self.assertEqual(cache.get_missing_line_items("AAPL", ["revenue"], "2023-06-01", "annual", 2), [])
+        self.assertEqual(cache.get_missing_line_items("AAPL", ["revenue"], "2023-06-01", "annual", 3), ["revenue"])
+        # A later end date or another period may include reports that were never fetched
+        self.assertEqual(cache.get_missing_line_items("AAPL", ["revenue"], "2024-07-01", "annual", 1), ["revenue"])
+        self.assertEqual(cache.get_missing_line_items("AAPL", ["revenue"], "2024-06-01", "ttm", 1), ["revenue"])
+
+        # New fields are merged into the existing report period rows
+        cache.set_line_items("AAPL", "annual", [{**rows[0], "net_income": 2.0}], ["net_income"], "2024-06-01", 1)
+        latest = cache.get_line_items("AAPL", "annual", "2024-06-01", 1)
+        self.assertEqual(latest, [{**rows[0], "net_income": 2.0}])
+
+
+class TestSQLiteCacheBackend(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def test_data_survives_new_cache_instance(self):
+        Cache(backend=SQLiteCacheBackend(self.tmpdir.name)).set_prices("AAPL", [{"time": "2020-01-02", "p": 1}])
+        warm = Cache(backend=SQLiteCacheBackend(self.tmpdir.name))
+        self.assertEqual(warm.get_prices("AAPL"), [{"time": "2020-01-02", "p": 1}])
+        self.assertIsNone(warm.get_prices("MSFT"))
+
+    def test_open_rows_expire_after_ttl(self):
+        backend = SQLiteCacheBackend(self.tmpdir.name)
+        Cache(backend=backend).set_company_news(
+            "AAPL",
+            [
+                {"date": "2020-01-02", "title": "old"},
+                {"date": "2999-01-01", "title": "open"},
+            ],
+        )
+        later = time.time() + 7 * 24 * 3600
+        with mock.patch("src.data.cache.time.time", return_value=later):
+            rows = Cache(backend=SQLiteCacheBackend(self.tmpdir.name)).get_company_news("AAPL")
+        # The closed historical row is permanent, the open one has expired
+        self.assertEqual([row["title"] for row in rows], ["old"])
+
+    def test_reset_keeps_persistent_data_unless_requested(self):
+        cache = Cache(backend=SQLiteCacheBackend(self.tmpdir.name))
+        cache.set_financial_metrics("AAPL", [{"report_period": "2020-03-31"}])
+        cache.reset()
+        self.assertEqual(cache.get_financial_metrics("AAPL"), [{"report_period": "2020-03-31"}])
+        cache.reset(persistent=True)
+        self.assertIsNone(cache.get_financial_metrics("AAPL"))
+
+    def test_rows_sharing_a_date_survive_warm_restart(self):
+        trades = [
+            {"filing_date": "2020-01-02", "name": name, "transaction_date": "2019-12-30", "transaction_shares": shares, "transaction_price_per_share": 10.0, "security_title": "Common"}
+            for name, shares in (("Alice", 100.0), ("Bob", 100.0), ("Alice", -50.0))
+        ]
+        news = [{"date": "2020-01-02", "url": f"https://example.com/{index}", "title": f"story {index}"} for index in range(3)]
+        metrics = [{"report_period": "2019-12-31", "period": period} for period in ("ttm", "annual", "quarterly")]
+        cache = Cache(backend=SQLiteCacheBackend(self.tmpdir.name))
+        cache.set_insider_trades("AAPL", trades)
+        cache.set_company_news("AAPL", news)
+        cache.set_financial_metrics("AAPL", metrics)
+        # A repeated fetch adds nothing new
+        cache.set_company_news("AAPL", news[:1])
+
+        warm = Cache(backend=SQLiteCacheBackend(self.tmpdir.name))
+        self.assertCountEqual(warm.get_insider_trades("AAPL"), trades)
+        self.assertCountEqual(warm.get_company_news("AAPL"), news)
+        self.assertCountEqual(warm.get_financial_metrics("AAPL"), metrics)
+        self.assertEqual(len(cache.get_company_news("AAPL")), 3)
+
+    def test_disabled_by_environment(self):
+        with mock.patch.dict("os.environ", {"FINANCIAL_DATASETS_CACHE": "memory"}):
+            backend = SQLiteCacheBackend()
+            self.assertIsNone(backend.path)
+            Cache(backend=backend).set_prices("AAPL", [{"time": "2020-01-02"}])
+            self.assertIsNone(backend.load("prices", "AAPL"))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,100 @@
+import gzip
+import os
+import sys
+import tempfile
+import types
+import unittest
+from unittest import mock
+
+import httpx
+from pydantic import BaseModel
+
+import src.tools.api as api
+from src.data.cache import Cache
+from src.utils import llm as llm_module
+from src.utils.cassette import CassetteMiss, CassetteTransport, cassette_from_args, use_cassette
+
+
+class Signal(BaseModel):
+    signal: str
+    confidence: float
+
+
+class TestCassette(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "run.cassette.gz")
+        self.requests = []
+
+    def fetch_prices(self, handler, ticker="AAPL"):
+        client = httpx.AsyncClient(transport=CassetteTransport(httpx.MockTransport(handler)))
+        with mock.patch.object(api, "_cache", Cache()), mock.patch.object(api, "_get_client", lambda: client):
+            return api.get_prices(ticker, "2024-01-01", "2024-01-05")
+
+    def live(self, request):
+        self.requests.append(request)
+        prices = [{"time": "2024-01-02", "open": 1.5, "close": 2.25, "high": 3.0, "low": 1.0, "volume": 10}]
+        return httpx.Response(200, json={"ticker": "AAPL", "prices": prices}, headers={"X-Request-Id": "abc"})
+
+    def offline(self, request):
+        raise AssertionError("replay reached the network")
+
+    def test_replay_serves_recorded_responses_without_network(self):
+        with use_cassette(self.path, "record"):
+            recorded = self.fetch_prices(self.live)
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(2), b"\x1f\x8b")
+
+        with use_cassette(self.path, "replay") as cassette:
+            replayed = self.fetch_prices(self.offline)
+            request = httpx.Request("GET", str(self.requests[0].url))
+            response = cassette.replay_http(request)
+            with self.assertRaises(CassetteMiss):
+                self.fetch_prices(self.offline, ticker="MSFT")
+
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual([price.model_dump() for price in replayed], [price.model_dump() for price in recorded])
+        self.assertEqual(response.content, self.live(request).content)
+        self.assertEqual(response.headers["x-request-id"], "abc")
+
+    def test_cassette_never_stores_request_headers(self):
+        with mock.patch.dict(os.environ, {"FINANCIAL_DATASETS_API_KEY": "secret-key"}), use_cassette(self.path, "record"):
+            self.fetch_prices(self.live)
+
+        with gzip.open(self.path, "rt") as f:
+            self.assertNotIn("secret-key", f.read())
+
+    def test_llm_results_are_recorded_and_replayed(self):
+        calls = []
+
+        class FakeLLM:
+            def invoke(self, prompt):
+                calls.append(prompt)
+                return Signal(signal="bullish", confidence=72.5)
+
+        fake_models = types.SimpleNamespace(
+            get_model_info=lambda name: types.SimpleNamespace(has_json_mode=lambda: True, chars_per_token=lambda: 4.0),
+            get_structured_model=lambda *args, **kwargs: FakeLLM(),
+        )
+        with mock.patch.dict(sys.modules, {"src.llm.models": fake_models}), mock.patch.object(llm_module.progress, "update_status"):
+            with use_cassette(self.path, "record"):
+                recorded = llm_module.call_llm("prompt", "model", "Provider", Signal, agent_name="agent")
+                llm_module.call_llm("other prompt", "model", "Provider", Signal, default_factory=lambda: None)
+            with use_cassette(self.path, "replay"):
+                replayed = llm_module.call_llm("prompt", "model", "Provider", Signal, agent_name="agent")
+                with self.assertRaises(CassetteMiss):
+                    llm_module.call_llm("unrecorded prompt", "model", "Provider", Signal)
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(replayed, recorded)
+
+    def test_cassette_from_args(self):
+        with self.assertRaises(ValueError):
+            cassette_from_args(record=self.path, replay=self.path)
+        with cassette_from_args() as cassette:
+            self.assertIsNone(cassette)
+
+
+if __name__ == "__main__":
+    unittest.main()
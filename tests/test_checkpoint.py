@@ -0,0 +1,67 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from src.utils.checkpoint import BacktestCheckpoint, default_checkpoint_path
+
+CONFIG = {"tickers": ["AAPL", "MSFT"], "start_date": "2024-01-01", "end_date": "2024-03-01", "model_name": "gpt-4o"}
+
+
+def day(date, cash):
+    return {
+        "date": date,
+        "portfolio": {"cash": cash, "positions": {"AAPL": {"long": 3, "short": 0}}},
+        "portfolio_value": {"Date": date, "Portfolio Value": cash + 0.1, "Long/Short Ratio": float("inf")},
+        "rows": [[date, "AAPL", "BUY", 3]],
+        "decisions": {"AAPL": {"action": "buy", "quantity": 3}},
+        "analyst_signals": {"technical_analyst_agent": {"AAPL": {"signal": "bullish", "confidence": 61.5}}},
+    }
+
+
+class TestBacktestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "backtest.jsonl.gz")
+
+    def test_days_round_trip_and_resume_appends(self):
+        checkpoint = BacktestCheckpoint(self.path, CONFIG, every=2)
+        checkpoint.start()
+        checkpoint.add(day("2024-01-02", 99_000.0))
+        # Buffered until `every` days completed
+        self.assertEqual(BacktestCheckpoint(self.path, CONFIG).load(), [])
+        checkpoint.add(day("2024-01-03", 98_000.0))
+        checkpoint.add(day("2024-01-04", 97_000.0))
+        checkpoint.flush()
+
+        resumed = BacktestCheckpoint(self.path, CONFIG)
+        days = resumed.resume()
+        self.assertEqual([d["date"] for d in days], ["2024-01-02", "2024-01-03", "2024-01-04"])
+        self.assertEqual(days[0], day("2024-01-02", 99_000.0))
+        resumed.add(day("2024-01-05", 96_000.0))
+        self.assertEqual(len(BacktestCheckpoint(self.path, CONFIG).load()), 4)
+
+    def test_interrupted_append_keeps_earlier_days(self):
+        checkpoint = BacktestCheckpoint(self.path, CONFIG)
+        checkpoint.start()
+        checkpoint.add(day("2024-01-02", 99_000.0))
+        checkpoint.add(day("2024-01-03", 98_000.0))
+        with open(self.path, "ab") as f:
+            f.write(gzip.compress(b'{"date": "2024-01-04", "portfolio": {"cash": 9')[:-12])
+
+        checkpoint = BacktestCheckpoint(self.path, CONFIG)
+        self.assertEqual([d["date"] for d in checkpoint.resume()], ["2024-01-02", "2024-01-03"])
+        checkpoint.add(day("2024-01-04", 97_000.0))
+        self.assertEqual([d["date"] for d in checkpoint.load()], ["2024-01-02", "2024-01-03", "2024-01-04"])
+
+    def test_checkpoint_of_other_settings_is_rejected(self):
+        BacktestCheckpoint(self.path, CONFIG).start()
+        with self.assertRaises(ValueError):
+            BacktestCheckpoint(self.path, {**CONFIG, "model_name": "o3-mini"}).load()
+        self.assertEqual(BacktestCheckpoint(os.path.join(os.path.dirname(self.path), "missing.jsonl.gz"), CONFIG).load(), [])
+        self.assertNotEqual(default_checkpoint_path(CONFIG), default_checkpoint_path({**CONFIG, "end_date": "2024-04-01"}))
+
+
+if __name__ == "__main__":
+    unittest.main()
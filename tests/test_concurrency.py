@@ -0,0 +1,50 @@
+import asyncio
+import threading
+import unittest
+
+from src.utils import concurrency
+
+
+class TestMapTickers(unittest.TestCase):
+    def tearDown(self):
+        concurrency.configure(max_workers=concurrency.DEFAULT_MAX_WORKERS)
+
+    def test_results_follow_ticker_order(self):
+        concurrency.configure(max_workers=4)
+        tickers = ["AAPL", "MSFT", "NVDA", "TSLA", "GOOG"]
+        self.assertEqual(concurrency.map_tickers(str.lower, tickers), [t.lower() for t in tickers])
+
+    def test_single_worker_runs_in_calling_thread(self):
+        concurrency.configure(max_workers=1)
+        threads = concurrency.map_tickers(lambda _: threading.current_thread().name, ["AAPL", "MSFT"])
+        self.assertEqual(threads, [threading.current_thread().name] * 2)
+
+    def test_nested_calls_do_not_deadlock(self):
+        concurrency.configure(max_workers=2)
+        result = concurrency.map_tickers(lambda t: concurrency.map_tickers(str.lower, [t, t]), ["AAPL", "MSFT", "NVDA"])
+        self.assertEqual(result, [["aapl", "aapl"], ["msft", "msft"], ["nvda", "nvda"]])
+
+
+class TestConcurrencyLimit(unittest.TestCase):
+    def test_limit_is_shared_per_name(self):
+        concurrency.configure(limits={"test_provider": 2})
+        self.assertIs(concurrency.concurrency_limit("test_provider"), concurrency.concurrency_limit("test_provider"))
+        limit = concurrency.concurrency_limit("test_provider")
+        self.assertTrue(limit.acquire(blocking=False))
+        self.assertTrue(limit.acquire(blocking=False))
+        self.assertFalse(limit.acquire(blocking=False))
+        limit.release()
+        limit.release()
+
+
+class TestRunSync(unittest.TestCase):
+    def test_runs_on_shared_background_loop(self):
+        async def loop_id():
+            return id(asyncio.get_running_loop())
+
+        self.assertEqual(concurrency.run_sync(loop_id()), concurrency.run_sync(loop_id()))
+        self.assertEqual(concurrency.map_tickers(lambda _: concurrency.run_sync(loop_id()), ["AAPL", "MSFT"]), [id(concurrency.get_event_loop())] * 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -11,6 +11,8 @@ sys.modules.setdefault("rich.table", mock.MagicMock())
 sys.modules.setdefault("rich.style", mock.MagicMock())
 sys.modules.setdefault("rich.text", mock.MagicMock())
 
+from pydantic import BaseModel  # noqa: E402
+
 from src.utils.llm import (  # noqa: E402
     create_default_response,
     extract_json_from_deepseek_response,
@@ -65,7 +67,7 @@ class TestLLMUtils(unittest.TestCase):
 
         fake_models_mod = types.SimpleNamespace(
             get_model_info=lambda name: types.SimpleNamespace(has_json_mode=lambda: True),
-            get_model=lambda *args, **kwargs: FakeLLM(),
+            get_structured_model=lambda *args, **kwargs: FakeLLM(),
         )
         with (
             mock.patch.dict(
@@ -73,6 +75,7 @@ class TestLLMUtils(unittest.TestCase):
                 {"src.llm.models": fake_models_mod},
             ),
             mock.patch.object(llm_module.progress, "update_status"),
+            mock.patch.object(llm_module, "LLM_BACKOFF_BASE", 0),
         ):
             factory_called = {}
 
@@ -96,7 +99,7 @@ class TestLLMUtils(unittest.TestCase):
 
         fake_models_mod = types.SimpleNamespace(
             get_model_info=lambda name: None,
-            get_model=lambda *args, **kwargs: object(),
+            get_structured_model=lambda *args, **kwargs: object(),
         )
 
         with (
@@ -112,5 +115,315 @@ class TestLLMUtils(unittest.TestCase):
                 llm_module.call_llm("p", "m", None, DummyModel)
 
 
+class Signal(BaseModel):
+    signal: str
+    confidence: float
+
+
+class PersonaSignal(BaseModel):
+    signal: str
+    confidence: float
+    reasoning: str
+
+
+def score_analysis(ticker):
+    # A is ambiguous, B clearly bullish
+    return {"signal": "neutral", "score": 5, "max_score": 10} if ticker == "A" else {"signal": "bullish", "score": 9, "max_score": 10}
+
+
+class TestCallLLMBatched(unittest.TestCase):
+    def test_chunks_follow_token_budget_and_ticker_cap(self):
+        from src.utils.llm import chunk_by_token_budget
+
+        analysis_data = {ticker: {"details": "x" * 400} for ticker in ["A", "B", "C", "D", "E"]}
+        self.assertEqual(chunk_by_token_budget(analysis_data, token_budget=250), [["A", "B"], ["C", "D"], ["E"]])
+        self.assertEqual(chunk_by_token_budget(analysis_data, token_budget=10_000, max_tickers=3), [["A", "B", "C"], ["D", "E"]])
+        self.assertEqual(chunk_by_token_budget({"A": {"details": "x" * 4000}}, token_budget=10), [["A"]])
+
+    def test_missing_tickers_fall_back_to_single_calls(self):
+        from src.utils import llm as llm_module
+
+        batch_calls = []
+
+        def fake_call_llm(prompt, model_name, model_provider, pydantic_model, **_):
+            batch_calls.append(prompt)
+            # The model answers for A only
+            return pydantic_model(signals={"A": Signal(signal="bullish", confidence=70.0)})
+
+        single_calls = []
+
+        def generate_output(ticker, ticker_data):
+            single_calls.append((ticker, ticker_data))
+            return Signal(signal="neutral", confidence=0.0)
+
+        with mock.patch.object(llm_module, "call_llm", side_effect=fake_call_llm), mock.patch.object(llm_module.progress, "update_status"):
+            outputs = llm_module.call_llm_batched(
+                analysis_data={"A": {"score": 1}, "B": {"score": 2}},
+                create_prompt=lambda ticker, data, model_name: f"{ticker}: {data}",
+                generate_output=generate_output,
+                pydantic_model=Signal,
+                model_name="m",
+                model_provider="p",
+                agent_name="agent",
+            )
+
+        self.assertEqual(list(outputs), ["A", "B"])
+        self.assertEqual(outputs["A"].signal, "bullish")
+        self.assertEqual(len(batch_calls), 1)
+        self.assertIn("A, B", batch_calls[0])
+        self.assertEqual(single_calls, [("B", {"B": {"score": 2}})])
+
+    def test_fill_analysis_prompt_compacts_analysis_data(self):
+        import json
+
+        from src.utils import llm as llm_module
+
+        template = mock.Mock()
+        llm_module.fill_analysis_prompt(template, "A, B", {"A": {"score": 1}, "B": {"score": 2}}, None, agent_name="agent")
+        variables = template.invoke.call_args.args[0]
+        self.assertEqual(variables["ticker"], "A, B")
+        self.assertEqual(json.loads(variables["analysis_data"]), {"A": {"score": 1}, "B": {"score": 2}})
+        self.assertNotIn("\n", variables["analysis_data"])
+
+    def test_generate_signals_batches_what_needs_the_llm(self):
+        from src.utils import llm as llm_module
+
+        batched = []
+
+        def fake_batched(analysis_data, **kwargs):
+            batched.append(analysis_data)
+            return {ticker: PersonaSignal(signal="bearish", confidence=55.0, reasoning="batched") for ticker in analysis_data}
+
+        metadata = {"model_name": "m", "model_provider": "p", "llm_mode": "hybrid", "batch_llm_calls": True}
+        with mock.patch.object(llm_module, "call_llm_batched", side_effect=fake_batched), mock.patch.object(llm_module.progress, "update_status"):
+            signals = llm_module.generate_signals(
+                ["A", "B", "A"],
+                score_analysis,
+                generate_output=mock.Mock(side_effect=AssertionError("single call while batching")),
+                create_prompt=lambda ticker, data, model_name: ticker,
+                pydantic_model=PersonaSignal,
+                metadata=metadata,
+                agent_name="agent",
+                status="Generating analysis",
+            )
+
+        self.assertEqual(batched, [{"A": score_analysis("A")}])
+        self.assertEqual(list(signals), ["A", "B"])
+        self.assertEqual(signals["A"], {"signal": "bearish", "confidence": 55.0, "reasoning": "batched"})
+        self.assertEqual(signals["B"]["signal"], "bullish")
+
+
+class TestLLMModes(unittest.TestCase):
+    def test_needs_llm_by_mode(self):
+        from src.utils.llm import needs_llm
+
+        clear, ambiguous = {"score": 9, "max_score": 10}, {"score": 5, "max_score": 10}
+        self.assertTrue(needs_llm(clear, {}))
+        self.assertFalse(needs_llm(ambiguous, {"llm_mode": "deterministic"}))
+        self.assertTrue(needs_llm(ambiguous, {"llm_mode": "hybrid"}))
+        self.assertFalse(needs_llm(clear, {"llm_mode": "hybrid"}))
+        self.assertTrue(needs_llm(clear, {"llm_mode": "hybrid", "ambiguity_band": (0.8, 1.0)}))
+        with self.assertRaises(ValueError):
+            needs_llm(clear, {"llm_mode": "sometimes"})
+
+    def test_generate_signals_follows_llm_mode(self):
+        from src.utils import llm as llm_module
+
+        def generate_output(ticker, analysis_data, model_name, model_provider):
+            return PersonaSignal(signal="bearish", confidence=40.0, reasoning=f"{model_name} on {list(analysis_data)}")
+
+        def run(llm_mode):
+            metadata = {"model_name": "m", "model_provider": "p", "llm_mode": llm_mode}
+            with mock.patch.object(llm_module.progress, "update_status"):
+                return llm_module.generate_signals(["A", "B"], score_analysis, generate_output, lambda *_: None, PersonaSignal, metadata, "agent", "Generating analysis")
+
+        self.assertEqual({ticker: signal["reasoning"] for ticker, signal in run("llm").items()}, {"A": "m on ['A']", "B": "m on ['B']"})
+        self.assertNotIn("m on", str(run("deterministic")))
+        hybrid = run("hybrid")
+        self.assertEqual(hybrid["A"]["reasoning"], "m on ['A']")
+        self.assertEqual(hybrid["B"], llm_module.deterministic_signal(score_analysis("B")))
+
+    def test_deterministic_confidence_follows_score(self):
+        from src.utils.llm import deterministic_signal
+
+        self.assertEqual(deterministic_signal({"signal": "bullish", "score": 12, "max_score": 15})["confidence"], 80.0)
+        self.assertEqual(deterministic_signal({"signal": "bearish", "score": 3, "max_score": 15})["confidence"], 80.0)
+        self.assertEqual(deterministic_signal({"signal": "neutral", "score": 5, "max_score": 10})["confidence"], 100.0)
+        self.assertEqual(deterministic_signal({"signal": "neutral", "score": 0, "max_score": 0})["signal"], "neutral")
+
+
+class TestProviderScheduler(unittest.TestCase):
+    def setUp(self):
+        from src.utils import llm as llm_module
+
+        self.llm_module = llm_module
+        llm_module.scheduler.reset()
+        self.addCleanup(llm_module.scheduler.reset)
+        self.addCleanup(setattr, llm_module.scheduler, "fallback_model", None)
+        self.calls = []
+
+    def call(self, fallback_model=None, failing=("Flaky",)):
+        calls = self.calls
+
+        class FakeLLM:
+            def __init__(self, provider):
+                self.provider = provider
+
+            def invoke(self, _prompt):
+                calls.append(self.provider)
+                if self.provider in failing:
+                    raise RuntimeError("overloaded")
+                return Signal(signal="bullish", confidence=60.0)
+
+        fake_models_mod = types.SimpleNamespace(
+            get_model_info=lambda name: types.SimpleNamespace(
+                has_json_mode=lambda: True,
+                chars_per_token=lambda: 4.0,
+                provider=types.SimpleNamespace(value="Backup" if name == "backup-model" else "Flaky"),
+            ),
+            get_structured_model=lambda model_name, provider, *_: FakeLLM(provider),
+        )
+        self.llm_module.scheduler.fallback_model = fallback_model
+        with (
+            mock.patch.dict(sys.modules, {"src.llm.models": fake_models_mod}),
+            mock.patch.object(self.llm_module.progress, "update_status"),
+            mock.patch.object(self.llm_module, "LLM_BACKOFF_BASE", 0),
+            mock.patch("builtins.print"),
+        ):
+            return self.llm_module.call_llm("prompt", "flaky-model", "Flaky", Signal, agent_name="agent", default_factory=lambda: None)
+
+    def test_open_breaker_fails_fast(self):
+        self.call()
+        self.call()
+        # The fifth failure opened the breaker, so the last retry was never sent
+        self.assertEqual(len(self.calls), 5)
+        self.assertIsNone(self.call())
+        self.assertEqual(len(self.calls), 5)
+
+    def test_open_breaker_fails_over_to_fallback_model(self):
+        self.call()
+        self.call()
+        result = self.call(fallback_model="backup-model")
+        self.assertEqual(result.signal, "bullish")
+        self.assertEqual(self.calls[-1], "Backup")
+
+    def test_failover_is_traced(self):
+        self.call()
+        self.call()
+        tracer = self.llm_module.tracer
+        tracer.reset()
+        with mock.patch.object(tracer, "_enabled", True):
+            self.call(fallback_model="backup-model")
+        spans = {span.get("model"): span for span in tracer.spans}
+        tracer.reset()
+
+        self.assertEqual(spans["flaky-model"].get("outcome"), "failover")
+        backup = spans["backup-model"]
+        self.assertEqual(backup.parent_id, spans["flaky-model"].span_id)
+        self.assertEqual((backup.get("provider"), backup.get("attempts")), ("Backup", 1))
+        self.assertGreater(backup.get("prompt_tokens"), 0)
+        self.assertGreater(backup.get("completion_tokens"), 0)
+
+    def test_backoff_honours_retry_after(self):
+        error = RuntimeError("rate limited")
+        error.response = types.SimpleNamespace(headers={"retry-after": "3"})
+        self.assertEqual(self.llm_module._retry_after(error), 3.0)
+        self.assertIsNone(self.llm_module._retry_after(RuntimeError("boom")))
+
+
+class FakeStreamingLLM:
+    def __init__(self, chunks, delay=0.0):
+        self.chunks = chunks
+        self.delay = delay
+
+    async def astream(self, _prompt):
+        import asyncio
+
+        for chunk in self.chunks:
+            await asyncio.sleep(self.delay)
+            yield types.SimpleNamespace(content=chunk)
+
+
+class TestStreaming(unittest.TestCase):
+    def call_streaming(self, fake_llm, **kwargs):
+        from src.utils import llm as llm_module
+
+        fake_models_mod = types.SimpleNamespace(
+            get_model_info=lambda name: types.SimpleNamespace(has_json_mode=lambda: True),
+            get_structured_model=lambda *_, **__: fake_llm,
+        )
+        with (
+            mock.patch.dict(sys.modules, {"src.llm.models": fake_models_mod}),
+            mock.patch.object(llm_module, "STREAM_REPORT_INTERVAL", 0),
+            mock.patch.object(llm_module.progress, "update_status") as update_status,
+        ):
+            result = llm_module.call_llm("prompt", "m", "p", Signal, agent_name="agent", stream=True, **kwargs)
+        return result, [call.args[2] for call in update_status.call_args_list]
+
+    def test_parse_partial_json(self):
+        from src.utils.llm import parse_partial_json
+
+        text = 'Sure: {"signal": "bullish", "confidence": 72.5, "reasoning": "Strong \\"moat\\" {x}"} trailing'
+        self.assertEqual(parse_partial_json(text, partial=False)["reasoning"], 'Strong "moat" {x}')
+        self.assertEqual(parse_partial_json(text[:47]), {"signal": "bullish", "confidence": 72.5})
+        self.assertIsNone(parse_partial_json(text[:47], partial=False))
+        self.assertIsNone(parse_partial_json("no json yet"))
+
+    def test_streams_and_reports_progress(self):
+        chunks = ['{"sig', 'nal": "bear', 'ish", "conf', 'idence": 40', "}"]
+        result, statuses = self.call_streaming(FakeStreamingLLM(chunks))
+        self.assertEqual((result.signal, result.confidence), ("bearish", 40.0))
+        self.assertTrue(statuses[-1].startswith("Streaming - 5 tokens, first after"))
+        self.assertIn("signal bearish", statuses[-1])
+
+    def test_streamed_text_is_validated_and_retried(self):
+        attempts = iter([['{"signal": "bullish"}'], ["no json"], ['{"signal": "bullish", "confidence": 61}']])
+
+        class FlakyStreamingLLM:
+            def astream(self, prompt):
+                return FakeStreamingLLM(next(attempts)).astream(prompt)
+
+        result, statuses = self.call_streaming(FlakyStreamingLLM())
+        self.assertEqual((result.signal, result.confidence), ("bullish", 61.0))
+        self.assertIn("Unparseable response - retry 2/3", statuses)
+
+    def test_unparseable_stream_uses_default_factory(self):
+        result, _ = self.call_streaming(
+            FakeStreamingLLM(['{"signal": "bullish"}']),
+            default_factory=lambda: Signal(signal="neutral", confidence=1.0),
+        )
+        self.assertEqual((result.signal, result.confidence), ("neutral", 1.0))
+
+    def test_deadline_cancels_stream_and_uses_default(self):
+        result, statuses = self.call_streaming(
+            FakeStreamingLLM(['{"signal": "bullish"', ', "confidence": 90}'], delay=0.2),
+            deadline=0.05,
+            default_factory=lambda: Signal(signal="neutral", confidence=0.0),
+        )
+        self.assertEqual(result.signal, "neutral")
+        self.assertEqual(statuses, ["Timed out after 0.05s"])
+
+    def test_deadline_surfacing_through_run_sync_is_not_retried(self):
+        import concurrent.futures
+
+        from src.utils import llm as llm_module
+
+        def timed_out(coro):
+            # What run_coroutine_threadsafe(...).result() raises for a deadline on Python 3.10
+            coro.close()
+            raise concurrent.futures.TimeoutError()
+
+        run_sync = mock.Mock(side_effect=timed_out)
+        with mock.patch.object(llm_module, "run_sync", run_sync), mock.patch("builtins.print"):
+            result, statuses = self.call_streaming(
+                FakeStreamingLLM(['{"signal": "bullish", "confidence": 90}']),
+                deadline=0.05,
+                default_factory=lambda: Signal(signal="neutral", confidence=0.0),
+            )
+        self.assertEqual(result.signal, "neutral")
+        self.assertEqual(run_sync.call_count, 1)
+        self.assertEqual(statuses, ["Timed out after 0.05s"])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,83 @@
+import tempfile
+import types
+import unittest
+from typing import Literal
+from unittest import mock
+
+from pydantic import BaseModel
+
+from src.llm.cache import LLMCache, llm_cache_key
+from src.utils import llm as llm_module
+
+
+class Signal(BaseModel):
+    signal: Literal["bullish", "bearish", "neutral"]
+    confidence: float
+    reasoning: str
+
+
+class OtherSignal(BaseModel):
+    signal: str
+
+
+class Message:
+    def __init__(self, type, content):
+        self.type = type
+        self.content = content
+
+
+class TestLLMCacheKey(unittest.TestCase):
+    def test_ignores_template_indentation(self):
+        indented = [Message("system", "  You are an analyst.\n      Be concise.  "), Message("human", "AAPL")]
+        flat = [Message("system", "You are an analyst.\nBe concise."), Message("human", "AAPL")]
+        self.assertEqual(llm_cache_key(indented, "gpt-4o", "OpenAI", Signal), llm_cache_key(flat, "gpt-4o", "OpenAI", Signal))
+
+    def test_changes_with_model_schema_and_prompt(self):
+        key = llm_cache_key("prompt", "gpt-4o", "OpenAI", Signal)
+        self.assertNotEqual(key, llm_cache_key("prompt", "gpt-4o-mini", "OpenAI", Signal))
+        self.assertNotEqual(key, llm_cache_key("prompt", "gpt-4o", "Groq", Signal))
+        self.assertNotEqual(key, llm_cache_key("prompt", "gpt-4o", "OpenAI", OtherSignal))
+        self.assertNotEqual(key, llm_cache_key("other prompt", "gpt-4o", "OpenAI", Signal))
+
+
+class TestLLMCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache = LLMCache(cache_dir=self.tmpdir.name, enabled=True)
+        self.response = Signal(signal="bullish", confidence=80.0, reasoning="Strong moat")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_round_trip_persists_across_instances(self):
+        self.cache.set("key", self.response, "gpt-4o", "OpenAI")
+        self.assertEqual(LLMCache(cache_dir=self.tmpdir.name, enabled=True).get("key", Signal), self.response)
+        self.assertIsNone(self.cache.get("missing", Signal))
+
+    def test_expired_and_disabled_entries_miss(self):
+        self.cache.set("key", self.response, "gpt-4o", "OpenAI")
+        self.assertIsNone(LLMCache(cache_dir=self.tmpdir.name, enabled=True, ttl=0).get("key", Signal))
+        self.assertIsNone(LLMCache(cache_dir=self.tmpdir.name, enabled=False).get("key", Signal))
+
+    def test_call_llm_reuses_response(self):
+        calls = []
+
+        def invoke(prompt):
+            calls.append(prompt)
+            return self.response
+
+        fake_models = types.SimpleNamespace(
+            get_model_info=lambda name: types.SimpleNamespace(has_json_mode=lambda: True),
+            get_structured_model=lambda *_: types.SimpleNamespace(invoke=invoke),
+        )
+        with mock.patch.dict("sys.modules", {"src.llm.models": fake_models}), mock.patch.object(llm_module, "get_llm_cache", return_value=self.cache):
+            first = llm_module.call_llm("prompt", "gpt-4o", "OpenAI", Signal)
+            second = llm_module.call_llm("prompt", "gpt-4o", "OpenAI", Signal)
+            llm_module.call_llm("prompt", "gpt-4o", "OpenAI", Signal, use_cache=False)
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(calls), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
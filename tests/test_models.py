@@ -0,0 +1,54 @@
+import unittest
+from unittest import mock
+
+from pydantic import BaseModel
+
+from src.llm import models
+from src.utils.concurrency import map_tickers
+
+
+class Signal(BaseModel):
+    signal: str
+
+
+class FakeChatModel:
+    def __init__(self):
+        self.schemas = []
+
+    def with_structured_output(self, schema, method=None):
+        self.schemas.append(schema)
+        return (self, schema)
+
+
+class TestStructuredModelRegistry(unittest.TestCase):
+    def setUp(self):
+        models.clear_model_registry()
+        self.built = []
+
+        def get_model(model_name, model_provider):
+            self.built.append((model_name, model_provider))
+            return FakeChatModel()
+
+        patcher = mock.patch.object(models, "get_model", side_effect=get_model)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(models.clear_model_registry)
+
+    def test_client_is_built_once_per_model_and_schema(self):
+        clients = map_tickers(lambda _: models.get_structured_model("gpt-4o", models.ModelProvider.OPENAI, Signal), ["AAPL", "MSFT", "NVDA"])
+        self.assertTrue(all(client is clients[0] for client in clients))
+        self.assertIs(models.get_structured_model("gpt-4o", "OpenAI", Signal), clients[0])
+        self.assertEqual(len(self.built), 1)
+
+        models.get_structured_model("gpt-4o-mini", "OpenAI", Signal)
+        models.get_structured_model("gpt-4o", "OpenAI", BaseModel)
+        self.assertEqual(len(self.built), 3)
+
+    def test_models_without_json_mode_are_not_bound_to_a_schema(self):
+        client = models.get_structured_model("deepseek-reasoner", "DeepSeek", Signal)
+        self.assertIsInstance(client, FakeChatModel)
+        self.assertEqual(client.schemas, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
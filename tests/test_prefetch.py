@@ -0,0 +1,133 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from benchmarks.fixtures import SyntheticMarket, synthetic_tickers
+from benchmarks.run import offline
+from src.data import prefetch
+from src.data.cache import Cache
+from src.data.prefetch import PrefetchManager, plan_prefetch
+from src.tools import api
+
+
+class TestPlanPrefetch(unittest.TestCase):
+    def test_plan_covers_every_endpoint_and_the_first_day(self):
+        jobs = plan_prefetch(["AAPL", "MSFT"], "2024-01-01", "2024-12-31", history_start="2023-01-01", selected_analysts=["warren_buffett"])
+        by_endpoint = {}
+        for job in jobs:
+            by_endpoint.setdefault(job.endpoint, []).append(job)
+
+        self.assertEqual(sorted(by_endpoint), ["company_news", "financial_metrics", "insider_trades", "line_items", "prices"])
+        self.assertEqual(len(jobs), len(set(job.key for job in jobs)))
+        self.assertEqual(by_endpoint["prices"][0].kwargs(), {"start_date": "2023-01-01", "end_date": "2024-12-31"})
+        # A year of quarterly reports on top of the ten the agents read on the first day
+        self.assertGreaterEqual(by_endpoint["financial_metrics"][0].kwargs()["limit"], 14)
+        self.assertIsInstance(by_endpoint["line_items"][0].kwargs()["line_items"], list)
+
+
+class TestPrefetchManager(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.manifest_path = os.path.join(tmp.name, "manifest.json")
+        self.tickers = synthetic_tickers(3)
+        self.jobs = plan_prefetch(self.tickers, "2024-10-01", "2024-12-31", selected_analysts=["warren_buffett"])
+
+    def run_manager(self, report=None):
+        return PrefetchManager(self.jobs, max_workers=4, manifest_path=self.manifest_path, report=report or (lambda line: None)).run()
+
+    def test_prefetch_fills_the_cache_and_resumes_from_the_manifest(self):
+        market = SyntheticMarket("2024-12-31")
+        lines = []
+        with offline(market, self.tickers):
+            stats = self.run_manager(lines.append)
+            self.assertEqual((stats.done, stats.skipped, stats.failures), (len(self.jobs), 0, []))
+            self.assertEqual(market.calls["prices"], len(self.tickers))
+            self.assertTrue(api.get_prices(self.tickers[0], "2024-10-01", "2024-12-31"))
+            self.assertIn(f"{len(self.jobs)}/{len(self.jobs)} jobs", lines[-1])
+
+            # A second run finds every job in the manifest and its data in the cache, and makes no requests
+            calls = sum(market.calls.values())
+            stats = self.run_manager()
+            self.assertEqual((stats.done, stats.skipped), (0, len(self.jobs)))
+            self.assertEqual(sum(market.calls.values()), calls)
+
+            # News expires from the cache after an hour, so the manifest stops vouching for it too
+            later = time.time() + 2 * 3600
+            with mock.patch("src.data.prefetch.time.time", return_value=later):
+                stats = self.run_manager()
+            self.assertEqual(stats.done, sum(job.endpoint == "company_news" for job in self.jobs))
+
+            # After the cache is cleared, every job runs again
+            with mock.patch.object(api, "_cache", Cache()):
+                stats = self.run_manager()
+            self.assertEqual((stats.done, stats.skipped), (len(self.jobs), 0))
+
+    def test_rows_outside_a_jobs_window_do_not_count_as_cached(self):
+        market = SyntheticMarket("2024-12-31")
+        with offline(market, self.tickers):
+            self.run_manager()
+            warm = api._cache
+            # News only from before the window, and fewer financial metrics than the jobs ask for
+            with mock.patch.object(api, "_cache", Cache()):
+                for ticker in self.tickers:
+                    api._cache.set_company_news(ticker, [dict(news, date="2024-06-03") for news in warm.get_company_news(ticker)])
+                    api._cache.set_financial_metrics(ticker, warm.get_financial_metrics(ticker)[:2])
+                    api._cache.set_insider_trades(ticker, warm.get_insider_trades(ticker))
+                stats = self.run_manager()
+        insider_jobs = sum(job.endpoint == "insider_trades" for job in self.jobs)
+        self.assertEqual((stats.done, stats.skipped), (len(self.jobs) - insider_jobs, insider_jobs))
+
+    def test_jobs_waiting_on_a_busy_endpoint_leave_workers_free(self):
+        finished = []
+
+        async def slow_prices(ticker, **kwargs):
+            await asyncio.sleep(0.05)
+            finished.append(("prices", ticker))
+
+        async def news(ticker, **kwargs):
+            finished.append(("company_news", ticker))
+
+        jobs = [prefetch._job("prices", "A"), prefetch._job("prices", "B"), prefetch._job("company_news", "C")]
+        with (
+            mock.patch.dict(prefetch.ENDPOINT_CONCURRENCY, {"prices": 1}),
+            mock.patch.dict(prefetch._ENDPOINTS, {"prices": slow_prices, "company_news": news}),
+        ):
+            PrefetchManager(jobs, max_workers=2, manifest_path=self.manifest_path, report=lambda line: None).run()
+        # The second price job queues for its endpoint without taking the worker the news job needs
+        self.assertEqual(finished, [("company_news", "C"), ("prices", "A"), ("prices", "B")])
+
+    def test_failed_price_jobs_are_fetched_by_the_backtest_and_retried(self):
+        market = SyntheticMarket("2024-12-31")
+        failed = self.tickers[0]
+
+        async def failing(ticker, **kwargs):
+            if ticker == failed:
+                raise RuntimeError("unavailable")
+            return await api.aget_price_frame(ticker, **kwargs)
+
+        with offline(market, self.tickers):
+            with mock.patch.dict(prefetch._ENDPOINTS, {"prices": failing}):
+                stats = self.run_manager()
+            self.assertEqual([(job.endpoint, job.ticker) for job, _ in stats.failures], [("prices", failed)])
+            self.assertEqual(stats.done, len(self.jobs) - 1)
+            self.assertTrue(np.isnan(api.get_close_asof(self.tickers, "2024-12-31")[0]))
+
+            # The backtest's close lookup downloads the range the prefetch missed
+            closes = api.get_close_asof(self.tickers, "2024-12-31", start_date="2024-10-01")
+            self.assertFalse(np.isnan(closes).any())
+            self.assertEqual(market.calls["prices"], len(self.tickers))
+
+            # The failed job was not recorded, so the next prefetch runs it (from the now warm cache)
+            stats = self.run_manager()
+            self.assertEqual((stats.done, stats.skipped), (1, len(self.jobs) - 1))
+            self.assertEqual(market.calls["prices"], len(self.tickers))
+
+
+if __name__ == "__main__":
+    unittest.main()
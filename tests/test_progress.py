@@ -43,3 +43,25 @@ class TestAgentProgress(unittest.TestCase):
         self.assertTrue(self.progress.started)
         self.progress.stop()
         self.assertFalse(self.progress.started)
+
+    def test_update_status_does_not_render(self):
+        with mock.patch.object(self.progress, "_render") as render:
+            for stage in ("Fetching", "Analyzing", "Done"):
+                self.progress.update_status("agent_a", "AAPL", stage)
+        render.assert_not_called()
+        self.assertEqual(self.progress.agent_status["agent_a"], {"status": "Done", "ticker": "AAPL"})
+        self.assertEqual([event.status for event in self.progress.events], ["Fetching", "Analyzing", "Done"])
+
+    def test_stage_timings(self):
+        with mock.patch.object(self.progress_mod.time, "time", side_effect=[0.0, 1.0, 1.5, 4.0, 5.0]):
+            self.progress.update_status("agent_a", "AAPL", "Fetching")
+            self.progress.update_status("agent_a", "MSFT", "Fetching")
+            self.progress.update_status("agent_a", "AAPL", "Analyzing")
+            self.progress.update_status("agent_a", "AAPL", "Done")
+            self.progress.update_status("agent_a", "MSFT", "Done")
+
+        timings = self.progress.stage_timings()
+        self.assertEqual(
+            [(t["ticker"], t["stage"], t["duration"]) for t in timings],
+            [("AAPL", "Fetching", 1.5), ("AAPL", "Analyzing", 2.5), ("MSFT", "Fetching", 4.0)],
+        )
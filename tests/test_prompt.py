@@ -0,0 +1,52 @@
+import json
+import unittest
+
+from src.utils.prompt import CompactionStats, compact_analysis_data, compaction_stats, serialize_analysis
+
+
+def make_analysis(periods: int) -> dict:
+    return {
+        "AAPL": {
+            "signal": "bullish",
+            "score": 7.123456789,
+            "margin_of_safety": None,
+            "moat_analysis": {"score": 3, "details": "Excellent ROIC: >15% in 9/10 periods; " * 20},
+            "history": [{"period": index, "roic": 0.1234567} for index in range(periods)],
+        }
+    }
+
+
+class TestPromptCompaction(unittest.TestCase):
+    def setUp(self):
+        compaction_stats.reset()
+
+    def test_serializes_compactly(self):
+        data = json.loads(serialize_analysis(make_analysis(2)))
+        self.assertEqual(data["AAPL"]["score"], 7.123)
+        self.assertNotIn("margin_of_safety", data["AAPL"])
+        self.assertNotIn("\n", serialize_analysis(make_analysis(2)))
+
+    def test_within_budget_keeps_every_field(self):
+        data = json.loads(compact_analysis_data(make_analysis(2), token_budget=10_000))
+        self.assertIn("details", data["AAPL"]["moat_analysis"])
+        self.assertEqual(len(data["AAPL"]["history"]), 2)
+
+    def test_trims_lowest_value_fields_to_fit_budget(self):
+        data = json.loads(compact_analysis_data(make_analysis(10), token_budget=50, agent_name="charlie_munger_agent"))
+        self.assertNotIn("details", data["AAPL"]["moat_analysis"])
+        self.assertEqual(len(data["AAPL"]["history"]), 4)
+        self.assertEqual((data["AAPL"]["signal"], data["AAPL"]["moat_analysis"]["score"]), ("bullish", 3))
+        self.assertEqual(compaction_stats.calls[0]["agent_name"], "charlie_munger_agent")
+        self.assertGreater(compaction_stats.tokens_saved(), 0)
+
+    def test_summary(self):
+        stats = CompactionStats()
+        self.assertIsNone(stats.summary())
+        stats.record("agent", 1000, 400)
+        stats.record("agent", 500, 300)
+        self.assertEqual(stats.tokens_saved(), 800)
+        self.assertIn("~800 of ~1,500", stats.summary())
+
+
+if __name__ == "__main__":
+    unittest.main()
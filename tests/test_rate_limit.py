@@ -0,0 +1,63 @@
+import unittest
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from src.utils.rate_limit import CircuitBreaker, TokenBucket, backoff_delay, parse_retry_after
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_then_steady_rate(self):
+        with mock.patch("src.utils.rate_limit.time.monotonic", return_value=100.0):
+            bucket = TokenBucket(rate=2, capacity=2)
+            waits = [bucket.reserve() for _ in range(4)]
+        self.assertEqual(waits, [0.0, 0.0, 0.5, 1.0])
+
+    def test_pause_holds_back_callers(self):
+        with mock.patch("src.utils.rate_limit.time.monotonic", return_value=100.0):
+            bucket = TokenBucket(rate=10)
+            bucket.pause(3)
+            self.assertGreaterEqual(bucket.reserve(), 3)
+
+
+class TestRetryAfter(unittest.TestCase):
+    def test_parse_seconds_and_dates(self):
+        self.assertEqual(parse_retry_after("7"), 7.0)
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after("soon"))
+        retry_at = datetime.now(timezone.utc) + timedelta(seconds=60)
+        self.assertAlmostEqual(parse_retry_after(format_datetime(retry_at, usegmt=True)), 60, delta=2)
+
+    def test_backoff_delay_bounds(self):
+        for attempt in range(10):
+            self.assertLessEqual(backoff_delay(attempt, base=1.0, cap=30.0), 30.0)
+        self.assertGreaterEqual(backoff_delay(0, retry_after=5.0), 5.0)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_on_error_rate_and_recovers_after_cooldown(self):
+        with mock.patch("src.utils.rate_limit.time.monotonic", return_value=100.0) as monotonic:
+            breaker = CircuitBreaker(failure_threshold=0.5, window=10, min_calls=4, cooldown=30)
+            for success in (True, False, True):
+                breaker.record(success)
+            self.assertTrue(breaker.allow())
+            breaker.record(False)
+            self.assertEqual(breaker.state, "open")
+            self.assertFalse(breaker.allow())
+
+            # After the cooldown a single trial call goes through
+            monotonic.return_value = 131.0
+            self.assertTrue(breaker.allow())
+            self.assertFalse(breaker.allow())
+            breaker.record(False)
+            self.assertFalse(breaker.allow())
+
+            monotonic.return_value = 162.0
+            self.assertTrue(breaker.allow())
+            breaker.record(True)
+            self.assertEqual(breaker.state, "closed")
+            self.assertTrue(breaker.allow())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.agents.technicals import (
+    IndicatorStates,
+    PricePanel,
+    analyze_indicator_snapshot,
+    calculate_hurst_exponent,
+    calculate_hurst_exponents,
+    calculate_indicator_snapshot,
+)
+
+
+def make_prices(length: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, length)))
+    dates = pd.bdate_range("2023-01-02", periods=length)
+    return pd.DataFrame(
+        {
+            "open": close,
+            "close": close,
+            "high": close * (1 + rng.uniform(0, 0.02, length)),
+            "low": close * (1 - rng.uniform(0, 0.02, length)),
+            "volume": rng.integers(100_000, 1_000_000, length),
+            "time": dates.strftime("%Y-%m-%d"),
+        },
+        index=pd.DatetimeIndex(dates, name="Date"),
+    )
+
+
+class TestIndicatorPanel(unittest.TestCase):
+    def test_panel_matches_single_ticker_runs(self):
+        frames = {"AAPL": make_prices(200, 1), "MSFT": make_prices(130, 2), "NVDA": make_prices(60, 3)}
+        panel_snapshot = calculate_indicator_snapshot(PricePanel(frames))
+        for ticker, frame in frames.items():
+            single_snapshot = calculate_indicator_snapshot(PricePanel({ticker: frame}))
+            pd.testing.assert_series_equal(panel_snapshot.loc[ticker], single_snapshot.loc[ticker], rtol=1e-9)
+
+    def test_short_history_leaves_long_windows_empty(self):
+        snapshot = calculate_indicator_snapshot(PricePanel({"AAPL": make_prices(60, 4)}))
+        self.assertTrue(np.isnan(snapshot.loc["AAPL", "momentum_6m"]))
+        self.assertFalse(np.isnan(snapshot.loc["AAPL", "z_score"]))
+
+    def test_history_shorter_than_rsi_window(self):
+        # Every history is shorter than 28 bars, so the panel itself is
+        snapshot = calculate_indicator_snapshot(PricePanel({"AAPL": make_prices(20, 6), "MSFT": make_prices(15, 7)}))
+        self.assertTrue(np.isnan(snapshot["rsi_28"]).all())
+        self.assertFalse(np.isnan(snapshot["rsi_14"]).any())
+
+    def test_report_shape(self):
+        report = analyze_indicator_snapshot(calculate_indicator_snapshot(PricePanel({"AAPL": make_prices(200, 5)})))
+        self.assertIn(report["AAPL"]["signal"], {"bullish", "bearish", "neutral"})
+        self.assertEqual(
+            set(report["AAPL"]["strategy_signals"]),
+            {"trend_following", "mean_reversion", "momentum", "volatility", "statistical_arbitrage"},
+        )
+        self.assertIsInstance(report["AAPL"]["strategy_signals"]["momentum"]["metrics"]["momentum_1m"], float)
+
+
+class TestHurstExponent(unittest.TestCase):
+    def test_separates_random_walk_from_mean_reversion(self):
+        rng = np.random.default_rng(8)
+        self.assertAlmostEqual(calculate_hurst_exponent(100 + np.cumsum(rng.normal(0, 1, 5000))), 0.5, delta=0.05)
+        self.assertLess(calculate_hurst_exponent(100 + rng.normal(0, 1, 5000)), 0.1)
+
+    def test_matches_polyfit_and_ignores_index_labels(self):
+        prices = make_prices(300, 9)["close"]
+        lags = np.arange(2, 20)
+        tau = [np.std(prices.to_numpy()[lag:] - prices.to_numpy()[:-lag]) for lag in lags]
+        expected = np.polyfit(np.log(lags), np.log(tau), 1)[0]
+        self.assertAlmostEqual(calculate_hurst_exponent(prices), expected, places=10)
+
+    def test_batched_rows_match_single_series(self):
+        closes = [make_prices(length, seed)["close"].to_numpy() for length, seed in [(120, 10), (60, 11), (2, 12)]]
+        matrix = np.full((len(closes), 120), np.nan)
+        for row, close in enumerate(closes):
+            matrix[row, -len(close):] = close
+        np.testing.assert_allclose(calculate_hurst_exponents(matrix), [calculate_hurst_exponent(close) for close in closes])
+        self.assertEqual(calculate_hurst_exponents(matrix)[-1], 0.5)
+
+
+class TestIndicatorStates(unittest.TestCase):
+    def test_streaming_matches_full_recompute(self):
+        prices = make_prices(200, 6)
+        states = IndicatorStates("2023-01-02")
+        # Overlapping chunks, as the backtester refetches from the last bar's date
+        states.update("AAPL", prices.iloc[:80])
+        states.update("AAPL", prices.iloc[79:150])
+        states.update("AAPL", prices.iloc[149:])
+        expected = calculate_indicator_snapshot(PricePanel({"AAPL": prices})).loc["AAPL"]
+        pd.testing.assert_series_equal(states.snapshot(["AAPL"]).loc["AAPL"], expected, rtol=1e-9)
+
+    def test_resume_date_follows_last_bar(self):
+        states = IndicatorStates("2023-01-02")
+        self.assertEqual(states.resume_date("AAPL"), "2023-01-02")
+        states.update("AAPL", make_prices(30, 7))
+        self.assertEqual(states.resume_date("AAPL"), make_prices(30, 7)["time"].iloc[-1])
+        self.assertNotIn("MSFT", states)
+
+
+if __name__ == "__main__":
+    unittest.main()
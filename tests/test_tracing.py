@@ -0,0 +1,116 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import httpx
+
+from src.data.cache import Cache
+from src.tools import api
+from src.utils import concurrency
+from src.utils.tracing import NOOP_SPAN, Tracer, tracer
+
+
+class TestTracer(unittest.TestCase):
+    def setUp(self):
+        self.tracer = Tracer(enabled=True)
+
+    def test_disabled_tracer_records_nothing(self):
+        disabled = Tracer(enabled=False)
+        with disabled.span("work") as span:
+            span.set(ticker="AAPL")
+        self.assertIs(span, NOOP_SPAN)
+        self.assertEqual(disabled.spans, [])
+        self.assertIs(disabled.current_span(), NOOP_SPAN)
+
+    def test_spans_nest_and_record_errors(self):
+        with self.tracer.span("run", kind="run") as run:
+            with self.tracer.span("fetch", kind="fetch", ticker="AAPL") as fetch:
+                self.assertIs(self.tracer.current_span(), fetch)
+            with self.assertRaises(ValueError), self.tracer.span("llm", kind="llm"):
+                raise ValueError("boom")
+
+        spans = {span.name: span for span in self.tracer.spans}
+        self.assertIsNone(run.parent_id)
+        self.assertEqual(spans["fetch"].parent_id, run.span_id)
+        self.assertEqual(spans["fetch"].trace_id, run.trace_id)
+        self.assertEqual(spans["fetch"].attributes, {"ticker": "AAPL"})
+        self.assertEqual(spans["llm"].status, "error")
+        self.assertEqual(spans["run"].status, "ok")
+
+    def test_traced_coroutine_and_worker_threads_keep_parent(self):
+        @self.tracer.traced("fetch", kind="fetch")
+        async def fetch():
+            return 1
+
+        def analyze(ticker):
+            with self.tracer.span("analyze", ticker=ticker):
+                return concurrency.run_sync(fetch())
+
+        with mock.patch.object(concurrency, "_max_workers", 2), self.tracer.span("node") as node:
+            self.assertEqual(concurrency.map_tickers(analyze, ["AAPL", "MSFT"]), [1, 1])
+
+        by_id = {span.span_id: span for span in self.tracer.spans}
+        fetches = [span for span in self.tracer.spans if span.name == "fetch"]
+        self.assertEqual(len(fetches), 2)
+        for span in fetches:
+            parent = by_id[span.parent_id]
+            self.assertEqual(parent.name, "analyze")
+            self.assertEqual(parent.parent_id, node.span_id)
+
+    def test_export_writes_json_lines(self):
+        with self.tracer.span("run", kind="run", model="gpt-4o"):
+            pass
+        with tempfile.TemporaryDirectory() as tmp:
+            path = self.tracer.export(os.path.join(tmp, "trace.jsonl"))
+            with open(path) as f:
+                records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]["name"], "run")
+        self.assertEqual(records[0]["attributes"], {"model": "gpt-4o"})
+        self.assertGreaterEqual(records[0]["endTimeUnixNano"], records[0]["startTimeUnixNano"])
+
+    def test_critical_path_follows_last_finishing_child(self):
+        with self.tracer.span("run"):
+            with self.tracer.span("fast_node"):
+                pass
+            with self.tracer.span("slow_node"):
+                with self.tracer.span("llm"):
+                    time.sleep(0.01)
+
+        self.assertEqual([span.name for span in self.tracer.critical_path()], ["run", "slow_node", "llm"])
+        self.assertEqual([span.name for span in self.tracer.slowest(2)], ["run", "slow_node"])
+        summary = self.tracer.summary(top_n=2)
+        self.assertIn("Critical path:", summary)
+        self.assertIn("Slowest 2 spans:", summary)
+
+
+class TestFetchSpans(unittest.TestCase):
+    def test_fetch_spans_report_cache_hits_and_http_details(self):
+        def handler(request):
+            return httpx.Response(200, json={"ticker": "AAPL", "prices": [{"time": "2024-01-02", "open": 1.0, "close": 1.0, "high": 1.0, "low": 1.0, "volume": 10}]})
+
+        tracer.reset()
+        with (
+            mock.patch.object(tracer, "_enabled", True),
+            mock.patch.object(api, "_cache", Cache()),
+            mock.patch.object(api, "_get_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))),
+        ):
+            api.get_prices("AAPL", "2024-01-02", "2024-01-02")
+            api.get_prices("AAPL", "2024-01-02", "2024-01-02")
+        spans = tracer.spans
+        tracer.reset()
+
+        fetches = [span for span in spans if span.kind == "fetch"]
+        self.assertEqual([span.get("cache_hit") for span in fetches], [False, True])
+        self.assertEqual(fetches[0].get("records"), 1)
+        (http,) = [span for span in spans if span.kind == "http"]
+        self.assertEqual(http.parent_id, fetches[0].span_id)
+        self.assertEqual(http.get("status"), 200)
+        self.assertGreater(http.get("bytes"), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()